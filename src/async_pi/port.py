@@ -0,0 +1,138 @@
+"""
+serial ports for `AsyncTFMPSerial`
+
+both keep what was received where the engine can count it (`in_waiting`)
+without reaching into `asyncio.StreamReader` or the transport's port.
+
+`SerialPort` is an asyncio protocol under a `serial_asyncio` transport, the
+loop hands it every chunk as it arrives. `PolledSerial` has no transport at
+all: a non-blocking port read when the engine asks, for schedulers that wake
+once for many sensors and don't want a loop wakeup per arrival.
+"""
+
+import asyncio
+from typing import Callable
+
+import serial
+import serial_asyncio
+
+from src.sensor.connection import AsyncSerial
+
+# received bytes kept before the transport stops reading, like `asyncio.StreamReader`
+MAX_BUFFERED = 64 * 1024
+# seconds between looks at a polled port while a read waits for data
+POLL_INTERVAL = 0.001
+
+
+class SerialPort(asyncio.Protocol, AsyncSerial):
+    """
+    received bytes buffered in the protocol. `on_data` sees every chunk as
+    the loop delivers it, e.g. to record it.
+    """
+
+    def __init__(self, on_data: Callable[[bytes], None] | None = None):
+        self.on_data = on_data
+        self.transport: asyncio.Transport | None = None
+        self._buffer = bytearray()
+        self._waiter: asyncio.Future | None = None
+        self._paused = False
+        self._closed = False
+
+    @classmethod
+    async def open(cls, port: str, baudrate: int) -> "SerialPort":
+        loop = asyncio.get_running_loop()
+        transport, protocol = await serial_asyncio.create_serial_connection(
+            loop, cls, port, baudrate=baudrate
+        )
+        # `connection_made` is only scheduled, a write may come first
+        protocol.transport = transport
+        return protocol
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        if self.on_data is not None:
+            self.on_data(data)
+        self._buffer += data
+        if len(self._buffer) > MAX_BUFFERED and not self._paused:
+            self._paused = True
+            self.transport.pause_reading()
+        self._wake()
+
+    def connection_lost(self, exc: Exception | None):
+        self._closed = True
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def connect(self) -> "SerialPort":
+        return self
+
+    async def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._buffer)
+
+    async def read(self, n: int = -1) -> bytes:
+        """up to `n` (all with -1) received bytes, waits for some. empty once the port is closed."""
+        if not self._buffer and not self._closed:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        size = len(self._buffer) if n < 0 else min(n, len(self._buffer))
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if self._paused and len(self._buffer) <= MAX_BUFFERED // 2:
+            self._paused = False
+            self.transport.resume_reading()
+        return data
+
+    async def write(self, data: bytes = b"") -> int:
+        self.transport.write(data)
+        return len(data)
+
+
+class PolledSerial(AsyncSerial):
+    """a non-blocking `serial.Serial`, read only when asked. `on_data` sees every chunk read."""
+
+    def __init__(self, port: str, baudrate: int, poll_interval: float = POLL_INTERVAL):
+        self.port = port
+        self.baudrate = baudrate
+        self.poll_interval = poll_interval
+        self.on_data: Callable[[bytes], None] | None = None
+        self._serial: serial.Serial | None = None
+
+    @classmethod
+    async def open(cls, port: str, baudrate: int) -> "PolledSerial":
+        return await cls(port, baudrate).connect()
+
+    async def connect(self) -> "PolledSerial":
+        self._serial = serial.serial_for_url(self.port, baudrate=self.baudrate, timeout=0)
+        return self
+
+    async def close(self):
+        self._serial.close()
+
+    @property
+    def in_waiting(self) -> int:
+        return self._serial.in_waiting
+
+    async def read(self, n: int = -1) -> bytes:
+        """up to `n` (all with -1) received bytes, polls until there are some"""
+        while not (waiting := self._serial.in_waiting):
+            await asyncio.sleep(self.poll_interval)
+        data = self._serial.read(waiting if n < 0 else min(n, waiting))
+        if self.on_data is not None:
+            self.on_data(data)
+        return data
+
+    async def write(self, data: bytes = b"") -> int:
+        return self._serial.write(data)
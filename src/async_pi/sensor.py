@@ -1,7 +1,10 @@
 from typing import Self
 import asyncio
-from time import time
-from serial_asyncio import open_serial_connection
+
+from src.async_pi.port import PolledSerial, SerialPort
+from src.sensor.clock import Clock, SYSTEM_CLOCK
+from src.sensor.command import Command
+from src.sensor.protocol import BaseProtocol
 
 
 FRAME_SIZE = 9  # 고정 프레임 크기
@@ -13,14 +16,18 @@ ERR_CHECKSUM = 3
 SIGNAL_WEAK = 10
 SIGNAL_STRONG = 11
 SIGNAL_FLOOD = 12
+# most bytes taken from the reader at once
+READ_SIZE = 4096
 
 
 class AsyncTFMPSerial:
     TIME_OUT = 0.01
 
-    def __init__(self, reader, writer):
+    def __init__(self, reader, writer, clock: Clock | None = None):
         self._reader = reader
         self._writer = writer
+        # must agree with the event loop's clock, see `VirtualEventLoop`
+        self.clock = clock or SYSTEM_CLOCK
 
         self.FRAME_SIZE = FRAME_SIZE
         self.HEADER = HEADER
@@ -30,19 +37,78 @@ class AsyncTFMPSerial:
         self.temperature = 0
         self.signal_intensity = 0
 
-    @classmethod
-    async def create(cls, port: str, baudrate: int = 9600) -> Self:
-        reader, writer = await open_serial_connection(url=port, baudrate=baudrate)
-        return cls(reader, writer)
+        # synchronized frames and the commands waiting for their reply
+        self._protocol = BaseProtocol()
 
-    async def update(self):
-        frame, status = await self.read_frame()
+    @classmethod
+    async def create(cls, port: str, baudrate: int = 9600, polled: bool = False) -> Self:
+        """
+        open `port`, bytes arrive through the loop as they come in or, `polled`,
+        are only read when the sensor is updated. see `port.py`.
+        """
+        opener = PolledSerial.open if polled else SerialPort.open
+        return cls(await opener(port, baudrate), None)
+
+    @property
+    def reading(self) -> tuple[int, int, int, int | None]:
+        """distance, temperature, signal intensity and status, like `TFMPSerial.reading`"""
+        return self.distance, self.temperature, self.signal_intensity, self.status
+
+    @property
+    def in_waiting(self) -> int:
+        """bytes received and not read as a frame yet, in the port or already synchronized"""
+        return self._reader.in_waiting + self._protocol.buffered
+
+    async def update(self, wait: bool = True) -> bool:
+        """
+        read the next frame, `wait=False` only takes one already buffered and
+        keeps the last reading if there is none. true if a frame was read.
+        """
+        frame, status = await (self.read_frame() if wait else self.read_buffered_frame())
+        if status == ERR_HEADER and not wait:
+            return False
         self.status = status
         if status != OK:
-            return
+            return status != ERR_HEADER
         self.distance, self.temperature, self.signal_intensity, self.status = (
             self.parse_frame(frame)
         )
+        return True
+
+    async def send(self, command: Command) -> asyncio.Future:
+        """
+        write `command` without waiting for the reply, commands can be
+        pipelined. the future resolves once a read comes across the reply,
+        at once for a command without one (`trigger`).
+        """
+        future = asyncio.get_running_loop().create_future()
+        if command.reply is None:
+            future.set_result(None)
+        else:
+            self._protocol.commands.sent(command, future)
+        data = command.encode()
+        if self._writer is not None:
+            self._writer.write(data)
+            await self._writer.drain()
+        else:
+            # ports write through the reader, see `port.py` and `AsyncStreamSerial`
+            await self._reader.write(data)
+        return future
+
+    async def request(self, command: Command, timeout: float = 1.0):
+        """
+        `send` and read until the reply is there. only when no other task
+        reads this port, it would resolve `send`'s future for us instead.
+        """
+        future = await self.send(command)
+        deadline = self.clock.time() + timeout
+        while not future.done() and self.clock.time() <= deadline:
+            await self.update()
+        if not future.done():
+            future.cancel()
+            self._protocol.commands.discard(future)
+            raise TimeoutError(f"no reply to command {command.id:#04x} in {timeout}s")
+        return future.result()
 
     async def get_data(self):
         frame, status = await self.read_frame()
@@ -51,41 +117,34 @@ class AsyncTFMPSerial:
         return self.parse_frame(frame)
 
     async def read_frame(self) -> tuple[bytes, int]:
-        deadline = time() + self.TIME_OUT
+        deadline = self.clock.time() + self.TIME_OUT
 
-        while time() <= deadline:
-            # 헤더 찾기: 2바이트 읽기
+        while (frame := self._protocol.next_frame()) is None:
+            timeout = deadline - self.clock.time()
+            if timeout <= 0:
+                return bytes(), ERR_HEADER
             try:
-                first = await asyncio.wait_for(
-                    self._reader.readexactly(1), timeout=self.TIME_OUT
-                )
-                if first != b"\x59":
-                    continue
-                second = await asyncio.wait_for(
-                    self._reader.readexactly(1), timeout=self.TIME_OUT
-                )
-                if second != b"\x59":
-                    continue
+                data = await asyncio.wait_for(self._reader.read(READ_SIZE), timeout=timeout)
             except asyncio.TimeoutError:
-                break
-
-            # 나머지 바이트 읽기
-            try:
-                rest = await asyncio.wait_for(
-                    self._reader.readexactly(self.FRAME_SIZE - 2), timeout=self.TIME_OUT
-                )
-            except asyncio.TimeoutError:
-                break
-
-            frame = b"\x59\x59" + rest
-
-            # 체크섬 확인
-            if sum(frame[:8]) & 0xFF != frame[8]:
-                return bytes(), ERR_CHECKSUM
-
-            return frame, OK
-
-        return bytes(), ERR_HEADER
+                continue
+            if not data:
+                # the port closed, nothing more will come. out the timeout
+                # like a blocking read, a caller looping until a deadline
+                # would spin otherwise
+                await asyncio.sleep(timeout)
+                return bytes(), ERR_HEADER
+            self._protocol.feed(data)
+
+        return frame
+
+    async def read_buffered_frame(self) -> tuple[bytes, int]:
+        """
+        `read_frame` over the bytes received so far. reading buffered bytes
+        returns without suspending, no timeout timer is armed.
+        """
+        if waiting := self._reader.in_waiting:
+            self._protocol.feed(await self._reader.read(waiting))
+        return self._protocol.next_frame() or (bytes(), ERR_HEADER)
 
     @staticmethod
     def parse_frame(frame: bytes) -> tuple[int, int, int, int]:
@@ -1,6 +1,12 @@
-from time import time, sleep
+from concurrent.futures import Future
+
 from serial import Serial
 
+from src.sensor.clock import Clock, SYSTEM_CLOCK
+from src.sensor.command import Command
+from src.sensor.frame import Frame, TFMPData
+from src.sensor.protocol import BaseProtocol
+
 
 # Buffer sizes
 FRAME_SIZE = 9  # Size of one data frame = 9 bytes
@@ -27,26 +33,118 @@ class TFMPSerial:
     HEADER: bytes = b"\x59\x59"
     TIME_OUT: float = 0.01
 
-    status: int
-    distance: int = 0
-    temperature: int
-    signal_intensity: int
+    clock: Clock = SYSTEM_CLOCK
+    # (distance, temperature, signal_intensity, status) of the last update.
+    # replaced as a whole, a thread reading the sensor while its reader thread
+    # updates it never sees half of two frames, with or without the GIL.
+    _reading: tuple[int, int, int, int | None] = (0, 0, 0, None)
 
-    def __init__(self, port, baudrate, header=None, frame_size=None):
+    def __init__(self, port, baudrate, header=None, frame_size=None, clock=None):
         self._serial = Serial(port, baudrate)
         if frame_size:
             self.FRAME_SIZE = frame_size
         if header:
             self.HEADER = header
+        if clock:
+            self.clock = clock
+        self._protocol = BaseProtocol(self._data_type())
+
+    @classmethod
+    def from_serial(
+        cls, serial, header=None, frame_size=None, clock=None
+    ) -> "TFMPSerial":
+        """wrap an already opened port, e.g. a replay or mock source"""
+        sensor = cls.__new__(cls)
+        sensor._serial = serial
+        if frame_size:
+            sensor.FRAME_SIZE = frame_size
+        if header:
+            sensor.HEADER = header
+        if clock:
+            sensor.clock = clock
+        sensor._protocol = BaseProtocol(sensor._data_type())
+        return sensor
+
+    def _data_type(self) -> type[Frame]:
+        if (self.HEADER, self.FRAME_SIZE) == (TFMPData.HEADER, TFMPData.SIZE):
+            return TFMPData
+        # framed like tfmini data under another header or size
+        return type(
+            "CustomData",
+            (TFMPData,),
+            {"HEADER": self.HEADER, "SIZE": self.FRAME_SIZE},
+            register=False,
+        )
 
-    def update(self):
-        frame, status = self.read_frame()
-        self.status = status
+    def update(self, wait: bool = True) -> bool:
+        """
+        read the next frame, `wait=False` only takes one already buffered and
+        keeps the last reading if there is none. true if a frame was read.
+        """
+        frame, status = self.read_frame() if wait else self.read_buffered_frame()
+        if status == ERR_HEADER and not wait:
+            return False
         if status != OK:
-            return
-        self.distance, self.temperature, self.signal_intensity, self.status = (
-            self.parse_frame(frame)
-        )
+            # the last values stay, with the error status
+            self._reading = (*self._reading[:3], status)
+            return status != ERR_HEADER
+        self._reading = self.parse_frame(frame)
+        return True
+
+    @property
+    def in_waiting(self) -> int:
+        """bytes received and not read as a frame yet, in the port or already synchronized"""
+        return self._serial.in_waiting + self._protocol.buffered
+
+    @property
+    def reading(self) -> tuple[int, int, int, int | None]:
+        """consistent snapshot of distance, temperature, signal intensity and status"""
+        return self._reading
+
+    @property
+    def distance(self) -> int:
+        return self._reading[0]
+
+    @property
+    def temperature(self) -> int:
+        return self._reading[1]
+
+    @property
+    def signal_intensity(self) -> int:
+        return self._reading[2]
+
+    @property
+    def status(self) -> int | None:
+        return self._reading[3]
+
+    def send(self, command: Command) -> Future:
+        """
+        write `command` without waiting for the reply, commands can be
+        pipelined. the future resolves once a read comes across the reply,
+        at once for a command without one (`trigger`).
+        """
+        future: Future = Future()
+        if command.reply is None:
+            future.set_result(None)
+        else:
+            self._protocol.commands.sent(command, future)
+        self._serial.write(command.encode())
+        return future
+
+    def request(self, command: Command, timeout: float = 1.0):
+        """
+        `send` and read until the reply is there. only when no other thread
+        reads this port, it would resolve `send`'s future for us instead.
+        """
+        future = self.send(command)
+        deadline = self.clock.time() + timeout
+        while not future.done() and self.clock.time() <= deadline:
+            self.update()
+        if not future.done():
+            future.cancel()
+            self._protocol.commands.discard(future)
+            raise TimeoutError(f"no reply to command {command.id:#04x} in {timeout}s")
+        return future.result()
 
     def get_data(self):
         frame, status = self.read_frame()
@@ -55,35 +153,31 @@ class TFMPSerial:
         return self.parse_frame(frame)
 
     def read_frame(self) -> tuple[bytes, int]:
-        deadline = time() + self.TIME_OUT
-
-        while time() <= deadline:
-            if self._serial.in_waiting < 2:
-                sleep(0.001)
-                continue
-
-            # Step 1: 헤더 탐색
-            first = self._serial.read(1)
-            if first != b"\x59":
-                continue
-            second = self._serial.read(1)
-            if second != b"\x59":
-                continue
-
-            # Step 2: 프레임 나머지 읽기
-            rest = self._serial.read(self.FRAME_SIZE - 2)
-            if len(rest) != self.FRAME_SIZE - 2:
-                continue
-
-            frame = b"\x59\x59" + rest
-
-            # Step 3: 체크섬 확인
-            if sum(frame[:8]) & 0xFF != frame[8]:
-                return bytes(), ERR_CHECKSUM
-
-            return frame, OK
-
-        return bytes(), ERR_HEADER
+        deadline = self.clock.time() + self.TIME_OUT
+
+        while self.clock.time() <= deadline:
+            frame = self._protocol.next_frame()
+            if frame is not None:
+                return frame
+            if not self._receive():
+                self.clock.sleep(0.001)
+
+        return self._protocol.next_frame() or (bytes(), ERR_HEADER)
+
+    def read_buffered_frame(self) -> tuple[bytes, int]:
+        """`read_frame` over the bytes received so far, never sleeps"""
+        self._receive()
+        return self._protocol.next_frame() or (bytes(), ERR_HEADER)
+
+    def _receive(self) -> int:
+        """
+        hand everything the port received to the synchronizer in one read,
+        replies resolve their commands on the way. the number of bytes.
+        """
+        waiting = self._serial.in_waiting
+        if waiting:
+            self._protocol.feed(self._serial.read(waiting))
+        return waiting
 
     @staticmethod
     def parse_frame(frame: bytes) -> tuple[int, int, int, int]:
@@ -0,0 +1,160 @@
+"""
+blocking engines on reader threads, readings consumed in asyncio
+
+every port gets a thread running `TFMPSerial`, paced by a `FramePacer`. the
+threads hand their readings to the event loop through one `BatchHandoff`:
+the first reading of a batch costs one `call_soon_threadsafe` (a write to
+the loop's self-pipe), every reading until the loop takes the batch rides
+along. with `linger` the loop waits that long before taking it, so 32
+sensors at 100 Hz wake it every `linger` seconds instead of 3200 times.
+
+usage:
+```python
+async with HybridTFMPReader.open(ports, 115200, interval=0.01) as reader:
+    async for batch in reader.batches():
+        for reading in batch:
+            ...
+```
+"""
+
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, NamedTuple, Self
+
+from src.blocking_pi.sensor import TFMPSerial
+from src.sensor.pacing import FramePacer
+
+# seconds the loop collects readings before taking a batch
+LINGER = 0.005
+
+
+class Reading(NamedTuple):
+    port: str
+    timestamp: float  # `time.time()` when the frame was read
+    distance: int
+    temperature: int
+    signal_intensity: int
+    status: int
+
+
+class BatchHandoff:
+    """readings from any thread to the event loop, one wakeup per batch"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, linger: float = LINGER):
+        self._loop = loop
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._pending: list = []
+        self._scheduled = False
+        # loop thread only
+        self._ready: list = []
+        self._event = asyncio.Event()
+        self.wakeups = 0
+        self.batches = 0
+
+    def put(self, item):
+        """from any thread, raises `RuntimeError` once the loop is closed"""
+        with self._lock:
+            self._pending.append(item)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._loop.call_soon_threadsafe(self._arm)
+
+    def _arm(self):
+        self.wakeups += 1
+        if self.linger > 0:
+            self._loop.call_later(self.linger, self._flush)
+        else:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._scheduled = False
+        self._ready.extend(batch)
+        self._event.set()
+
+    async def get(self) -> list:
+        """everything handed over since the last call, waits for at least one"""
+        while not self._ready:
+            self._event.clear()
+            await self._event.wait()
+        batch, self._ready = self._ready, []
+        self.batches += 1
+        return batch
+
+
+class HybridTFMPReader:
+    def __init__(
+        self,
+        sensors: dict[str, TFMPSerial],
+        interval: float,
+        linger: float = LINGER,
+        pacing: bool = True,
+    ):
+        self.sensors = sensors
+        self.interval = interval
+        self.linger = linger
+        self.pacing = pacing
+        self.handoff: BatchHandoff | None = None
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    @classmethod
+    def open(cls, ports: list[str], baudrate: int, interval: float, **kwargs) -> Self:
+        sensors = {port: TFMPSerial(port, baudrate=baudrate) for port in ports}
+        return cls(sensors, interval, **kwargs)
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        # joining blocks for at most one sleep of every thread
+        await asyncio.to_thread(self.stop)
+
+    def start(self):
+        """start the reader threads, from the loop that consumes the readings"""
+        self.handoff = BatchHandoff(asyncio.get_running_loop(), self.linger)
+        self._stop.clear()
+        for port, sensor in self.sensors.items():
+            thread = threading.Thread(
+                target=self._run, args=(port, sensor), name=f"reader {port}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    async def batches(self) -> AsyncIterator[list[Reading]]:
+        while True:
+            yield await self.handoff.get()
+
+    def _run(self, port: str, sensor: TFMPSerial):
+        pacer = FramePacer(self.interval, frame_size=sensor.FRAME_SIZE) if self.pacing else None
+
+        def backlog() -> int:
+            return sensor.in_waiting
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            read = sensor.update()
+            finished = time.monotonic()
+            if read:
+                reading = Reading(port, time.time(), *sensor.reading)
+                try:
+                    self.handoff.put(reading)
+                except RuntimeError:
+                    return  # the loop is gone
+            if pacer is None:
+                delay = self.interval
+            else:
+                delay = pacer.next_delay(started, finished, read, backlog)
+            if delay > 0:
+                self._stop.wait(delay)
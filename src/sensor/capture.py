@@ -0,0 +1,267 @@
+"""
+raw serial capture format
+
+a capture file holds the raw chunks received from one serial port:
+
+    header: MAGIC | version (uint8) | start wall time (float64) | port length (uint16) | port (utf-8)
+    record: timestamp (uint64, monotonic ns) | length (uint32) | chunk
+
+all integers are little endian.
+every `index_interval` seconds the writer appends `(timestamp, offset)` of the
+next record to a sidecar `.idx` file, so a reader can seek by time without
+scanning the whole capture.
+"""
+
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator
+
+MAGIC = b"SPCP"
+VERSION = 1
+HEADER = struct.Struct("<4sBdH")
+RECORD = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<QQ")
+
+CAPTURE_SUFFIX = ".cap"
+INDEX_SUFFIX = ".idx"
+
+
+class CaptureRecorder:
+    """
+    append received chunks to rotating capture files.
+
+    `record` only timestamps the chunk and puts it on a queue, a background
+    thread does the file writes and flushes them every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        prefix: str | Path,
+        port: str = "",
+        max_bytes: int = 64 * 1024 * 1024,
+        index_interval: float = 1.0,
+        flush_interval: float = 0.5,
+    ):
+        self.prefix = Path(prefix)
+        self.port = port
+        self.max_bytes = max_bytes
+        self.index_interval_ns = int(index_interval * 1e9)
+        self.flush_interval = flush_interval
+
+        self._queue: queue.SimpleQueue[tuple[int, bytes] | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._sequence = 0
+        self.files: list[Path] = []
+
+    def start(self) -> "CaptureRecorder":
+        self.prefix.parent.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def record(self, data: bytes):
+        if data:
+            self._queue.put((time.monotonic_ns(), data))
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self) -> "CaptureRecorder":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        path = self.prefix.with_name(
+            f"{self.prefix.name}-{self._sequence:04d}{CAPTURE_SUFFIX}"
+        )
+        self._sequence += 1
+        self.files.append(path)
+
+        port = self.port.encode()
+        f = open(path, "wb")
+        f.write(HEADER.pack(MAGIC, VERSION, time.time(), len(port)) + port)
+        index = open(path.with_suffix(INDEX_SUFFIX), "wb")
+        return f, index
+
+    def _run(self):
+        f, index = self._open()
+        next_index = 0
+        last_flush = time.monotonic()
+
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = ()
+
+                # drain everything queued so far into one batch of writes
+                batch = [item] if item else []
+                stop = item is None
+                while not stop:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                    else:
+                        batch.append(item)
+
+                for timestamp, data in batch:
+                    if f.tell() >= self.max_bytes:
+                        f.close()
+                        index.close()
+                        f, index = self._open()
+                        next_index = 0
+                    if timestamp >= next_index:
+                        index.write(INDEX_ENTRY.pack(timestamp, f.tell()))
+                        next_index = timestamp + self.index_interval_ns
+                    f.write(RECORD.pack(timestamp, len(data)))
+                    f.write(data)
+
+                if stop:
+                    break
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    f.flush()
+                    index.flush()
+                    last_flush = time.monotonic()
+        finally:
+            f.close()
+            index.close()
+
+
+class CaptureFile:
+    """
+    memory-mapped reader of one capture file. a recorder killed before its
+    first flush leaves an empty file or a torn header, that reads as a capture
+    without chunks (`start_time` is `None`).
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mmap: mmap.mmap | None = None
+        self.start_time: float | None = None
+        self.port = ""
+        self.data_offset = self.size
+        self.index: list[tuple[int, int]] = []
+
+        if self.size < HEADER.size:
+            if not MAGIC.startswith(self._file.read(len(MAGIC))):
+                self._file.close()
+                raise ValueError(f"{self.path} is not a capture file")
+            return
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, start_time, port_length = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a capture file")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"unsupported capture version {version}")
+        offset = HEADER.size
+        if offset + port_length > self.size:
+            return
+        self.start_time = start_time
+        self.port = bytes(self._mmap[offset : offset + port_length]).decode()
+        self.data_offset = offset + port_length
+
+        self.index = self._load_index()
+
+    def _load_index(self) -> list[tuple[int, int]]:
+        index_path = self.path.with_suffix(INDEX_SUFFIX)
+        if not index_path.exists():
+            return []
+        raw = index_path.read_bytes()
+        # ignore a torn entry at the end of an interrupted capture
+        raw = raw[: len(raw) - len(raw) % INDEX_ENTRY.size]
+        return list(INDEX_ENTRY.iter_unpack(raw))
+
+    def offset_at(self, timestamp: int) -> int:
+        """offset of an indexed record at or before `timestamp` (monotonic ns)"""
+        i = bisect_right(self.index, (timestamp, float("inf")))
+        return self.index[i - 1][1] if i else self.data_offset
+
+    def chunks(self, start: int | None = None) -> Iterator[tuple[int, bytes]]:
+        """yield `(timestamp, chunk)` pairs, from `start` (monotonic ns) if given"""
+        buffer = self._mmap if self._mmap is not None else b""
+        offset = self.data_offset if start is None else self.offset_at(start)
+        end = len(buffer)
+
+        while offset + RECORD.size <= end:
+            timestamp, length = RECORD.unpack_from(buffer, offset)
+            offset += RECORD.size
+            if offset + length > end:
+                # truncated last record
+                break
+            if start is None or timestamp >= start:
+                yield timestamp, buffer[offset : offset + length]
+            offset += length
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "CaptureFile":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingSerial:
+    """
+    `serial.Serial` proxy that records what the port received, in the chunks
+    the port had them. every look at `in_waiting` or `read` takes everything
+    received so far into a local buffer, the record's timestamp is when the
+    bytes were first seen, not when the reader got to them.
+    """
+
+    def __init__(self, serial, recorder: CaptureRecorder):
+        self._serial = serial
+        self._recorder = recorder
+        self._buffer = bytearray()
+
+    def _drain(self):
+        if waiting := self._serial.in_waiting:
+            data = self._serial.read(waiting)
+            self._recorder.record(data)
+            self._buffer += data
+
+    @property
+    def in_waiting(self) -> int:
+        self._drain()
+        return len(self._buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        self._drain()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if len(data) < size:
+            # wait for the rest like the port would
+            rest = self._serial.read(size - len(data))
+            self._recorder.record(rest)
+            data += rest
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._serial, name)
+
+
+def capture_files(prefix: str | Path) -> list[Path]:
+    """capture files written by a recorder with `prefix`, in order"""
+    prefix = Path(prefix)
+    return sorted(prefix.parent.glob(f"{prefix.name}-[0-9]*{CAPTURE_SUFFIX}"))
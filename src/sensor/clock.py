@@ -0,0 +1,89 @@
+"""
+injectable clocks
+
+the engines and reader loops read time and sleep through a `Clock`, so tests
+and simulations can swap the system clock for a `VirtualClock` where sleeping
+only moves time forward. `VirtualEventLoop` does the same for asyncio timers
+(`asyncio.sleep`, `asyncio.wait_for`), an hour of traffic then runs in as long
+as its cpu work takes.
+"""
+
+import asyncio
+import selectors
+import time
+
+
+class Clock:
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+SYSTEM_CLOCK = Clock()
+
+
+class VirtualClock(Clock):
+    """clock that only moves when slept on or advanced"""
+
+    def __init__(self, start: float = 0.0, epoch: float = 1_700_000_000.0):
+        self._now = start
+        self.epoch = epoch  # wall clock time at monotonic 0
+        self.wakeups = 0  # sleeps and timer waits that moved the clock
+
+    def time(self) -> float:
+        return self.epoch + self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self._now += seconds
+            self.wakeups += 1
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self._clock = clock
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # no timer pending, only real i/o can wake the loop
+            return super().select(None)
+        events = super().select(0)
+        if not events:
+            self._clock.advance(timeout)
+        return events
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """
+    event loop on a `VirtualClock`: instead of waiting for the next timer,
+    the loop advances the clock to it.
+    """
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(selector=_VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.monotonic()
+
+
+def run_virtual(coro, clock: VirtualClock):
+    """`asyncio.run` on a `VirtualEventLoop`"""
+    loop = VirtualEventLoop(clock)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -0,0 +1,285 @@
+"""
+tfmini plus commands and their replies
+
+a command is `0x5A, length, id, payload, checksum` with the checksum the low
+byte of the sum before it, a reply echoes the id under the same layout. the
+replies are registered `Frame` types, so they share a bus with data frames
+(see `dispatch.py`).
+
+`CommandTracker` keeps the futures of commands in flight. the sensor answers
+in order, so a reply resolves the oldest pending command with its id and any
+number of commands can be pipelined without waiting for each other. it is
+sans-I/O: the engines write `Command.encode()` and hand it every reply they
+read, with `concurrent.futures` or `asyncio` futures alike.
+
+`frame_rate(0)` switches the sensor to on-demand mode, it then only sends a
+data frame when triggered. `trigger` has no reply of its own, the data frame is.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from .frame import Frame
+
+COMMAND_HEADER = 0x5A
+# longest reply, the baud rate echo
+MAX_REPLY_SIZE = 8
+
+# command ids
+GET_VERSION = 0x01
+SYSTEM_RESET = 0x02
+FRAME_RATE = 0x03
+TRIGGER = 0x04
+OUTPUT_FORMAT = 0x05
+BAUD_RATE = 0x06
+OUTPUT_ENABLE = 0x07
+RESTORE_FACTORY = 0x10
+SAVE_SETTINGS = 0x11
+
+# `OUTPUT_FORMAT` payloads
+FORMAT_CM = 0x01
+FORMAT_MM = 0x06
+
+
+def checksum(data: bytes) -> int:
+    return sum(data) & 0xFF
+
+
+def reply_time(baudrate: int, command_size: int = 4, reply_size: int = 9) -> float:
+    """seconds on an 8N1 line to write a command and get its answer, a data frame by default"""
+    return (command_size + reply_size) * 10 / baudrate
+
+
+@dataclass
+class VersionReply(Frame["VersionReply"]):
+    major: int
+    minor: int
+    revision: int
+
+    HEADER = b"\x5a\x07\x01"
+    SIZE = 7
+    DATA = tuple[int, int, int]
+
+    @classmethod
+    def parse(cls, data: bytes) -> "VersionReply":
+        return cls(major=data[5], minor=data[4], revision=data[3])
+
+
+@dataclass
+class ResetReply(Frame["ResetReply"]):
+    """status 0 is success, the same for `RestoreReply` and `SaveReply`"""
+
+    status: int
+
+    HEADER = b"\x5a\x05\x02"
+    SIZE = 5
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "ResetReply":
+        return cls(status=data[3])
+
+
+class RestoreReply(ResetReply):
+    HEADER = b"\x5a\x05\x10"
+
+
+class SaveReply(ResetReply):
+    HEADER = b"\x5a\x05\x11"
+
+
+@dataclass
+class FrameRateReply(Frame["FrameRateReply"]):
+    rate: int
+
+    HEADER = b"\x5a\x06\x03"
+    SIZE = 6
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "FrameRateReply":
+        return cls(rate=data[3] | (data[4] << 8))
+
+
+@dataclass
+class OutputFormatReply(Frame["OutputFormatReply"]):
+    format: int
+
+    HEADER = b"\x5a\x05\x05"
+    SIZE = 5
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "OutputFormatReply":
+        return cls(format=data[3])
+
+
+@dataclass
+class BaudRateReply(Frame["BaudRateReply"]):
+    baudrate: int
+
+    HEADER = b"\x5a\x08\x06"
+    SIZE = 8
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "BaudRateReply":
+        return cls(baudrate=int.from_bytes(data[3:7], "little"))
+
+
+@dataclass
+class OutputEnableReply(Frame["OutputEnableReply"]):
+    enabled: bool
+
+    HEADER = b"\x5a\x05\x07"
+    SIZE = 5
+    DATA = bool
+
+    @classmethod
+    def parse(cls, data: bytes) -> "OutputEnableReply":
+        return cls(enabled=bool(data[3]))
+
+
+# reply type by the id it echoes
+REPLIES: dict[int, type[Frame]] = {
+    reply.HEADER[2]: reply
+    for reply in (
+        VersionReply,
+        ResetReply,
+        FrameRateReply,
+        OutputFormatReply,
+        BaudRateReply,
+        OutputEnableReply,
+        RestoreReply,
+        SaveReply,
+    )
+}
+
+
+@dataclass(frozen=True)
+class Command:
+    id: int
+    payload: bytes = b""
+
+    @property
+    def reply(self) -> type[Frame] | None:
+        """type of the answer, `None` if the sensor doesn't send one"""
+        return REPLIES.get(self.id)
+
+    def encode(self) -> bytes:
+        body = bytes([COMMAND_HEADER, len(self.payload) + 4, self.id]) + self.payload
+        return body + bytes([checksum(body)])
+
+
+def get_version() -> Command:
+    return Command(GET_VERSION)
+
+
+def system_reset() -> Command:
+    return Command(SYSTEM_RESET)
+
+
+def frame_rate(hz: int) -> Command:
+    """frames per second, 0 for on-demand mode"""
+    return Command(FRAME_RATE, hz.to_bytes(2, "little"))
+
+
+def trigger() -> Command:
+    return Command(TRIGGER)
+
+
+def output_format(fmt: int = FORMAT_CM) -> Command:
+    return Command(OUTPUT_FORMAT, bytes([fmt]))
+
+
+def baud_rate(baudrate: int) -> Command:
+    return Command(BAUD_RATE, baudrate.to_bytes(4, "little"))
+
+
+def output_enable(enabled: bool = True) -> Command:
+    return Command(OUTPUT_ENABLE, bytes([enabled]))
+
+
+def restore_factory() -> Command:
+    return Command(RESTORE_FACTORY)
+
+
+def save_settings() -> Command:
+    return Command(SAVE_SETTINGS)
+
+
+def _claim(future) -> bool:
+    """
+    false if `future` was given up on, e.g. a timeout cancelled it. a
+    `concurrent.futures.Future` can't be cancelled by another thread once
+    claimed, so setting its result can't race the timeout. an asyncio
+    future is only cancelled on its loop, the thread resolving it.
+    """
+    if future.done():
+        return False
+    start = getattr(future, "set_running_or_notify_cancel", None)
+    return start() if start is not None else True
+
+
+class CommandTracker:
+    """futures of the commands in flight, oldest first per id"""
+
+    def __init__(self):
+        self._pending: dict[int, deque] = {}
+        self._count = 0
+        # a reader thread resolves while other threads send
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def sent(self, command: Command, future):
+        """track `future` until the reply to `command` arrives"""
+        with self._lock:
+            self._pending.setdefault(command.id, deque()).append(future)
+            self._count += 1
+
+    def discard(self, future):
+        """stop tracking `future`, e.g. after its command timed out"""
+        with self._lock:
+            for waiting in self._pending.values():
+                try:
+                    waiting.remove(future)
+                except ValueError:
+                    continue
+                self._count -= 1
+                return
+
+    def resolve(self, data: bytes) -> bool:
+        """
+        hand a reply to the oldest command waiting for it. false if it is
+        broken, unknown or nobody asked.
+        """
+        if len(data) < 4 or checksum(data[:-1]) != data[-1]:
+            return False
+        reply = REPLIES.get(data[2])
+        if reply is None or len(data) != reply.SIZE:
+            return False
+        with self._lock:
+            waiting = self._pending.get(data[2])
+            while waiting:
+                future = waiting.popleft()
+                self._count -= 1
+                if _claim(future):
+                    break
+            else:
+                return False
+        # outside the lock, a done callback may send the next command
+        future.set_result(reply.parse(data))
+        return True
+
+    def fail(self, exc: BaseException):
+        """fail every pending command, e.g. when the port closes"""
+        with self._lock:
+            futures = [future for waiting in self._pending.values() for future in waiting]
+            self._pending.clear()
+            self._count = 0
+        for future in futures:
+            if _claim(future):
+                future.set_exception(exc)
@@ -0,0 +1,155 @@
+"""
+one synchronizer for every registered frame type
+
+a bus can carry several `Frame` types, e.g. data frames and command replies
+with their own header and length. the headers are kept in a trie, and the trie
+is compiled to one regular expression with an empty group where each header
+ends. one scan in C finds the earliest position where any header is
+complete, the group that matched indexes a precomputed table of the types
+starting there, longest header first. the buffer is searched once however
+many types are registered.
+
+statuses follow the reader engines: a frame whose checksum fails still
+consumes its `SIZE` bytes (ERR_CHECKSUM), ERR_HEADER means no whole frame yet.
+nothing is decided at a position while a longer header or frame starting
+there is cut off by the end of the buffer, so the same bytes decode the same
+however they were split into chunks.
+with `skip_invalid` the scan moves on to the earliest frame that validates,
+for every type or only for some: a broken command reply is more likely a
+stray byte than a reply, and must not swallow the data frame behind it.
+"""
+
+import re
+from typing import Iterable, Iterator, NamedTuple
+
+from .frame import Frame, registered_frames
+
+# statuses as the engines report them, see `src/blocking_pi/sensor.py`
+OK = 0
+ERR_HEADER = 2
+ERR_CHECKSUM = 3
+
+
+class FrameMatch(NamedTuple):
+    """
+    `frame_type` at `position`, or with ERR_HEADER no whole frame: bytes
+    before `position` hold none and can be dropped
+    """
+
+    position: int
+    frame_type: type[Frame] | None
+    status: int
+
+
+class HeaderTrie:
+    """frame types by header, one node per header byte"""
+
+    def __init__(self, frame_types: Iterable[type[Frame]]):
+        # node: byte -> child, the types ending at a node under `None`
+        self.root: dict = {}
+        self.max_header = 0
+        for frame_type in frame_types:
+            node = self.root
+            for byte in frame_type.HEADER:
+                node = node.setdefault(byte, {})
+            node.setdefault(None, []).append(frame_type)
+            self.max_header = max(self.max_header, len(frame_type.HEADER))
+        if not self.root:
+            raise ValueError("no frame types to dispatch on")
+
+    def compile(self) -> tuple[re.Pattern[bytes], list[tuple[tuple[type[Frame], int], ...]]]:
+        """
+        the trie as one lookahead pattern, so headers inside a rejected frame
+        are still found, and the (type, size) candidates of each group: the
+        group's header first, then the registered headers it starts with
+        """
+        table: list[tuple[tuple[type[Frame], int], ...]] = [()]  # groups count from 1
+        body = self._alternation(self.root, (), table)
+        return re.compile(b"(?=" + body + b")"), table
+
+    def _alternation(self, node: dict, shorter: tuple, table: list) -> bytes:
+        if None in node:
+            shorter = (*((t, t.SIZE) for t in node[None]), *shorter)
+        branches = [
+            re.escape(bytes([byte])) + self._alternation(child, shorter, table)
+            for byte, child in node.items()
+            if byte is not None
+        ]
+        if None in node:
+            # tried last, a longer header at the same position wins
+            table.append(shorter)
+            branches.append(b"()")
+        if len(branches) == 1:
+            return branches[0]
+        return b"(?:" + b"|".join(branches) + b")"
+
+
+class FrameDispatcher:
+    """finds the earliest frame of any of `frame_types` (default: all registered)"""
+
+    def __init__(
+        self,
+        frame_types: Iterable[type[Frame]] | None = None,
+        skip_invalid: bool | Iterable[type[Frame]] = False,
+    ):
+        self.frame_types = list(registered_frames() if frame_types is None else frame_types)
+        # the types whose broken frames are skipped instead of consumed
+        if isinstance(skip_invalid, bool):
+            skip_invalid = self.frame_types if skip_invalid else ()
+        self.skip_invalid = frozenset(skip_invalid)
+        trie = HeaderTrie(self.frame_types)
+        self._root = trie.root
+        self._pattern, self._table = trie.compile()
+        self._max_header = trie.max_header
+        # a header cut off at the end of the buffer may be this long
+        self._tail = trie.max_header - 1
+
+    def _extends(self, buffer, position: int) -> bool:
+        """whether the bytes from `position` to the end are the start of a longer header"""
+        node = self._root
+        for byte in buffer[position:]:
+            node = node.get(byte)
+            if node is None:
+                return False
+        return any(key is not None for key in node)
+
+    def scan(self, buffer, start: int = 0) -> FrameMatch:
+        """the first frame at or after `start` in `buffer` (bytes-like)"""
+        return next(self.frames(buffer, start))
+
+    def frames(self, buffer, start: int = 0) -> Iterator[FrameMatch]:
+        """
+        every frame in `buffer` (bytes-like), then the ERR_HEADER match where
+        the unconsumed rest begins
+        """
+        size = len(buffer)
+        table = self._table
+        skip_invalid = self.skip_invalid
+        resume = start
+        for found in self._pattern.finditer(buffer, start):
+            position = found.start()
+            if position < resume:
+                # a header inside the last frame
+                continue
+            candidates = table[found.lastindex]
+            if size - position < self._max_header and self._extends(buffer, position):
+                # a longer header may still complete here
+                yield FrameMatch(position, None, ERR_HEADER)
+                return
+            for frame_type, length in candidates:
+                end = position + length
+                if end > size:
+                    # decide once the longer candidate is in, so where the
+                    # stream was split can't change the result
+                    yield FrameMatch(position, None, ERR_HEADER)
+                    return
+                if sum(buffer[position : end - 1]) & 0xFF == buffer[end - 1]:
+                    yield FrameMatch(position, frame_type, OK)
+                    break
+            else:
+                frame_type, length = candidates[0]
+                if frame_type in skip_invalid:
+                    continue
+                yield FrameMatch(position, frame_type, ERR_CHECKSUM)
+            resume = position + length
+        yield FrameMatch(max(resume, size - self._tail), None, ERR_HEADER)
@@ -0,0 +1,95 @@
+"""
+line fault injection
+
+corrupts frames the way a noisy cable does, so the header hunting, checksum
+and partial frame paths of the readers run under test. rates are per frame,
+except `bit_flip` which is per byte:
+
+    bit_flip        flip one bit of a byte
+    drop            lose one byte of the frame
+    garbage         insert 1..frame size random bytes before the frame
+    truncate        cut the frame short
+    false_header    valid frame with `0x59 0x59` inside the payload
+"""
+
+import random
+from dataclasses import dataclass, fields
+
+
+@dataclass(frozen=True)
+class FaultProfile:
+    bit_flip: float = 0.0
+    drop: float = 0.0
+    garbage: float = 0.0
+    truncate: float = 0.0
+    false_header: float = 0.0
+
+    @property
+    def clean(self) -> bool:
+        return not any(getattr(self, f.name) for f in fields(self))
+
+
+# named profiles for the perf matrix, names must not contain `_` or `-`
+PROFILES: dict[str, FaultProfile] = {
+    "clean": FaultProfile(),
+    "bitflip": FaultProfile(bit_flip=1e-3),
+    "lossy": FaultProfile(drop=0.01, truncate=0.01),
+    "garbage": FaultProfile(garbage=0.01, false_header=0.05),
+    "vibration": FaultProfile(
+        bit_flip=1e-3, drop=0.005, garbage=0.005, truncate=0.005, false_header=0.02
+    ),
+}
+
+
+def get_profile(name: str, **overrides: float | None) -> FaultProfile:
+    """a named profile, with the rates in `overrides` that are not `None` replaced"""
+    try:
+        profile = PROFILES[name]
+    except KeyError:
+        raise ValueError(f"unknown fault profile {name!r}, one of {list(PROFILES)}")
+    changes = {k: v for k, v in overrides.items() if v is not None}
+    return FaultProfile(**{**profile.__dict__, **changes}) if changes else profile
+
+
+class FaultInjector:
+    """applies a `FaultProfile` frame by frame, seeded for reproducible streams"""
+
+    def __init__(self, profile: FaultProfile, seed: int | None = None):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.faults = 0  # frames that left `apply` corrupted
+        self.false_headers = 0
+
+    def apply(self, frame: bytes) -> bytes:
+        profile, rng = self.profile, self.rng
+        data = bytearray(frame)
+        faulted = False
+
+        if profile.false_header and rng.random() < profile.false_header:
+            # a real reading can contain the header, keep the frame valid
+            at = rng.randrange(2, len(data) - 2)
+            data[at : at + 2] = b"\x59\x59"
+            data[-1] = sum(data[:-1]) & 0xFF
+            self.false_headers += 1
+
+        if profile.bit_flip:
+            for i in range(len(data)):
+                if rng.random() < profile.bit_flip:
+                    data[i] ^= 1 << rng.randrange(8)
+                    faulted = True
+
+        if profile.drop and rng.random() < profile.drop:
+            del data[rng.randrange(len(data))]
+            faulted = True
+
+        if profile.truncate and rng.random() < profile.truncate:
+            del data[rng.randrange(1, len(data)) :]
+            faulted = True
+
+        if profile.garbage and rng.random() < profile.garbage:
+            data[0:0] = rng.randbytes(rng.randint(1, len(frame)))
+            faulted = True
+
+        if faulted:
+            self.faults += 1
+        return bytes(data)
@@ -5,6 +5,9 @@ from dataclasses import dataclass
 
 T = TypeVar("T")
 
+# concrete `Frame` subclasses by `module.qualname`, see `registered_frames`
+REGISTRY: dict[str, type["Frame"]] = {}
+
 
 class Frame(ABC, Generic[T]):
     """
@@ -49,7 +52,7 @@ class Frame(ABC, Generic[T]):
         if not sum(data[:chksum_idx]) & 0xFF == data[chksum_idx]:
             raise ValueError("Invalid data: checksum error")
 
-    def __init_subclass__(cls) -> None:
+    def __init_subclass__(cls, register: bool = True) -> None:
         super().__init_subclass__()
         required_attrs = {"HEADER": bytes, "SIZE": int, "DATA": type}
 
@@ -68,6 +71,27 @@ class Frame(ABC, Generic[T]):
                 )
 
         cls.HEADER_LENGTH = len(cls.HEADER)
+        if register:
+            register_frame(cls)
+
+
+def register_frame(frame_cls: type[Frame]) -> type[Frame]:
+    """
+    add `frame_cls` to the types synchronizers dispatch on. a header must
+    identify one type, re-registering the same class (a reload) replaces it.
+    """
+    key = f"{frame_cls.__module__}.{frame_cls.__qualname__}"
+    for other_key, other in REGISTRY.items():
+        if other.HEADER == frame_cls.HEADER and other_key != key:
+            raise ValueError(
+                f"header {frame_cls.HEADER!r} of `{key}` is taken by `{other_key}`"
+            )
+    REGISTRY[key] = frame_cls
+    return frame_cls
+
+
+def registered_frames() -> list[type[Frame]]:
+    return list(REGISTRY.values())
 
 
 @dataclass
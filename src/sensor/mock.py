@@ -0,0 +1,119 @@
+"""
+in-memory mock serial ports
+
+generate frames at a configured rate with optional latency, jitter, broken
+checksums and line faults (see `faults.py`), without a tty or socat in between. plug `MockSerial` into
+`TFMPSerial.from_serial` and `AsyncMockSerial` into `AsyncTFMPSerial` to measure
+synchronization and parsing cost in isolation.
+"""
+
+import random
+from collections import deque
+from typing import Iterator
+
+from .clock import Clock, SYSTEM_CLOCK
+from .faults import FaultInjector, FaultProfile
+from .stream import AsyncStreamSerial, StreamSerial, TimedStream, TTY_BUFFER_SIZE
+
+DEFAULT_FRAME = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7"
+
+
+class FrameStream(TimedStream):
+    """
+    `rate` frames per second, or as fast as the reader goes if `None`.
+    every frame arrives `latency` seconds late plus up to `jitter` seconds,
+    and `error_rate` of them carry a broken checksum. `faults` corrupts the
+    line on top, the release time of every faulted frame lands in `fault_times`.
+    with `baudrate` set, bytes arrive `wire_chunk` at a time at the pace of an
+    8N1 line instead of a frame at once.
+    """
+
+    def __init__(
+        self,
+        frame: bytes = DEFAULT_FRAME,
+        rate: float | None = 100.0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        count: int | None = None,
+        seed: int | None = None,
+        clock: Clock = SYSTEM_CLOCK,
+        faults: FaultProfile | None = None,
+        baudrate: int | None = None,
+        wire_chunk: int = 1,
+    ):
+        super().__init__(clock)
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive or None")
+        self.frame = frame
+        self.rate = rate
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.count = count
+        self.seed = seed
+        self.faults = faults if faults is not None and not faults.clean else None
+        self.byte_time = 10 / baudrate if baudrate else 0.0
+        self.wire_chunk = wire_chunk
+        if rate is None:
+            self.max_buffered = TTY_BUFFER_SIZE
+
+        self.corrupted = 0
+        self.injector: FaultInjector | None = None
+        # consumers pop what they handled, the bound only guards unattended streams
+        self.fault_times: deque[float] = deque(maxlen=1 << 16)
+
+    def chunks(self) -> Iterator[tuple[float, bytes]]:
+        rng = random.Random(self.seed)
+        corrupt = self.frame[:-1] + bytes([self.frame[-1] ^ 0xFF])
+        injector = self.injector = (
+            FaultInjector(self.faults, rng.randrange(2**32)) if self.faults else None
+        )
+        last = wire_free = self.start
+        k = 0
+        while self.count is None or k < self.count:
+            if self.rate is None:
+                due = self.start
+            else:
+                due = self.start + self.latency + k / self.rate
+                if self.jitter:
+                    due += rng.uniform(0, self.jitter)
+                # jitter delays frames, it never reorders them
+                due = last = max(due, last)
+
+            if self.error_rate and rng.random() < self.error_rate:
+                self.corrupted += 1
+                data = corrupt
+            else:
+                data = self.frame
+
+            if injector is not None:
+                faults = injector.faults
+                data = injector.apply(data)
+                if injector.faults != faults:
+                    self.fault_times.append(due)
+
+            if self.byte_time:
+                at = max(due, wire_free)
+                for i in range(0, len(data), self.wire_chunk):
+                    part = data[i : i + self.wire_chunk]
+                    at += len(part) * self.byte_time
+                    yield at, part
+                wire_free = at
+            else:
+                yield due, data
+            k += 1
+
+
+class MockSerial(StreamSerial):
+    """blocking mock port, plug into `TFMPSerial.from_serial`"""
+
+    def __init__(self, **kwargs):
+        super().__init__(FrameStream(**kwargs))
+
+
+class AsyncMockSerial(AsyncStreamSerial):
+    """asyncio mock port, pass it as the reader of `AsyncTFMPSerial`"""
+
+    def __init__(self, **kwargs):
+        super().__init__(FrameStream(**kwargs))
@@ -0,0 +1,93 @@
+"""
+adaptive pacing of reader loops
+
+instead of sleeping a fixed interval after every update, `FramePacer` tracks
+when the sensor emits frames and wakes the reader just after the next one:
+
+    period  moving average of the time between frames an update waited
+            for, a gap of several frames counts as several periods
+    phase   arrival time of the last frame. an update that had to wait for
+            its frame saw the true arrival. one that found the frame already
+            buffered only knows it came earlier, the estimate then moves
+            `probe` of a period earlier, until a read waits again.
+
+a backlog of whole frames is read right away. updates that time out back the
+schedule off to polling, up to `max_backoff` periods apart, until frames
+arrive again.
+"""
+
+from typing import Callable
+
+from .clock import Clock, SYSTEM_CLOCK
+
+# an update that took longer than this waited for its frame
+WAIT_THRESHOLD = 0.0005
+# wake up this long after the expected arrival, so the frame is complete
+PACING_MARGIN = 0.0005
+
+
+class FramePacer:
+    def __init__(
+        self,
+        interval: float,
+        clock: Clock = SYSTEM_CLOCK,
+        frame_size: int = 9,
+        margin: float = PACING_MARGIN,
+        gain: float = 0.1,
+        probe: float = 0.02,
+        max_backoff: int = 8,
+    ):
+        self.period = interval
+        self.clock = clock
+        self.frame_size = frame_size
+        self.margin = margin
+        self.gain = gain
+        self.probe = probe
+        self.max_backoff = max_backoff
+
+        self.arrival: float | None = None  # estimated arrival of the last frame
+        self.seen: float | None = None  # last arrival an update waited for
+        self.misses = 0
+
+    def next_delay(
+        self,
+        started: float,
+        finished: float,
+        arrived: bool,
+        backlog: Callable[[], int] | None = None,
+    ) -> float:
+        """
+        seconds to sleep after an update that ran from `started` to `finished`
+        (`clock.monotonic()`), `arrived` unless it timed out without a frame.
+        `backlog` counts the bytes still buffered, it is only asked when the
+        frame was already there.
+        """
+        if not arrived:
+            self.misses += 1
+            backoff = min(2 ** (self.misses - 1), self.max_backoff)
+            return self.period * backoff
+
+        self.misses = 0
+        waited = finished - started > WAIT_THRESHOLD
+        if self.arrival is None or waited:
+            arrival = finished
+        else:
+            # the frame was buffered, it came at or before the predicted time
+            arrival = min(finished, self.arrival + self.period) - self.probe * self.period
+
+        if waited:
+            if self.seen is not None:
+                gap = finished - self.seen
+                frames = max(1, round(gap / self.period))
+                self.period += self.gain * (gap / frames - self.period)
+            self.seen = finished
+        self.arrival = arrival
+
+        if not waited and backlog is not None and backlog() >= self.frame_size:
+            return 0.0
+        now = self.clock.monotonic()
+        wake = arrival + self.period + self.margin
+        if wake < now:
+            # behind schedule, the next frame is due within a period
+            return 0.0
+        return wake - now
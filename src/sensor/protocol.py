@@ -1,45 +1,128 @@
-from abc import ABC, abstractmethod, ABCMeta
-from time import time
+"""
+frame synchronization without I/O
 
-from serial import Serial
+`SynchronizationProtocol` takes bytes in whatever chunks the port delivers
+(`feed`), keeps a partial frame across calls and returns the frames completed
+by them. it knows nothing of ports, threads or event loops, so a blocking
+reader, an asyncio protocol or a selector loop can all drive the same parser.
+the earliest frame of any of its `Frame` types wins, see `dispatch.py`.
 
-from src.sensor.frame import Frame
+events are `(frame, status, frame_type)`, the first two as `read_frame`
+returns them: OK with the frame bytes, or ERR_CHECKSUM for a frame whose
+checksum fails (its bytes are consumed, like the engines do).
 
+`BaseProtocol` is what the blocking, async and hybrid engines share: data
+frames of one sensor queued for `read_frame`, command replies handed to the
+commands waiting for them. how the bytes get there is up to the engine.
+"""
 
-class IProtocol(metaclass=ABCMeta):
-    frame: Frame
-
-    @abstractmethod
-    def read(self) -> tuple[bytes, int]:
-        pass
-
-
-class BaseProtocol(IProtocol):
-    serial: Serial
-
-    def read(self) -> tuple[bytes, int]:
-        data = self.serial.read(self.frame.SIZE)
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from typing import Iterable, NamedTuple
 
+from .command import REPLIES, CommandTracker
+from .dispatch import OK, FrameDispatcher
+from .frame import Frame, TFMPData
 
 
-class SynchronizationProtocol(BaseProtocol):
-    TIMEOUT: float
-
-    def read(self) -> tuple[bytes, int]:
-        pass
-
-    def _synchronize(self):
-        deadline = time() + self.TIMEOUT
-        while time() <= deadline:
-            if self.serial.in_waiting < self.frame.HEADER_LENGTH:
-            return self._read()
-        raise BufferError("No Header Found!")
-
-    def _read(self) -> tuple[bytes, int]:
-        pass
+class FrameEvent(NamedTuple):
+    frame: bytes
+    status: int
+    frame_type: type[Frame]
 
 
+class IProtocol(metaclass=ABCMeta):
+    @abstractmethod
+    def feed(self, data: bytes) -> list[FrameEvent]:
+        """bytes received, returns the frames they completed"""
+
+
+class SynchronizationProtocol(IProtocol):
+    """
+    incremental synchronizer for `frame_types` (default: all registered).
+    bytes that can't start a frame are dropped as soon as they are seen,
+    only a partial frame stays buffered.
+    """
+
+    def __init__(
+        self,
+        frame_types: type[Frame] | Iterable[type[Frame]] | None = None,
+        skip_invalid: bool | Iterable[type[Frame]] = False,
+    ):
+        if isinstance(frame_types, type):
+            frame_types = [frame_types]
+        self.dispatcher = FrameDispatcher(frame_types, skip_invalid)
+        self._buffer = bytearray()
+
+        self.frames = 0
+        self.checksum_errors = 0
+        self.skipped_bytes = 0
+
+    @property
+    def pending(self) -> int:
+        """bytes kept for a frame that isn't complete yet"""
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> list[FrameEvent]:
+        buffer = self._buffer
+        buffer += data
+        events = []
+        consumed = 0
+        # the last match has no type, it tells where the unconsumed bytes start.
+        # iterating to the end also releases the buffer before it is resized.
+        for position, frame_type, status in self.dispatcher.frames(buffer):
+            self.skipped_bytes += position - consumed
+            if frame_type is None:
+                consumed = position
+                continue
+            consumed = position + frame_type.SIZE
+            events.append(FrameEvent(bytes(buffer[position:consumed]), status, frame_type))
+            if status == OK:
+                self.frames += 1
+            else:
+                self.checksum_errors += 1
+        del buffer[:consumed]
+        return events
+
+    def reset(self):
+        """forget a partial frame, e.g. after the port reconnects"""
+        self.skipped_bytes += len(self._buffer)
+        self._buffer.clear()
 
 
-if __name__ == '__main__':
-    print('protocol main starts!')
+class BaseProtocol(IProtocol):
+    """
+    what every engine keeps per port, without the I/O: a synchronizer over
+    `data_type` and the command replies, the data frames not handed out yet,
+    and the commands waiting for a reply. the engines only move bytes from
+    their port into `feed` and take frames out of `next_frame`.
+    """
+
+    def __init__(self, data_type: type[Frame] = TFMPData, commands: CommandTracker | None = None):
+        self.data_type = data_type
+        self.commands = CommandTracker() if commands is None else commands
+        # a reply that fails its checksum is skipped, not consumed: it is
+        # likely a stray 0x5A in front of a data frame
+        self.synchronizer = SynchronizationProtocol(
+            [data_type, *REPLIES.values()], skip_invalid=REPLIES.values()
+        )
+        self._frames: deque[tuple[bytes, int]] = deque()
+
+    @property
+    def buffered(self) -> int:
+        """bytes received and not handed out as a frame yet"""
+        return len(self._frames) * self.data_type.SIZE + self.synchronizer.pending
+
+    def feed(self, data: bytes) -> list[FrameEvent]:
+        events = self.synchronizer.feed(data)
+        for event in events:
+            if event.frame_type is self.data_type:
+                # the engines return no bytes with a broken frame
+                self._frames.append((event.frame if event.status == OK else bytes(), event.status))
+            elif event.status == OK:
+                self.commands.resolve(event.frame)
+        return events
+
+    def next_frame(self) -> tuple[bytes, int] | None:
+        """the oldest data frame and its status like `read_frame` returns them, `None` if none is in"""
+        return self._frames.popleft() if self._frames else None
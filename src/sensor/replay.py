@@ -0,0 +1,96 @@
+"""
+deterministic replay of capture files
+
+replays the chunks of a capture (see `capture.py`) through the `Method`
+interface, so the reader engines run their unmodified `read_frame` against
+recorded data instead of a live port.
+
+`speed` controls the pacing:
+    1.0     chunks become readable at the time they were received
+    2.0     twice as fast (any positive factor)
+    None    as fast as the reader goes, a tty buffer full at a time
+"""
+
+from pathlib import Path
+from typing import Iterator
+
+from .capture import CaptureFile, capture_files
+from .clock import Clock, SYSTEM_CLOCK
+from .stream import AsyncStreamSerial, StreamSerial, TimedStream, TTY_BUFFER_SIZE
+
+
+def resolve_captures(source: str | Path | list[Path]) -> list[Path]:
+    """a capture file, a list of them, or the prefix a recorder rotated files under"""
+    if isinstance(source, list):
+        return source
+    source = Path(source)
+    if source.is_file():
+        return [source]
+    files = capture_files(source)
+    if not files:
+        raise FileNotFoundError(f"no capture files found for {source}")
+    return files
+
+
+class ReplayStream(TimedStream):
+    """chunks of memory-mapped captures released on a (scaled) timeline"""
+
+    def __init__(
+        self,
+        source: str | Path | list[Path],
+        speed: float | None = 1.0,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        super().__init__(clock)
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        self.files = resolve_captures(source)
+        self.speed = speed
+        if speed is None:
+            self.max_buffered = TTY_BUFFER_SIZE
+        self._captures: list[CaptureFile] = []
+
+    def chunks(self) -> Iterator[tuple[float, bytes]]:
+        first = None
+        for capture in self._captures:
+            for timestamp, data in capture.chunks():
+                if self.speed is None:
+                    yield self.start, data
+                    continue
+                if first is None:
+                    first = timestamp
+                yield self.start + (timestamp - first) / 1e9 / self.speed, data
+
+    def open(self):
+        self._captures = [CaptureFile(path) for path in self.files]
+        super().open()
+
+    def close(self):
+        super().close()
+        for capture in self._captures:
+            capture.close()
+        self._captures = []
+
+
+class ReplaySerial(StreamSerial):
+    """blocking replay, plug into `TFMPSerial.from_serial`"""
+
+    def __init__(
+        self,
+        source: str | Path | list[Path],
+        speed: float | None = 1.0,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        super().__init__(ReplayStream(source, speed, clock))
+
+
+class AsyncReplaySerial(AsyncStreamSerial):
+    """asyncio replay, pass it as the reader of `AsyncTFMPSerial`"""
+
+    def __init__(
+        self,
+        source: str | Path | list[Path],
+        speed: float | None = 1.0,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        super().__init__(ReplayStream(source, speed, clock))
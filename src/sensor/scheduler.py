@@ -0,0 +1,139 @@
+"""
+one scheduler for all sensors of a reader
+
+instead of a sleeping timer per sensor (a task or a thread each), all poll
+deadlines live on one hashed `TimerWheel`. the engine sleeps once until the
+earliest deadline, then services every sensor due by then back to back:
+with 32 sensors at 100 Hz the deadlines of a tick coalesce into one wakeup.
+
+a sensor is only read when a whole frame is buffered (`update(wait=False)`),
+so servicing never blocks on one port while the others are due. one without a
+frame is retried a tick later, backing off to one `interval` while it stays
+silent, and the retry that finds the frame moves the sensor's phase there.
+"""
+
+import math
+
+from .clock import Clock, SYSTEM_CLOCK
+
+# resolution of the wheel, deadlines within one tick expire together
+WHEEL_TICK = 0.001
+# ticks per revolution, later deadlines wait for their round in the slot
+WHEEL_SLOTS = 512
+
+
+class TimerWheel:
+    """
+    hashed timer wheel. a deadline is rounded up to its tick and appended to
+    slot `tick % slots`, expiring turns the wheel up to the current tick and
+    collects the due entries of every slot passed. scheduling is O(1), a heap
+    would be O(log n) for every sensor and poll.
+    """
+
+    def __init__(self, tick: float = WHEEL_TICK, slots: int = WHEEL_SLOTS, start: float = 0.0):
+        self.tick = tick
+        self.slots: list[list[tuple[int, object]]] = [[] for _ in range(slots)]
+        self._cursor = math.floor(start / tick)  # first tick not expired yet
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, deadline: float, item: object):
+        tick = max(math.ceil(deadline / self.tick - 1e-9), self._cursor)
+        self.slots[tick % len(self.slots)].append((tick, item))
+        self._count += 1
+
+    def expire(self, now: float) -> list:
+        """remove and return the items due at `now`"""
+        last = math.floor(now / self.tick + 1e-9)
+        if last < self._cursor or not self._count:
+            self._cursor = max(self._cursor, last + 1)
+            return []
+
+        n = len(self.slots)
+        due = []
+        # past a full revolution every slot is visited once
+        for tick in range(self._cursor, min(last, self._cursor + n - 1) + 1):
+            slot = self.slots[tick % n]
+            if not slot:
+                continue
+            keep = [entry for entry in slot if entry[0] > last]
+            if len(keep) != len(slot):
+                due.extend(item for t, item in slot if t <= last)
+                self.slots[tick % n] = keep
+        self._cursor = last + 1
+        self._count -= len(due)
+        return due
+
+    def next_deadline(self) -> float | None:
+        """start of the earliest tick with an item, `None` when empty"""
+        if not self._count:
+            return None
+        n = len(self.slots)
+        earliest = None
+        for i in range(n):
+            slot = self.slots[(self._cursor + i) % n]
+            if not slot:
+                continue
+            tick = min(t for t, _ in slot)
+            if tick == self._cursor + i:
+                # nothing in an earlier slot, and no later round beats this
+                return tick * self.tick
+            if earliest is None or tick < earliest:
+                earliest = tick
+        return earliest * self.tick
+
+
+class PollScheduler:
+    """poll deadlines of many sensors on one `TimerWheel`"""
+
+    def __init__(
+        self,
+        interval: float,
+        clock: Clock = SYSTEM_CLOCK,
+        tick: float = WHEEL_TICK,
+        slots: int = WHEEL_SLOTS,
+    ):
+        self.interval = interval
+        self.clock = clock
+        self.wheel = TimerWheel(tick, slots, start=clock.monotonic())
+        # sensor -> (deadline it was due at, polls without a frame)
+        self._state: dict[object, tuple[float, int]] = {}
+        self.wakeups = 0
+        self.polls = 0
+
+    def add(self, sensor: object, at: float | None = None):
+        at = self.clock.monotonic() if at is None else at
+        self._state[sensor] = (at, 0)
+        self.wheel.schedule(at, sensor)
+
+    def wait(self) -> float:
+        """seconds until the next sensor is due"""
+        deadline = self.wheel.next_deadline()
+        if deadline is None:
+            return self.interval
+        return max(0.0, deadline - self.clock.monotonic())
+
+    def due(self) -> list:
+        """sensors due now, each must be handed back to `done`"""
+        sensors = self.wheel.expire(self.clock.monotonic())
+        self.wakeups += 1
+        self.polls += len(sensors)
+        return sensors
+
+    def done(self, sensor: object, ready: bool):
+        """reschedule `sensor`, `ready` if the poll got a frame"""
+        deadline, misses = self._state[sensor]
+        now = self.clock.monotonic()
+        if ready:
+            # a frame found by a retry sets the phase, otherwise keep it unless
+            # the sensor fell a whole interval behind
+            deadline = max((now if misses else deadline) + self.interval, now)
+            misses = 0
+            at = deadline
+        else:
+            misses += 1
+            at = now + min(self.wheel.tick * 2 ** (misses - 1), self.interval)
+        self._state[sensor] = (deadline, misses)
+        self.wheel.schedule(at, sensor)
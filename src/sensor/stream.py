@@ -0,0 +1,177 @@
+"""
+in-memory serial sources
+
+a `TimedStream` releases chunks of bytes on a monotonic timeline, and
+`StreamSerial`/`AsyncStreamSerial` expose it through the `Method` interface with
+the part of `serial.Serial` and of the ports in `src/async_pi/port.py` the
+reader engines use.
+replays and mocks only have to provide the chunks.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Iterator
+
+from .clock import Clock, SYSTEM_CLOCK
+from .connection import AsyncMethod, Method
+
+# bytes a tty keeps buffered, caps how far an unpaced stream runs ahead of its reader
+TTY_BUFFER_SIZE = 4096
+
+
+class TimedStream(ABC):
+    """bytes released on a monotonic timeline of `clock`"""
+
+    max_buffered: int | None = None
+
+    def __init__(self, clock: Clock = SYSTEM_CLOCK):
+        self.clock = clock
+        self._chunks: Iterator[tuple[float, bytes]] = iter(())
+        self._pending: tuple[float, bytes] | None = None
+        self._released: deque[bytes] = deque()
+        self._head = 0  # bytes of `_released[0]` already consumed
+        self.available = 0
+        self.exhausted = False
+        self.start = 0.0
+
+    @abstractmethod
+    def chunks(self) -> Iterator[tuple[float, bytes]]:
+        """`(release time, data)` pairs in release order, the stream opened at `start`"""
+
+    def open(self):
+        self.start = self.clock.monotonic()
+        self._chunks = self.chunks()
+        self._pending = next(self._chunks, None)
+        self.exhausted = self._pending is None
+
+    def close(self):
+        self._chunks = iter(())
+        self._pending = None
+
+    def next_release(self) -> float | None:
+        if self._pending is None:
+            return None
+        return self._pending[0]
+
+    def release(self, now: float | None = None, need: int = 0):
+        """make every chunk due at `now` readable, at least `need` bytes if possible"""
+        now = self.clock.monotonic() if now is None else now
+        limit = max(self.max_buffered, need) if self.max_buffered else None
+        while self._pending is not None and self._pending[0] <= now:
+            if limit is not None and self.available >= limit:
+                break
+            data = self._pending[1]
+            self._released.append(data)
+            self.available += len(data)
+            self._pending = next(self._chunks, None)
+
+        if self._pending is None and self.available == 0:
+            self.exhausted = True
+
+    def take(self, size: int) -> bytes:
+        """consume up to `size` released bytes"""
+        parts = []
+        while size > 0 and self._released:
+            chunk = self._released[0]
+            end = min(len(chunk), self._head + size)
+            parts.append(chunk[self._head : end])
+            size -= end - self._head
+            self.available -= end - self._head
+            if end == len(chunk):
+                self._released.popleft()
+                self._head = 0
+            else:
+                self._head = end
+
+        if self._pending is None and self.available == 0:
+            self.exhausted = True
+        return b"".join(parts)
+
+
+class StreamSerial(Method):
+    """blocking `Method` over a `TimedStream`, plug into `TFMPSerial.from_serial`"""
+
+    def __init__(self, stream: TimedStream):
+        self.stream = stream
+
+    def connect(self):
+        self.stream.open()
+        return self
+
+    def close(self):
+        self.stream.close()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.stream.exhausted
+
+    @property
+    def in_waiting(self) -> int:
+        self.stream.release()
+        return self.stream.available
+
+    def read(self, size: int = 1) -> bytes:
+        """block until `size` bytes arrived, fewer only when the stream ends"""
+        stream = self.stream
+        parts = []
+        stream.release(need=size)
+        while True:
+            data = stream.take(size)
+            parts.append(data)
+            size -= len(data)
+            if size == 0:
+                break
+            next_release = stream.next_release()
+            if next_release is None:
+                break
+            delay = next_release - stream.clock.monotonic()
+            if delay > 0:
+                stream.clock.sleep(delay)
+            stream.release(need=size)
+        return b"".join(parts)
+
+    def write(self, data: bytes = b"") -> int:
+        # nothing listens on the other end, writes are dropped
+        return len(data)
+
+
+class AsyncStreamSerial(AsyncMethod):
+    """asyncio `Method` over a `TimedStream`, pass it as the reader of `AsyncTFMPSerial`"""
+
+    def __init__(self, stream: TimedStream):
+        self.stream = stream
+
+    async def connect(self):
+        self.stream.open()
+        return self
+
+    async def close(self):
+        self.stream.close()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.stream.exhausted
+
+    @property
+    def in_waiting(self) -> int:
+        self.stream.release()
+        return self.stream.available
+
+    async def _wait_for(self, size: int):
+        stream = self.stream
+        stream.release(need=size)
+        while stream.available < size:
+            next_release = stream.next_release()
+            if next_release is None:
+                break
+            # the event loop's clock must be `stream.clock`, see `VirtualEventLoop`
+            await asyncio.sleep(max(0.0, next_release - stream.clock.monotonic()))
+            stream.release(need=size)
+
+    async def read(self, n: int = -1) -> bytes:
+        await self._wait_for(1)
+        return self.stream.take(self.stream.available if n < 0 else n)
+
+    async def write(self, data: bytes = b"") -> int:
+        return len(data)
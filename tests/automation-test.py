@@ -1,161 +1,387 @@
-# benchmark.py
+"""
+mixed-workload interference benchmark: lidar plus camera on one pi
+
+real `TFMPSerial` / `AsyncTFMPSerial` readers poll pty ports, fed by a
+`multi_writer` process whose frames carry their send time and a sequence
+number. a camera stage runs next to them: blocking capture i/o, then
+image-like numpy work. every mode runs once without the camera and once per
+placement of the cpu stage, and reports how much the camera inflates serial
+read latency (frame sent to reading seen) and drops (sequence gaps).
+
+modes:
+    threads  a thread per sensor and one for the camera
+    async    a task per sensor, the camera task captures in an executor
+    hybrid   reader threads feeding the loop in batches, camera as in async
+
+the cpu stage runs `inline` (on the camera thread or the event loop), in a
+`thread` pool or in a `process` pool.
+
+usage:
+    python -m tests.automation-test
+    python -m tests.automation-test -m async hybrid --cpu-in inline process -d 20 -n 4
+"""
+
 import asyncio
+import json
 import time
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 from threading import Thread
+
+import numpy as np
 import psutil
-import os
+
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import OK, TFMPSerial
+from src.hybrid_pi.sensor import HybridTFMPReader
+from src.sensor.pacing import FramePacer
+from tests.helper import async_reader, blocking_reader
+from tests.helper.multi_writer import SEQUENCE_MASK, read_stamp
+from tests.helper.subprocess_managers import run_multi_serial_writer, run_pty_pairs
 
 # --------- CONFIG ---------
-TEST_DURATION_SEC = 60
+TEST_DURATION_SEC = 10
+WARMUP_SEC = 1.0
 CAMERA_INTERVAL_SEC = 0.2  # 5 Hz
-SERIAL_INTERVAL_SEC = 0.1  # 10 Hz
+SERIAL_INTERVAL_SEC = 0.01  # 100 Hz, the TF-Mini Plus default
 SERIAL_PORTS = 2
-CAMERA_FILENAME_TEMPLATE = "image_{count}.jpg"
+BAUDRATE = 115200
+CAPTURE_SEC = 0.04  # blocking capture, 30~50ms for a low-res still
+IMAGE_SHAPE = (480, 640, 3)
 # --------------------------
 
-# === MOCK FUNCTIONS (simulate work) ===
+MODES = ("threads", "async", "hybrid")
+CPU_PLACEMENTS = ("inline", "thread", "process")
+DEFAULT_OUTPUT_DIR = Path(__file__).parent / "perf" / "results" / "interference"
+
+# === CAMERA WORKLOAD ===
+
+BASE_IMAGE = np.random.default_rng(0).integers(0, 256, IMAGE_SHAPE, dtype=np.uint8)
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
 
 
-def mock_picamera_capture(filename):
-    # Simulate 30~50ms capture time (realistic for low-res capture)
-    time.sleep(0.04)
+def picamera_capture(count: int) -> np.ndarray:
+    """blocking capture: waiting on the sensor, then the copy out of its buffer"""
+    time.sleep(CAPTURE_SEC)
+    return np.roll(BASE_IMAGE, count, axis=1)
 
 
-def mock_serial_communication(port_name):
-    # Simulate 1~5ms serial TX/RX
-    time.sleep(0.003)
+def process_image(image: np.ndarray) -> int:
+    """grayscale, 3x3 box blur, gradient magnitude and its histogram"""
+    gray = image.astype(np.float32) @ GRAY_WEIGHTS
+    h, w = gray.shape
+    blur = sum(gray[y : h - 2 + y, x : w - 2 + x] for y in range(3) for x in range(3)) / 9
+    gx = np.diff(blur, axis=1)[:-1]
+    gy = np.diff(blur, axis=0)[:, :-1]
+    hist, _ = np.histogram(np.hypot(gx, gy), bins=32)
+    return int(hist.argmax())
 
 
 # === MEASUREMENT HELPERS ===
 
 
-class Metrics:
-    def __init__(self):
-        self.picamera_count = 0
-        self.serial_count = 0
-        self.start_time = time.monotonic()
+class SerialStats:
+    """latency and drops of one port, fed by one reader only"""
+
+    def __init__(self, since: float):
+        self.since = since
+        self.latencies: list[float] = []
+        self.last_sequence: int | None = None
+        self.dropped = 0
+        self.errors = 0
+
+    def record(self, reading: tuple, now: float):
+        if now < self.since:
+            return
+        if reading[3] != OK:
+            self.errors += 1
+            return
+        sequence, age = read_stamp(reading, now)
+        if self.last_sequence is not None:
+            self.dropped += max(0, ((sequence - self.last_sequence) & SEQUENCE_MASK) - 1)
+        self.last_sequence = sequence
+        self.latencies.append(age)
+
 
-    def elapsed(self):
-        return time.monotonic() - self.start_time
+class MeasuredSensor:
+    """records every reading of the wrapped blocking sensor"""
 
+    def __init__(self, sensor: TFMPSerial, stats: SerialStats):
+        self.sensor = sensor
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.sensor, name)
+
+    def update(self, wait: bool = True) -> bool:
+        read = self.sensor.update(wait)
+        if read:
+            self.stats.record(self.sensor.reading, time.monotonic())
+        return read
+
+
+class AsyncMeasuredSensor(MeasuredSensor):
+    async def update(self, wait: bool = True) -> bool:
+        read = await self.sensor.update(wait)
+        if read:
+            self.stats.record(self.sensor.reading, time.monotonic())
+        return read
+
+
+class Camera:
+    def __init__(self, cpu_in: str, pool: Executor | None):
+        self.cpu_in = cpu_in
+        self.pool = pool
+        self.frames = 0
+        self.stage_times: list[float] = []
+
+    def record(self, started: float):
+        self.frames += 1
+        self.stage_times.append(time.monotonic() - started)
+
+
+def new_pool(cpu_in: str) -> Executor | None:
+    if cpu_in == "thread":
+        return ThreadPoolExecutor(max_workers=2, thread_name_prefix="camera")
+    if cpu_in == "process":
+        pool = ProcessPoolExecutor(max_workers=2)
+        # fork the workers now, before the reader threads exist
+        pool.submit(process_image, BASE_IMAGE).result()
+        return pool
+    return None
 
-metrics = Metrics()
 
 # === MODE 1: Thread-based ===
 
 
-def thread_camera_worker():
+def thread_camera_worker(camera: Camera, until: float):
     count = 0
-    while metrics.elapsed() < TEST_DURATION_SEC:
+    while time.monotonic() < until:
         start = time.monotonic()
-        mock_picamera_capture(CAMERA_FILENAME_TEMPLATE.format(count=count))
-        metrics.picamera_count += 1
+        image = picamera_capture(count)
+        if camera.pool is None:
+            process_image(image)
+        else:
+            camera.pool.submit(process_image, image).result()
+        camera.record(start)
         count += 1
-        elapsed = time.monotonic() - start
-        sleep_time = max(0, CAMERA_INTERVAL_SEC - elapsed)
-        time.sleep(sleep_time)
-
-
-def thread_serial_worker(port_name):
-    while metrics.elapsed() < TEST_DURATION_SEC:
-        start = time.monotonic()
-        mock_serial_communication(port_name)
-        metrics.serial_count += 1
-        elapsed = time.monotonic() - start
-        sleep_time = max(0, SERIAL_INTERVAL_SEC - elapsed)
-        time.sleep(sleep_time)
+        time.sleep(max(0, CAMERA_INTERVAL_SEC - (time.monotonic() - start)))
+
+
+def run_threads_mode(ports: list[str], stats: list[SerialStats], camera: Camera | None, until: float):
+    threads = []
+    for port, port_stats in zip(ports, stats):
+        sensor = MeasuredSensor(TFMPSerial(port, baudrate=BAUDRATE), port_stats)
+        pacer = FramePacer(SERIAL_INTERVAL_SEC, frame_size=sensor.FRAME_SIZE)
+        threads.append(
+            Thread(
+                target=blocking_reader.poll_sensor,
+                args=(sensor, SERIAL_INTERVAL_SEC),
+                kwargs={"until": until, "pacer": pacer},
+            )
+        )
+    if camera is not None:
+        threads.append(Thread(target=thread_camera_worker, args=(camera, until)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
 
 
 # === MODE 2: Asyncio + executor ===
 
 
-async def async_camera_worker(executor):
-    count = 0
+async def async_camera_worker(camera: Camera, until: float):
     loop = asyncio.get_running_loop()
-    while metrics.elapsed() < TEST_DURATION_SEC:
+    count = 0
+    while time.monotonic() < until:
         start = time.monotonic()
-        await loop.run_in_executor(
-            executor,
-            mock_picamera_capture,
-            CAMERA_FILENAME_TEMPLATE.format(count=count),
-        )
-        metrics.picamera_count += 1
+        # capture blocks, it always goes to the default executor
+        image = await loop.run_in_executor(None, picamera_capture, count)
+        if camera.pool is None:
+            process_image(image)
+        else:
+            await loop.run_in_executor(camera.pool, process_image, image)
+        camera.record(start)
         count += 1
-        elapsed = time.monotonic() - start
-        await asyncio.sleep(max(0, CAMERA_INTERVAL_SEC - elapsed))
+        await asyncio.sleep(max(0, CAMERA_INTERVAL_SEC - (time.monotonic() - start)))
 
 
-async def async_serial_worker():
-    while metrics.elapsed() < TEST_DURATION_SEC:
-        start = time.monotonic()
-        mock_serial_communication("async_serial")
-        metrics.serial_count += 1
-        elapsed = time.monotonic() - start
-        await asyncio.sleep(max(0, SERIAL_INTERVAL_SEC - elapsed))
+async def async_serial_worker(port: str, stats: SerialStats, until: float):
+    sensor = AsyncMeasuredSensor(await AsyncTFMPSerial.create(port, BAUDRATE), stats)
+    pacer = FramePacer(SERIAL_INTERVAL_SEC, frame_size=sensor.FRAME_SIZE)
+    await async_reader.poll_sensor(sensor, SERIAL_INTERVAL_SEC, until=until, pacer=pacer)
 
 
-async def run_async_mode():
-    executor = ThreadPoolExecutor(max_workers=2)
-    tasks = [async_camera_worker(executor)]
-    tasks.extend([async_serial_worker() for _ in range(SERIAL_PORTS)])
+async def run_async_mode(
+    ports: list[str], stats: list[SerialStats], camera: Camera | None, until: float
+):
+    tasks = [async_serial_worker(port, s, until) for port, s in zip(ports, stats)]
+    if camera is not None:
+        tasks.append(async_camera_worker(camera, until))
     await asyncio.gather(*tasks)
 
 
-# === RUNNER ===
-
-
-def run_threads_mode():
-    threads = [Thread(target=thread_camera_worker)]
-    threads.extend(
-        [
-            Thread(target=thread_serial_worker, args=(f"serial_{i}",))
-            for i in range(SERIAL_PORTS)
-        ]
-    )
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
+# === MODE 3: Reader threads + asyncio consumer ===
 
 
-def monitor_cpu_usage():
-    # Monitor CPU usage every second
-    usage = []
-    for _ in range(TEST_DURATION_SEC):
-        cpu = psutil.cpu_percent(interval=1)
-        usage.append(cpu)
-    return usage
+async def hybrid_consumer(reader: HybridTFMPReader, stats: dict[str, SerialStats], until: float):
+    batches = reader.batches()
+    while (timeout := until - time.monotonic()) > 0:
+        try:
+            batch = await asyncio.wait_for(anext(batches), timeout)
+        except asyncio.TimeoutError:
+            break
+        now = time.monotonic()
+        for reading in batch:
+            # latency up to the application, the handoff included
+            stats[reading.port].record(reading[2:], now)
 
 
-def run_test(mode_name, mode_func):
-    print(f"\n--- Running mode: {mode_name} ---")
-    global metrics
-    metrics = Metrics()
+async def run_hybrid_mode(
+    ports: list[str], stats: list[SerialStats], camera: Camera | None, until: float
+):
+    async with HybridTFMPReader.open(ports, BAUDRATE, SERIAL_INTERVAL_SEC) as reader:
+        tasks = [hybrid_consumer(reader, dict(zip(ports, stats)), until)]
+        if camera is not None:
+            tasks.append(async_camera_worker(camera, until))
+        await asyncio.gather(*tasks)
 
-    monitor_thread = Thread(target=lambda: monitor_cpu_usage(), daemon=True)
-    monitor_thread.start()
 
-    start_cpu = psutil.cpu_percent(interval=None)
-    start_time = time.monotonic()
+# === RUNNER ===
 
-    if mode_name == "async":
-        asyncio.run(mode_func())
-    else:
-        mode_func()
 
-    elapsed = time.monotonic() - start_time
-    end_cpu = psutil.cpu_percent(interval=None)
+def percentile_ms(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q) * 1e3) if values else float("nan")
+
+
+def cpu_seconds(exclude: set[int]) -> float:
+    """cpu time of this process and its children, the writer excluded"""
+    me = psutil.Process()
+    procs = [me] + [p for p in me.children(recursive=True) if p.pid not in exclude]
+    total = 0.0
+    for proc in procs:
+        try:
+            times = proc.cpu_times()
+        except psutil.NoSuchProcess:
+            continue
+        total += times.user + times.system
+    return total
+
+
+def run_test(mode: str, cpu_in: str | None, duration: float, sensors: int, loop: str) -> dict:
+    """one run, `cpu_in=None` without the camera"""
+    label = f"{mode}/{cpu_in or 'idle'}"
+    print(f"\n--- Running mode: {label} ---")
+    pool = new_pool(cpu_in) if cpu_in else None
+    camera = Camera(cpu_in, pool) if cpu_in else None
+
+    with run_pty_pairs(sensors) as pairs:
+        with run_multi_serial_writer(
+            [f"fd:{master}" for master, _ in pairs],
+            baudrate=BAUDRATE,
+            interval=SERIAL_INTERVAL_SEC,
+            wire_chunk=1,
+            pass_fds=tuple(master for master, _ in pairs),
+            stamp=True,
+        ) as writer:
+            ports = [slave for _, slave in pairs]
+            start = time.monotonic()
+            until = start + WARMUP_SEC + duration
+            stats = [SerialStats(start + WARMUP_SEC) for _ in ports]
+            cpu_start = cpu_seconds({writer.pid})
+
+            if mode == "threads":
+                run_threads_mode(ports, stats, camera, until)
+            elif mode == "async":
+                async_reader.run_loop(run_async_mode(ports, stats, camera, until), loop)
+            else:
+                async_reader.run_loop(run_hybrid_mode(ports, stats, camera, until), loop)
+
+            cpu = cpu_seconds({writer.pid}) - cpu_start
+            elapsed = time.monotonic() - start
+    if pool is not None:
+        pool.shutdown()
+
+    latencies = [x for s in stats for x in s.latencies]
+    read = len(latencies)
+    dropped = sum(s.dropped for s in stats)
+    result = {
+        "mode": mode,
+        "cpu_in": cpu_in or "idle",
+        "frames": read,
+        "dropped": dropped,
+        "drop_percent": dropped / max(read + dropped, 1) * 100,
+        "errors": sum(s.errors for s in stats),
+        "latency_ms_p50": percentile_ms(latencies, 50),
+        "latency_ms_p99": percentile_ms(latencies, 99),
+        "latency_ms_max": max(latencies) * 1e3 if latencies else float("nan"),
+        "camera_fps": camera.frames / elapsed if camera else 0.0,
+        "camera_stage_ms_p50": percentile_ms(camera.stage_times, 50) if camera else 0.0,
+        "cpu_percent": cpu / elapsed * 100,
+    }
+    print(
+        f"Serial frames: {read} dropped: {dropped} errors: {result['errors']}"
+        f" latency p50/p99/max: {result['latency_ms_p50']:.2f}/"
+        f"{result['latency_ms_p99']:.2f}/{result['latency_ms_max']:.2f} ms"
+    )
+    if camera:
+        print(f"Camera frames/s: {result['camera_fps']:.2f}")
+    print(f"CPU usage: {result['cpu_percent']:.1f}% of one core")
+    return result
 
-    avg_cpu = psutil.cpu_percent(interval=1)
 
-    print(f"Elapsed time: {elapsed:.2f} sec")
-    print(f"Picamera captures: {metrics.picamera_count}")
-    print(f"Serial messages: {metrics.serial_count}")
-    print(f"Average CPU usage: ~{avg_cpu}%")
+def report(results: list[dict]):
+    print(
+        f"\n{'run':<18} {'frames':>7} {'drop%':>6} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}"
+        f" {'cam/s':>6} {'cpu%':>6} {'p99 x':>6}"
+    )
+    idle = {r["mode"]: r for r in results if r["cpu_in"] == "idle"}
+    for r in results:
+        base = idle.get(r["mode"])
+        inflation = r["latency_ms_p99"] / base["latency_ms_p99"] if base else float("nan")
+        print(
+            f"{r['mode'] + '/' + r['cpu_in']:<18} {r['frames']:>7} {r['drop_percent']:>6.2f}"
+            f" {r['latency_ms_p50']:>7.2f} {r['latency_ms_p99']:>7.2f} {r['latency_ms_max']:>7.2f}"
+            f" {r['camera_fps']:>6.2f} {r['cpu_percent']:>6.1f} {inflation:>6.2f}"
+        )
 
 
 # === MAIN ===
 if __name__ == "__main__":
-    run_test("threads", run_threads_mode)
-    run_test("async", run_async_mode)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lidar Plus Camera Interference Benchmark")
+    parser.add_argument("-m", "--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument(
+        "--cpu-in",
+        nargs="+",
+        default=list(CPU_PLACEMENTS),
+        choices=CPU_PLACEMENTS,
+        help="Where the image work runs",
+    )
+    parser.add_argument(
+        "-d", "--duration", type=float, default=TEST_DURATION_SEC, help="Seconds per run"
+    )
+    parser.add_argument("-n", "--sensors", type=int, default=SERIAL_PORTS)
+    parser.add_argument(
+        "-t", "--type", type=str, default="default", help=f"Event loop, one of {list(async_reader.LOOPS)}"
+    )
+    parser.add_argument("-o", "--output", type=Path, default=None, help="Json result file")
+
+    args = parser.parse_args()
+    results = []
+    for mode in args.modes:
+        for cpu_in in [None, *args.cpu_in]:
+            results.append(run_test(mode, cpu_in, args.duration, args.sensors, args.type))
+    report(results)
+
+    output = args.output
+    if output is None:
+        DEFAULT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        output = DEFAULT_OUTPUT_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    meta = {"created_at": datetime.now().isoformat(timespec="seconds"), **vars(args)}
+    meta["output"] = str(output)
+    output.write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+    print(f"saved to {output}")
@@ -1,21 +1,220 @@
 import sys
+import atexit
 import asyncio
+import selectors
 import uvloop
-from src.async_pi.sensor import AsyncTFMPSerial
+from pathlib import Path
+from typing import Callable
+from src.async_pi.sensor import ERR_HEADER, AsyncTFMPSerial
+from src.sensor.capture import CaptureRecorder
+from src.sensor.clock import Clock, SYSTEM_CLOCK
+from src.sensor.command import frame_rate, reply_time, trigger
+from src.sensor.pacing import FramePacer
+from src.sensor.scheduler import PollScheduler
+from tests.helper.latency_log import AsyncLatencySensor, LatencyLog
+from tests.helper.loop_monitor import LoopMonitor
+from tests.helper.stack_sampler import SAMPLE_INTERVAL, exit_on_sigterm, start_sampler
+
+# directory to record raw received chunks into, set by `--record`
+RECORD_DIR: Path | None = None
+# file to write loop lag and per-task step timings into, set by `--loop-stats`
+LOOP_STATS: Path | None = None
+# `fixed` sleeps `interval` after every update, `adaptive` follows the frames
+PACING: str = "adaptive"
+# `tasks` runs a task per sensor, `wheel` polls all of them from one task,
+# `trigger` asks all of them for a frame at once
+SCHEDULER: str = "tasks"
+# frames per second the sensors are set to on open, `None` leaves them as they are
+FRAME_RATE: int | None = None
+# frame latencies of stamped frames, set by `--latency`
+LATENCY: LatencyLog | None = None
+# after the trigger's frame is due, before the frames are collected
+TRIGGER_MARGIN = 0.001
+
+
+async def open_sensor(port: str, baudrate: int, polled: bool = False) -> AsyncTFMPSerial:
+    sensor = await AsyncTFMPSerial.create(port, baudrate, polled=polled)
+    if RECORD_DIR is not None:
+        recorder = CaptureRecorder(RECORD_DIR / Path(port).name, port=port).start()
+        # chunks are recorded as the port hands them over, see `port.py`
+        sensor._reader.on_data = recorder.record
+        # the writer thread flushes what is still queued
+        atexit.register(recorder.close)
+    if FRAME_RATE is not None:
+        await sensor.request(frame_rate(FRAME_RATE))
+    if LATENCY is not None:
+        sensor = AsyncLatencySensor(sensor, LATENCY)
+    return sensor
 
 
 async def loop_sensor(port: str, baudrate: int, interval: float):
-    sensor = await AsyncTFMPSerial.create(port, baudrate)
-    while True:
+    sensor = await open_sensor(port, baudrate)
+    pacer = FramePacer(interval, frame_size=sensor.FRAME_SIZE) if PACING == "adaptive" else None
+    await poll_sensor(sensor, interval, pacer=pacer)
+
+
+async def poll_sensor(
+    sensor: AsyncTFMPSerial,
+    interval: float,
+    clock: Clock = SYSTEM_CLOCK,
+    until: float | None = None,
+    pacer: FramePacer | None = None,
+):
+    """
+    update every `interval` seconds, until `clock.monotonic()` reaches `until`.
+    with a `pacer`, sleep until just after the next expected frame instead.
+    `asyncio.sleep` follows the loop's clock, which must be `clock`.
+    """
+    if pacer is None:
+        while until is None or clock.monotonic() < until:
+            await sensor.update()
+            await asyncio.sleep(interval)
+        return
+
+    def backlog() -> int:
+        return sensor.in_waiting
+
+    while until is None or clock.monotonic() < until:
+        started = clock.monotonic()
         await sensor.update()
-        await asyncio.sleep(interval)
+        finished = clock.monotonic()
+        delay = pacer.next_delay(started, finished, sensor.status != ERR_HEADER, backlog)
+        # a zero sleep still yields to the other sensors
+        await asyncio.sleep(delay)
+
+
+async def poll_sensors(
+    sensors: list[AsyncTFMPSerial],
+    interval: float,
+    clock: Clock = SYSTEM_CLOCK,
+    until: float | None = None,
+) -> PollScheduler:
+    """
+    poll all `sensors` from one task, woken by one timer wheel instead of a
+    sleep per sensor and a reader callback per port. opened `polled`, a port
+    is read when its sensor is due, not on every arrival.
+    `asyncio.sleep` follows the loop's clock, which must be `clock`.
+    """
+    scheduler = PollScheduler(interval, clock)
+    for sensor in sensors:
+        scheduler.add(sensor)
+    while until is None or clock.monotonic() < until:
+        await asyncio.sleep(scheduler.wait())
+        for sensor in scheduler.due():
+            scheduler.done(sensor, await sensor.update(wait=False))
+    return scheduler
+
+
+async def wheel_sensors(ports: list[str], baudrate: int, interval: float):
+    sensors = await asyncio.gather(
+        *(open_sensor(port, baudrate, polled=True) for port in ports)
+    )
+    await poll_sensors(sensors, interval)
+
+
+async def trigger_sensors(
+    sensors: list[AsyncTFMPSerial],
+    interval: float,
+    settle: float,
+    clock: Clock = SYSTEM_CLOCK,
+    until: float | None = None,
+):
+    """
+    switch `sensors` to on-demand mode and trigger all of them every
+    `interval` seconds. their frames are collected in one wakeup `settle`
+    seconds later, a frame not in by then is read on the next round.
+    `asyncio.sleep` follows the loop's clock, which must be `clock`.
+    """
+    await asyncio.gather(*(sensor.request(frame_rate(0)) for sensor in sensors))
+    command = trigger()
+    deadline = clock.monotonic()
+    while until is None or clock.monotonic() < until:
+        for sensor in sensors:
+            await sensor.send(command)
+        await asyncio.sleep(settle)
+        for sensor in sensors:
+            await sensor.update(wait=False)
+        deadline += interval
+        await asyncio.sleep(max(0.0, deadline - clock.monotonic()))
+
+
+async def triggered_sensors(ports: list[str], baudrate: int, interval: float):
+    sensors = await asyncio.gather(
+        *(open_sensor(port, baudrate, polled=True) for port in ports)
+    )
+    await trigger_sensors(sensors, interval, reply_time(baudrate) + TRIGGER_MARGIN)
 
 
 async def main(ports: list[str], baudrate: int, interval: float):
-    tasks = [loop_sensor(port, baudrate, interval) for port in ports]
+    if SCHEDULER == "wheel":
+        names = ["wheel"]
+        tasks = [wheel_sensors(ports, baudrate, interval)]
+    elif SCHEDULER == "trigger":
+        names = ["trigger"]
+        tasks = [triggered_sensors(ports, baudrate, interval)]
+    else:
+        names = ports
+        tasks = [loop_sensor(port, baudrate, interval) for port in ports]
+    if LOOP_STATS is not None:
+        monitor = LoopMonitor(LOOP_STATS)
+        tasks = [monitor.wrap(name, task) for name, task in zip(names, tasks)]
+        tasks.append(monitor.run())
     await asyncio.gather(*tasks)
 
 
+def _selector_loop(selector: type[selectors.BaseSelector]):
+    return lambda: asyncio.SelectorEventLoop(selector())
+
+
+# event loop backends, `default` is what `asyncio.run` picks (epoll on linux)
+LOOPS: dict[str, Callable[[], asyncio.AbstractEventLoop]] = {
+    "default": asyncio.new_event_loop,
+    "uvloop": uvloop.new_event_loop,
+    "select": _selector_loop(selectors.SelectSelector),
+}
+if hasattr(selectors, "PollSelector"):
+    LOOPS["poll"] = _selector_loop(selectors.PollSelector)
+
+
+def run_loop(coro, type_: str):
+    """`asyncio.run` on the `type_` backend"""
+    loop = LOOPS[type_]()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        try:
+            # like `asyncio.run`, also when SIGTERM ended the run with SystemExit
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def run_profiled(func: Callable[[], object], path: Path):
+    """
+    run `func` under cProfile, stats are dumped to `path` when the harness terminates us.
+    timed in cpu time, waiting in the selector is not what we are after.
+    """
+    import cProfile
+    import time
+
+    # SIGTERM would kill the process before the profile is written
+    exit_on_sigterm()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile(time.process_time)
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -33,19 +232,76 @@ if __name__ == "__main__":
         default=0.01,
         help="Interval in seconds (default: 0.01)",
     )
-    parser.add_argument("-t", "--type", type=str, default="uvloop")
+    parser.add_argument(
+        "-t", "--type", type=str, default="uvloop", help=f"Event loop, one of {list(LOOPS)}"
+    )
+    parser.add_argument(
+        "-r", "--record", type=Path, default=None, help="Record raw input into directory"
+    )
+    parser.add_argument(
+        "-p", "--profile", type=Path, default=None, help="Write cProfile stats to file"
+    )
+    parser.add_argument(
+        "--pacing",
+        type=str,
+        default=PACING,
+        choices=["fixed", "adaptive"],
+        help=f"Sleep between updates (default: {PACING})",
+    )
+    parser.add_argument(
+        "--scheduler",
+        type=str,
+        default=SCHEDULER,
+        choices=["tasks", "wheel", "trigger"],
+        help=f"Task per sensor, one timer wheel or on-demand frames (default: {SCHEDULER})",
+    )
+    parser.add_argument(
+        "--frame-rate", type=int, default=None, help="Set the sensors' frame rate on open"
+    )
+    parser.add_argument(
+        "--latency", type=Path, default=None, help="Write the age of stamped frames to file"
+    )
+    parser.add_argument(
+        "-s", "--sample", type=Path, default=None, help="Write sampled collapsed stacks to file"
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=SAMPLE_INTERVAL,
+        help=f"Cpu seconds between stack samples (default: {SAMPLE_INTERVAL})",
+    )
+
+    parser.add_argument(
+        "-l",
+        "--loop-stats",
+        type=Path,
+        default=None,
+        help="Write loop lag and per-sensor step timings to file",
+    )
 
     args = parser.parse_args()
+    RECORD_DIR = args.record
+    PACING = args.pacing
+    SCHEDULER = args.scheduler
+    FRAME_RATE = args.frame_rate
+    LOOP_STATS = args.loop_stats
+    if args.latency is not None:
+        LATENCY = LatencyLog(args.latency)
+
+    if (type_ := args.type) not in LOOPS:
+        sys.exit("no running type is matching! sensor processor is not working")
+    if LOOP_STATS is not None or RECORD_DIR is not None or LATENCY is not None:
+        # the last report is written while the loop shuts down, the
+        # recorders flush and the latencies are written at exit
+        exit_on_sigterm()
+
+    if args.sample is not None:
+        start_sampler(args.sample, args.sample_interval)
 
-    coro = main(args.port, args.baudrate, args.interval)
+    def run():
+        return run_loop(main(args.port, args.baudrate, args.interval), type_)
 
-    if (type_ := args.type) == "uvloop":
-        uvloop.run(coro)
-    elif type_ == "default":
-        loop = asyncio.get_event_loop_policy().get_event_loop()
-        assert not isinstance(loop, asyncio.BaseEventLoop), (
-            "default event loop is not of `BaseEventLoop`"
-        )
-        asyncio.run(coro)
+    if args.profile is not None:
+        run_profiled(run, args.profile)
     else:
-        sys.exit("no running type is matching! sensor processor is not working")
+        run()
@@ -1,16 +1,160 @@
+import atexit
+import os
 import sys
+import sysconfig
 import time
-from threading import Thread
-from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event, Thread
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from src.blocking_pi.sensor import TFMPSerial
+from src.blocking_pi.sensor import ERR_HEADER, TFMPSerial
+from src.sensor.capture import CaptureRecorder, RecordingSerial
+from src.sensor.clock import Clock, SYSTEM_CLOCK
+from src.sensor.command import frame_rate, reply_time, trigger
+from src.sensor.pacing import FramePacer
+from src.sensor.scheduler import PollScheduler
+from tests.helper.latency_log import LatencyLog, LatencySensor
+from tests.helper.stack_sampler import SAMPLE_INTERVAL, exit_on_sigterm, start_sampler
 
+# directory to record raw received chunks into, set by `--record`
+RECORD_DIR: Path | None = None
+# `fixed` sleeps `interval` after every update, `adaptive` follows the frames
+PACING: str = "adaptive"
+# set on exit, the reader loops return within one sleep
+STOP = Event()
+# frames per second the sensors are set to on open, `None` leaves them as they are
+FRAME_RATE: int | None = None
+# frame latencies of stamped frames, set by `--latency`
+LATENCY: LatencyLog | None = None
+# after the trigger's frame is due, before the frames are collected
+TRIGGER_MARGIN = 0.001
 
-def loop_sensor(port: str, baudrate: int, interval: float):
+
+def open_sensor(port: str, baudrate: int) -> TFMPSerial:
     sensor = TFMPSerial(port, baudrate=baudrate)
-    while True:
+    if RECORD_DIR is not None:
+        recorder = CaptureRecorder(RECORD_DIR / Path(port).name, port=port).start()
+        sensor._serial = RecordingSerial(sensor._serial, recorder)
+        # after `STOP` ended the reader loops, the writer thread flushes what is still queued
+        atexit.register(recorder.close)
+    if FRAME_RATE is not None:
+        sensor.request(frame_rate(FRAME_RATE))
+    if LATENCY is not None:
+        sensor = LatencySensor(sensor, LATENCY)
+    return sensor
+
+
+def loop_sensor(port: str, baudrate: int, interval: float):
+    sensor = open_sensor(port, baudrate)
+    pacer = FramePacer(interval, frame_size=sensor.FRAME_SIZE) if PACING == "adaptive" else None
+    poll_sensor(sensor, interval, pacer=pacer, stop=STOP)
+
+
+def running(clock: Clock, until: float | None, stop: Event | None) -> bool:
+    if until is not None and clock.monotonic() >= until:
+        return False
+    return stop is None or not stop.is_set()
+
+
+def poll_sensor(
+    sensor: TFMPSerial,
+    interval: float,
+    clock: Clock = SYSTEM_CLOCK,
+    until: float | None = None,
+    pacer: FramePacer | None = None,
+    stop: Event | None = None,
+):
+    """
+    update every `interval` seconds, until `clock.monotonic()` reaches `until`
+    or `stop` is set. with a `pacer`, sleep until just after the next expected
+    frame instead.
+    """
+    if pacer is None:
+        while running(clock, until, stop):
+            sensor.update()
+            clock.sleep(interval)
+        return
+
+    def backlog() -> int:
+        return sensor.in_waiting
+
+    while running(clock, until, stop):
+        started = clock.monotonic()
         sensor.update()
-        time.sleep(interval)
+        finished = clock.monotonic()
+        delay = pacer.next_delay(started, finished, sensor.status != ERR_HEADER, backlog)
+        if delay > 0:
+            clock.sleep(delay)
+
+
+def poll_sensors(
+    sensors: list[TFMPSerial],
+    interval: float,
+    clock: Clock = SYSTEM_CLOCK,
+    until: float | None = None,
+    stop: Event | None = None,
+) -> PollScheduler:
+    """poll all `sensors` from one thread, woken by one timer wheel"""
+    scheduler = PollScheduler(interval, clock)
+    for sensor in sensors:
+        scheduler.add(sensor)
+    while running(clock, until, stop):
+        delay = scheduler.wait()
+        if delay > 0:
+            clock.sleep(delay)
+        for sensor in scheduler.due():
+            scheduler.done(sensor, sensor.update(wait=False))
+    return scheduler
+
+
+def trigger_sensors(
+    sensors: list[TFMPSerial],
+    interval: float,
+    settle: float,
+    clock: Clock = SYSTEM_CLOCK,
+    until: float | None = None,
+    stop: Event | None = None,
+):
+    """
+    switch `sensors` to on-demand mode and trigger all of them every
+    `interval` seconds from one thread. their frames are collected `settle`
+    seconds later, a frame not in by then is read on the next round.
+    """
+    for sensor in sensors:
+        sensor.request(frame_rate(0))
+    command = trigger()
+    deadline = clock.monotonic()
+    while running(clock, until, stop):
+        for sensor in sensors:
+            sensor.send(command)
+        clock.sleep(settle)
+        for sensor in sensors:
+            sensor.update(wait=False)
+        deadline += interval
+        if (delay := deadline - clock.monotonic()) > 0:
+            clock.sleep(delay)
+
+
+def run_triggered(ports: list[str], baudrate: int, interval: float):
+    sensors = [open_sensor(port, baudrate) for port in ports]
+    settle = reply_time(baudrate) + TRIGGER_MARGIN
+    thread = Thread(
+        target=trigger_sensors,
+        args=(sensors, interval, settle),
+        kwargs={"stop": STOP},
+        daemon=True,
+    )
+    thread.start()
+    return [thread]
+
+
+def run_in_wheel(ports: list[str], baudrate: int, interval: float):
+    sensors = [open_sensor(port, baudrate) for port in ports]
+    thread = Thread(
+        target=poll_sensors, args=(sensors, interval), kwargs={"stop": STOP}, daemon=True
+    )
+    thread.start()
+    return [thread]
 
 
 def run_in_naive_thread(ports: list[str], baudrate: int, interval: float):
@@ -26,12 +170,27 @@ def run_in_naive_thread(ports: list[str], baudrate: int, interval: float):
 
 def run_in_thread_pool(
     ports: list[str], baudrate: int, interval: float, pool_size: int | None = None
-):
-    with ThreadPoolExecutor(max_workers=pool_size if pool_size else len(ports)) as pool:
-        for port in ports:
-            pool.submit(loop_sensor, port, baudrate, interval)
+) -> tuple[ThreadPoolExecutor, list[Future]]:
+    """
+    `pool_size` workers (default: one per core) each poll a share of the ports
+    from a timer wheel. a reader loop never returns, so a worker per port
+    would leave ports beyond the pool size unread.
+    """
+    workers = min(pool_size or os.cpu_count() or 1, len(ports))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reader")
+    sensors = [open_sensor(port, baudrate) for port in ports]
+    futures = [
+        pool.submit(poll_sensors, sensors[i::workers], interval, stop=STOP)
+        for i in range(workers)
+    ]
+    # the workers are joined at exit, after `STOP` ended their loops
+    pool.shutdown(wait=False)
+    return pool, futures
+
 
-        yield
+def gil_enabled() -> bool:
+    """false on a free-threaded build (3.13t and later) running without the GIL"""
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
 
 
 if __name__ == "__main__":
@@ -51,16 +210,69 @@ if __name__ == "__main__":
         default=0.01,
         help="Interval in seconds (default: 0.001)",
     )
-    parser.add_argument("-t", "--type", type=str, default="naive")
+    parser.add_argument(
+        "-t", "--type", type=str, default="naive", help="naive, pool, wheel or trigger"
+    )
+    parser.add_argument(
+        "--pool-size", type=int, default=None, help="Workers of `-t pool` (default: cores)"
+    )
+    parser.add_argument(
+        "-r", "--record", type=Path, default=None, help="Record raw input into directory"
+    )
+    parser.add_argument(
+        "--pacing",
+        type=str,
+        default=PACING,
+        choices=["fixed", "adaptive"],
+        help=f"Sleep between updates (default: {PACING})",
+    )
+    parser.add_argument(
+        "--frame-rate", type=int, default=None, help="Set the sensors' frame rate on open"
+    )
+    parser.add_argument(
+        "--latency", type=Path, default=None, help="Write the age of stamped frames to file"
+    )
+    parser.add_argument(
+        "-s", "--sample", type=Path, default=None, help="Write sampled collapsed stacks to file"
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=SAMPLE_INTERVAL,
+        help=f"Cpu seconds between stack samples (default: {SAMPLE_INTERVAL})",
+    )
 
     args = parser.parse_args()
+    RECORD_DIR = args.record
+    PACING = args.pacing
+    FRAME_RATE = args.frame_rate
+    if args.latency is not None:
+        LATENCY = LatencyLog(args.latency)
+    if RECORD_DIR is not None or LATENCY is not None:
+        # SIGTERM would kill the process with records still queued
+        # and the latencies unwritten
+        exit_on_sigterm()
+    if args.sample is not None:
+        start_sampler(args.sample, args.sample_interval)
+
+    if sysconfig.get_config_var("Py_GIL_DISABLED"):
+        # an extension without free-threading support turns the GIL back on
+        print(f"free-threaded build, gil enabled: {gil_enabled()}", file=sys.stderr)
 
     if (type_ := args.type) == "pool":
-        run_in_thread_pool(args.port, args.baudrate, args.interval)
+        run_in_thread_pool(args.port, args.baudrate, args.interval, args.pool_size)
     elif type_ == "naive":
         run_in_naive_thread(args.port, args.baudrate, args.interval)
+    elif type_ == "wheel":
+        run_in_wheel(args.port, args.baudrate, args.interval)
+    elif type_ == "trigger":
+        run_triggered(args.port, args.baudrate, args.interval)
     else:
         sys.exit("no running type is matching! sensor processor is not working")
 
-    while True:
-        time.sleep(1)
+    try:
+        while True:
+            time.sleep(1)
+    finally:
+        # SIGTERM under `--sample` exits here, the pool workers are joined next
+        STOP.set()
@@ -0,0 +1,54 @@
+import numpy as np
+
+RESAMPLES = 10000
+
+
+def bootstrap_ci(
+    values, confidence: float = 0.95, seed: int = 0
+) -> tuple[float, float]:
+    """percentile bootstrap confidence interval of the mean"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return float("nan"), float("nan")
+
+    rng = np.random.default_rng(seed)
+    means = rng.choice(values, (RESAMPLES, len(values))).mean(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    lo, hi = np.percentile(means, [tail, 100 - tail])
+    return float(lo), float(hi)
+
+
+def bootstrap_diff_ci(
+    a, b, confidence: float = 0.95, seed: int = 0
+) -> tuple[float, float]:
+    """percentile bootstrap confidence interval of `mean(a) - mean(b)`"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if len(a) < 2 or len(b) < 2:
+        return float("nan"), float("nan")
+
+    rng = np.random.default_rng(seed)
+    diffs = (
+        rng.choice(a, (RESAMPLES, len(a))).mean(axis=1)
+        - rng.choice(b, (RESAMPLES, len(b))).mean(axis=1)
+    )
+    tail = (1 - confidence) / 2 * 100
+    lo, hi = np.percentile(diffs, [tail, 100 - tail])
+    return float(lo), float(hi)
+
+
+def hedges_g(a, b) -> float:
+    """standardized mean difference of `a` and `b` with small sample correction"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    n1, n2 = len(a), len(b)
+    if n1 < 2 or n2 < 2:
+        return float("nan")
+
+    pooled = np.sqrt(
+        ((n1 - 1) * a.var(ddof=1) + (n2 - 1) * b.var(ddof=1)) / (n1 + n2 - 2)
+    )
+    if pooled == 0:
+        return float("nan")
+    correction = 1 - 3 / (4 * (n1 + n2) - 9)
+    return float((a.mean() - b.mean()) / pooled * correction)
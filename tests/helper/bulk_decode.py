@@ -0,0 +1,272 @@
+"""
+offline bulk decoder for capture files
+
+re-synchronizes on the header of a `Frame` subclass and decodes every frame of
+one or more captures with numpy, one chunk of payload at a time. every capture
+is written as columns (`timestamp`, `offset`, `status` and the frame fields) to
+`.npz`, or `.parquet` when pyarrow is installed.
+
+synchronization follows the reader engines: the earliest header wins and its
+`SIZE` bytes are consumed whether the checksum matches (OK) or not (ERR_CHECKSUM).
+
+usage:
+    python -m tests.helper.bulk_decode captures/ttyUSB0 captures/ttyUSB1 -o decoded
+"""
+
+import argparse
+import importlib
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, fields
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+
+from src.blocking_pi.sensor import ERR_CHECKSUM, OK
+from src.sensor.capture import RECORD, CaptureFile
+from src.sensor.frame import Frame, TFMPData
+from src.sensor.replay import resolve_captures
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def decode_tfmp(frames: np.ndarray) -> dict[str, np.ndarray]:
+    """vectorized `TFMPData.parse` over rows of raw frames"""
+    f = frames.astype(np.int32)
+    return {
+        "distance": f[:, 2] | (f[:, 3] << 8),
+        "intensity": f[:, 4] | (f[:, 5] << 8),
+        "temperature": ((f[:, 6] | (f[:, 7] << 8)) >> 3) - 256,
+    }
+
+
+# vectorized decoders, other frames fall back to `Frame.parse` per frame
+COLUMN_DECODERS: dict[type[Frame], Callable[[np.ndarray], dict[str, np.ndarray]]] = {
+    TFMPData: decode_tfmp,
+}
+
+
+def decode_columns(frame_cls: type[Frame], frames: np.ndarray) -> dict[str, np.ndarray]:
+    if frame_cls in COLUMN_DECODERS:
+        return COLUMN_DECODERS[frame_cls](frames)
+
+    names = [f.name for f in fields(frame_cls)]
+    rows = [astuple(frame_cls.parse(bytes(row))) for row in frames]
+    if not rows:
+        return {name: np.empty(0) for name in names}
+    return {name: np.asarray(col) for name, col in zip(names, zip(*rows))}
+
+
+def iter_payload(
+    files: list[Path], chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """yield the received bytes of captures with the timestamp of every byte"""
+    for path in files:
+        with CaptureFile(path) as capture:
+            data_offset = capture.data_offset
+        if data_offset >= capture.size:
+            # no records, e.g. the recorder was killed before its first flush
+            continue
+        with open(path, "rb") as f:
+            raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # record headers are parsed with struct, payload is gathered through numpy
+        buf = np.frombuffer(raw, np.uint8)
+        end = len(buf)
+
+        offset = data_offset
+        while offset + RECORD.size <= end:
+            starts, lengths, timestamps = [], [], []
+            size = 0
+            while offset + RECORD.size <= end and size < chunk_bytes:
+                timestamp, length = RECORD.unpack_from(raw, offset)
+                offset += RECORD.size
+                if offset + length > end:
+                    # truncated last record
+                    offset = end
+                    break
+                starts.append(offset)
+                lengths.append(length)
+                timestamps.append(timestamp)
+                size += length
+                offset += length
+
+            if not starts:
+                break
+            starts_ = np.asarray(starts, np.int64)
+            lengths_ = np.asarray(lengths, np.int64)
+            # gather indices: every record's start repeated over its length plus a running index
+            shift = np.repeat(starts_ - (np.cumsum(lengths_) - lengths_), lengths_)
+            yield buf[shift + np.arange(size)], np.repeat(
+                np.asarray(timestamps, np.int64), lengths_
+            )
+
+
+def select_frames(candidates: np.ndarray, size: int, start: int = 0) -> np.ndarray:
+    """greedy earliest-first selection of non-overlapping frame starts"""
+    candidates = candidates[candidates >= start]
+    if len(candidates) < 2 or (np.diff(candidates) >= size).all():
+        return candidates
+
+    selected = []
+    next_free = start
+    for position in candidates.tolist():
+        if position >= next_free:
+            selected.append(position)
+            next_free = position + size
+    return np.asarray(selected, np.int64)
+
+
+class StreamDecoder:
+    def __init__(self, frame_cls: type[Frame]):
+        self.frame_cls = frame_cls
+        self.header = np.frombuffer(frame_cls.HEADER, np.uint8)
+        self.size = frame_cls.SIZE
+
+        self._carry = np.empty(0, np.uint8)
+        self._carry_ts = np.empty(0, np.int64)
+        self._consumed = 0  # stream offset of `_carry[0]`
+
+        self.skipped_bytes = 0
+        self.checksum_errors = 0
+        self.frames = 0
+
+    def feed(self, data: np.ndarray, timestamps: np.ndarray) -> dict[str, np.ndarray]:
+        buf = np.concatenate([self._carry, data])
+        ts = np.concatenate([self._carry_ts, timestamps])
+        size = self.size
+
+        # every position where a whole frame fits and the header matches
+        n = len(buf) - size + 1
+        if n > 0:
+            mask = np.ones(n, bool)
+            for i, byte in enumerate(self.header):
+                mask &= buf[i : i + n] == byte
+            starts = select_frames(np.flatnonzero(mask), size)
+        else:
+            starts = np.empty(0, np.int64)
+
+        if n > 0:
+            frames = np.lib.stride_tricks.sliding_window_view(buf, size)[starts]
+        else:
+            frames = np.empty((0, size), np.uint8)
+        checksum = frames[:, :-1].sum(axis=1, dtype=np.uint32) & 0xFF
+        valid = checksum == frames[:, -1]
+
+        columns = {
+            "timestamp": ts[starts + size - 1],
+            "offset": starts + self._consumed,
+            "status": np.where(valid, OK, ERR_CHECKSUM).astype(np.uint8),
+        }
+        decoded = decode_columns(self.frame_cls, frames[valid])
+        for name, values in decoded.items():
+            column = np.zeros(len(starts), values.dtype if len(values) else np.float64)
+            column[valid] = values
+            columns[name] = column
+
+        # bytes before `rest` are settled, the tail may still start a frame
+        last_end = starts[-1] + size if len(starts) else 0
+        rest = max(last_end, max(n, 0))
+        self.skipped_bytes += rest - len(starts) * size
+        self.checksum_errors += int((~valid).sum())
+        self.frames += int(valid.sum())
+
+        self._carry, self._carry_ts = buf[rest:].copy(), ts[rest:].copy()
+        self._consumed += rest
+        return columns
+
+    def finish(self):
+        self.skipped_bytes += len(self._carry)
+        self._carry = self._carry[:0]
+        self._carry_ts = self._carry_ts[:0]
+
+
+def decode_capture(
+    source: Path, frame_cls: type[Frame], output: Path, fmt: str = "auto"
+) -> dict[str, int | str]:
+    files = resolve_captures(source)
+    decoder = StreamDecoder(frame_cls)
+    parts: list[dict[str, np.ndarray]] = []
+    for data, timestamps in iter_payload(files):
+        parts.append(decoder.feed(data, timestamps))
+    decoder.finish()
+
+    columns = {
+        name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0)
+        for name in (parts[0] if parts else ["timestamp", "offset", "status"])
+    }
+    with CaptureFile(files[0]) as capture:
+        port = capture.port
+    counts = {
+        "frames": decoder.frames,
+        "checksum_errors": decoder.checksum_errors,
+        "skipped_bytes": decoder.skipped_bytes,
+    }
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet" or (fmt == "auto" and pa is not None):
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed, use `--format npz`")
+        path = output.with_suffix(".parquet")
+        table = pa.table(columns).replace_schema_metadata(
+            {"port": port, **{k: str(v) for k, v in counts.items()}}
+        )
+        pq.write_table(table, path)
+    else:
+        path = output.with_suffix(".npz")
+        np.savez(path, port=port, **counts, **columns)
+
+    return {"source": str(source), "output": str(path), "port": port, **counts}
+
+
+def load_frame_class(spec: str) -> type[Frame]:
+    """`module:ClassName`, e.g. `src.sensor.frame:TFMPData`"""
+    module_name, _, class_name = spec.partition(":")
+    frame_cls = getattr(importlib.import_module(module_name), class_name)
+    if not issubclass(frame_cls, Frame):
+        raise TypeError(f"{spec} is not a `Frame` subclass")
+    return frame_cls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk Decode Capture Files")
+    parser.add_argument(
+        "capture", type=Path, nargs="+", help="Capture files or recorder prefixes"
+    )
+    parser.add_argument("-o", "--output", type=Path, default=Path("decoded"))
+    parser.add_argument(
+        "-f",
+        "--frame",
+        type=str,
+        default="src.sensor.frame:TFMPData",
+        help="Frame subclass as module:ClassName (default: src.sensor.frame:TFMPData)",
+    )
+    parser.add_argument(
+        "--format", choices=["auto", "npz", "parquet"], default="auto"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Worker processes (default: cpu count)"
+    )
+    args = parser.parse_args()
+
+    frame_cls = load_frame_class(args.frame)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = pool.map(
+            decode_capture,
+            args.capture,
+            [frame_cls] * len(args.capture),
+            [args.output / c.name for c in args.capture],
+            [args.format] * len(args.capture),
+        )
+        for r in results:
+            print(
+                f"[✓] {r['source']} ({r['port']}) -> {r['output']}: "
+                f"frames={r['frames']} checksum_errors={r['checksum_errors']} "
+                f"skipped_bytes={r['skipped_bytes']}"
+            )
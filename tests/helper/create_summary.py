@@ -1,44 +1,142 @@
 import re
 import matplotlib.pyplot as plt
+import numpy as np
 import json
 import argparse
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
-from itertools import cycle
+from itertools import cycle, islice
+
+from tests.helper.bootstrap import bootstrap_ci, bootstrap_diff_ci, hedges_g
+from tests.helper.metric_log import read_header
 
 
 _color_cycle = cycle(plt.rcParams['axes.prop_cycle'].by_key()['color'])
 
+# upper bound of points per line, plotting every sample of a soak run is slow
+MAX_PLOT_POINTS = 2000
+
 
 @lru_cache(maxsize=None)
 def get_color_for_mode(mode: str) -> str:
     return next(_color_cycle)
 
 
-def parse_log(file_path):
-    timestamps, cpu_usages, rss_usages = [], [], []
-    read_counts, write_counts = [], []
-    read_bytes, write_bytes, num_threads = [], [], []
+LOG_FIELDS = [
+    "timestamp",
+    "cpu_percent",
+    "memory_rss",
+    "read_counts",
+    "write_counts",
+    "read_bytes",
+    "write_bytes",
+    "num_threads",
+    "voluntary_ctx_switches",
+    "involuntary_ctx_switches",
+    "minor_faults",
+    "major_faults",
+    "run_delay_ns",
+    "run_timeslices",
+]
+
+
+def parse_log(file_path, chunk_size: int = 65536) -> dict[str, np.ndarray]:
+    file_path = Path(file_path)
+    if file_path.suffix == ".bin":
+        columns = parse_binary_log(file_path)
+    else:
+        columns = parse_jsonl_log(file_path, chunk_size)
+
+    columns["memory_rss"] = columns["memory_rss"] / 1024 / 1024  # convert to MB
+    return columns
+
+
+def parse_jsonl_log(file_path: Path, chunk_size: int) -> dict[str, np.ndarray]:
+    """stream a jsonl log into float64 columns, `chunk_size` lines at a time"""
+    chunks = {name: [] for name in LOG_FIELDS}
 
     with open(file_path) as f:
-        for line in f:
-            j = json.loads(line)
-            timestamps.append(float(j.get("timestamp")))
-            cpu_usages.append(float(j.get("cpu_percent")))
-            rss_usages.append(int(j.get("memory_rss")) / 1024 / 1024)  # convert to MB
-            read_counts.append(int(j.get("read_counts")))
-            write_counts.append(int(j.get("write_counts")))
-            read_bytes.append(int(j.get("read_bytes")))
-            write_bytes.append(int(j.get("write_bytes")))
-            num_threads.append(int(j.get("num_threads")))
+        while lines := list(islice(f, chunk_size)):
+            rows = [json.loads(line) for line in lines]
+            for name in LOG_FIELDS:
+                # logs written before a field was introduced count as zero
+                chunks[name].append(
+                    np.fromiter((j.get(name, 0) for j in rows), np.float64, len(rows))
+                )
+
+    return {
+        name: np.concatenate(c) if c else np.empty(0, np.float64)
+        for name, c in chunks.items()
+    }
+
 
-    return timestamps, cpu_usages, rss_usages, read_counts, write_counts, read_bytes, write_bytes, num_threads
+def parse_binary_log(file_path: Path) -> dict[str, np.ndarray]:
+    fields, offset = read_header(file_path)
+    dtype = np.dtype([(name, "<f8") for name in fields])
+    # a monitor killed mid-write may leave a partial record behind
+    count = (file_path.stat().st_size - offset) // dtype.itemsize
+    if count == 0:
+        records = np.empty(0, dtype)
+    else:
+        records = np.memmap(file_path, dtype, mode="r", offset=offset, shape=(count,))
+
+    return {
+        name: records[name] if name in fields else np.zeros(count)
+        for name in LOG_FIELDS
+    }
 
 
-def normalize_timestamps(timestamps):
-    base = timestamps[0]
-    return [t - base for t in timestamps]
+def counter_rate(timestamps: np.ndarray, counter: np.ndarray) -> float:
+    """average increase per second of a cumulative counter"""
+    if len(timestamps) < 2 or timestamps[-1] == timestamps[0]:
+        return 0.0
+    return float((counter[-1] - counter[0]) / (timestamps[-1] - timestamps[0]))
+
+
+def aggregate(log: dict[str, np.ndarray]) -> dict[str, float]:
+    ts = log["timestamp"]
+    cpu, rss = log["cpu_percent"], log["memory_rss"]
+    cpu_p50, cpu_p95, cpu_p99 = np.percentile(cpu, [50, 95, 99])
+    timeslices = log["run_timeslices"][-1] - log["run_timeslices"][0]
+    delay = log["run_delay_ns"][-1] - log["run_delay_ns"][0]
+
+    return {
+        "cpu": float(cpu.mean()),
+        "cpu_p50": float(cpu_p50),
+        "cpu_p95": float(cpu_p95),
+        "cpu_p99": float(cpu_p99),
+        "rss": float(rss.mean()),
+        "rss_p95": float(np.percentile(rss, 95)),
+        "rss_max": float(rss.max()),
+        "read_cnt": float(log["read_counts"].mean()),
+        "write_cnt": float(log["write_counts"].mean()),
+        "read_bytes": float(log["read_bytes"].max()),
+        "write_bytes": float(log["write_bytes"].max()),
+        "read_rate": counter_rate(ts, log["read_bytes"]),
+        "write_rate": counter_rate(ts, log["write_bytes"]),
+        "threads": float(log["num_threads"].mean()),
+        # every voluntary context switch is a sleep followed by a wakeup
+        "wakeups": counter_rate(ts, log["voluntary_ctx_switches"]),
+        "preemptions": counter_rate(ts, log["involuntary_ctx_switches"]),
+        "syscalls": counter_rate(ts, log["read_counts"])
+        + counter_rate(ts, log["write_counts"]),
+        "minor_faults": counter_rate(ts, log["minor_faults"]),
+        "major_faults": counter_rate(ts, log["major_faults"]),
+        # run-queue delay: ms spent runnable but waiting for a cpu, per second of runtime
+        "run_delay": counter_rate(ts, log["run_delay_ns"]) / 1e6,
+        "delay_per_slice": float(delay / timeslices / 1e3) if timeslices else 0.0,
+    }
+
+
+def decimate(values: np.ndarray) -> np.ndarray:
+    step = max(1, len(values) // MAX_PLOT_POINTS)
+    return values[::step]
+
+
+def normalize_timestamps(timestamps: np.ndarray) -> np.ndarray:
+    return timestamps - timestamps[0]
 
 
 def plot_dual_axis_metric(
@@ -143,25 +241,179 @@ def make_readme(readme_path, averages: dict):
     readme_path.write_text("\n".join(readme_lines), encoding="utf-8")
 
 
-def parse_filename(filename: str) -> tuple[str, str]:
-    match = re.match(r"(?P<mode>\w+?)_(?P<params>.+)\.log", filename)
+# metrics compared across repetitions: key of `aggregate` -> label
+TRIAL_METRICS = {
+    "cpu": "Avg CPU (%)",
+    "rss": "Avg RSS (MB)",
+    "wakeups": "Wakeups/s",
+    "syscalls": "Syscalls/s",
+}
+
+
+def parse_filename(filename: str) -> tuple[str, str, int]:
+    """split `<mode>_<params>[__rep-<n>].log` into mode, params and repetition"""
+    match = re.match(
+        r"(?P<mode>[\w-]+?)_(?P<params>.+?)(__rep-(?P<rep>\d+))?\.(log|bin)$", filename
+    )
     if not match:
-        return None, None
+        return None, None, None
     mode = match.group("mode")
     params_str = match.group("params")
-    return mode, params_str
+    repetition = int(match.group("rep") or 0)
+    return mode, params_str, repetition
+
+
+def summarize_trials(trials: dict[str, list[dict[str, float]]]) -> list[str]:
+    """bootstrap confidence intervals per mode and effect sizes between modes"""
+    modes = sorted(trials.keys())
+    readme_lines = [
+        "",
+        "| Mode | Metric | Mean | 95% CI | Trials |",
+        "|------|--------|------|--------|--------|",
+    ]
+    for mode in modes:
+        for key, label in TRIAL_METRICS.items():
+            values = [t[key] for t in trials[mode]]
+            lo, hi = bootstrap_ci(values)
+            readme_lines.append(
+                f"| {mode} | {label} | {np.mean(values):.2f} | [{lo:.2f}, {hi:.2f}] | {len(values)} |"
+            )
 
+    readme_lines.extend(
+        [
+            "",
+            "| Comparison | Metric | Mean Diff | 95% CI | Hedges' g |",
+            "|------------|--------|-----------|--------|-----------|",
+        ]
+    )
+    for i, a in enumerate(modes):
+        for b in modes[i + 1 :]:
+            for key, label in TRIAL_METRICS.items():
+                va = [t[key] for t in trials[a]]
+                vb = [t[key] for t in trials[b]]
+                lo, hi = bootstrap_diff_ci(va, vb)
+                readme_lines.append(
+                    f"| {a} - {b} | {label} | {np.mean(va) - np.mean(vb):+.2f} | [{lo:+.2f}, {hi:+.2f}] | {hedges_g(va, vb):+.2f} |"
+                )
+    return readme_lines
+
+
+def summarize_group(
+    dir: Path, param_str: str, files: dict[str, list[Path]]
+) -> list[str]:
+    cpu = {}
+    rss = {}
+    time = {}
+    read_count = {}
+    write_count = {}
+    stats = {}
+    trials = {}
+
+    for mode, paths in files.items():
+        for path in paths:
+            log = parse_log(path)
+            if len(log["timestamp"]) == 0:
+                continue
+
+            if mode not in trials:
+                # plots show the first repetition
+                time[mode] = decimate(normalize_timestamps(log["timestamp"]))
+                cpu[mode] = decimate(log["cpu_percent"])
+                rss[mode] = decimate(log["memory_rss"])
+                read_count[mode] = decimate(log["read_counts"])
+                write_count[mode] = decimate(log["write_counts"])
+            trials.setdefault(mode, []).append(aggregate(log))
+
+        # point estimates average the repetitions
+        if mode in trials:
+            stats[mode] = {
+                key: float(np.mean([t[key] for t in trials[mode]]))
+                for key in trials[mode][0]
+            }
+
+    if len(cpu) < 2:
+        print(f"[!] Not enough modes for {param_str}. Skipping plot")
+        return []
+
+    img_dir = dir / "img" / param_str
+    img_dir.mkdir(parents=True, exist_ok=True)
+
+    plot_dual_axis_metric(
+        time_data=time,
+        left_metric_data=cpu,
+        right_metric_data=rss,
+        left_label="CPU (%)",
+        right_label="RSS (MB)",
+        title=f"CPU & Memory Usage Over Time ({param_str})",
+        save_as=img_dir / "cpu_rss_comparison",
+    )
+    plot_dual_axis_metric(
+        time_data=time,
+        left_metric_data=read_count,
+        right_metric_data=write_count,
+        left_label="Read Count",
+        right_label="Write Count",
+        title="Disk I/O Over Time",
+        save_as=img_dir / "io_comparision.png",
+    )
+
+    print(f"[✓] Plots for {param_str} saved to {img_dir}")
+
+    readme_lines = [
+        f"### Params: `{param_str}`",
+        "",
+        f"![CPU&RSS](./img/{param_str}/cpu_rss_comparison.png)",
+        f"![READ&WRITE](./img/{param_str}/io_comparision.png)",
+        "",
+        "| Mode | Avg CPU (%) | Avg RSS (MB) | Total Read Bytes | Total Write Bytes | Avg Read Count | Avg Write Count | Avg # of Threads |",
+        "|------|-------------|--------------|------------------|-------------------|----------------|-----------------|------------------|",
+    ]
+    for mode in sorted(stats.keys()):
+        m = stats[mode]
+        readme_lines.append(
+            f"| {mode} | {m['cpu']:.2f} | {m['rss']:.2f} | {m['read_bytes']:.1f} | {m['write_bytes']:.1f} | {m['read_cnt']:.1f} | {m['write_cnt']:.1f} | {m['threads']:.1f} |"
+        )
+    readme_lines.extend(
+        [
+            "",
+            "| Mode | CPU p50 (%) | CPU p95 (%) | CPU p99 (%) | RSS p95 (MB) | RSS Max (MB) | Read (B/s) | Write (B/s) |",
+            "|------|-------------|-------------|-------------|--------------|--------------|------------|-------------|",
+        ]
+    )
+    for mode in sorted(stats.keys()):
+        m = stats[mode]
+        readme_lines.append(
+            f"| {mode} | {m['cpu_p50']:.2f} | {m['cpu_p95']:.2f} | {m['cpu_p99']:.2f} | {m['rss_p95']:.2f} | {m['rss_max']:.2f} | {m['read_rate']:.1f} | {m['write_rate']:.1f} |"
+        )
+    readme_lines.extend(
+        [
+            "",
+            "| Mode | Wakeups/s | Involuntary CS/s | Syscalls/s | Minor Faults/s | Major Faults/s | Run-queue Delay (ms/s) | Delay per Slice (us) |",
+            "|------|-----------|------------------|------------|----------------|----------------|------------------------|----------------------|",
+        ]
+    )
+    for mode in sorted(stats.keys()):
+        m = stats[mode]
+        readme_lines.append(
+            f"| {mode} | {m['wakeups']:.1f} | {m['preemptions']:.1f} | {m['syscalls']:.1f} | {m['minor_faults']:.1f} | {m['major_faults']:.2f} | {m['run_delay']:.3f} | {m['delay_per_slice']:.1f} |"
+        )
+    if max(len(t) for t in trials.values()) > 1:
+        readme_lines.extend(summarize_trials(trials))
+    readme_lines.append("")
 
-def summarize_results(dir: Path):
-    log_files = list(dir.glob("*.log"))
-    result_groups = defaultdict(dict)
+    return readme_lines
 
-    for f in log_files:
-        mode, param_str = parse_filename(f.name)
+
+def summarize_results(dir: Path, jobs: int | None = None):
+    result_groups = defaultdict(lambda: defaultdict(dict))
+
+    for f in sorted(dir.glob("*.log")) + sorted(dir.glob("*.bin")):
+        mode, param_str, repetition = parse_filename(f.name)
         if not param_str:
             continue
 
-        result_groups[param_str][mode] = f
+        # binary logs are listed last, so they win over a jsonl log of the same run
+        result_groups[param_str][mode][repetition] = f
 
     readme_lines = [
         "# Metric Graphs",
@@ -170,93 +422,129 @@ def summarize_results(dir: Path):
         "",
     ]
 
-    for param_str, files in sorted(result_groups.items()):
-        cpu = defaultdict(list)
-        rss = defaultdict(list)
-        time = defaultdict(list)
-        read_count = defaultdict(list)
-        write_count = defaultdict(list)
-        threads = defaultdict(list)
-
-        avg_cpu = defaultdict(float)
-        avg_rss = defaultdict(float)
-        avg_read_cnt = defaultdict(float)
-        avg_write_cnt = defaultdict(float)
-        total_read_bytes = defaultdict(int)
-        total_write_bytes = defaultdict(int)
-        avg_threads = defaultdict(float)
-
-        for mode, path in files.items():
-            timestamps, cpu_, rss_, rc, wc, read_, write_, threads_ = parse_log(path)
-
-            time[mode] = normalize_timestamps(timestamps)
-            cpu[mode] = cpu_
-            rss[mode] = rss_
-            read_count[mode] = rc
-            write_count[mode] = wc
-            threads[mode] = threads_
-
-            avg_cpu[mode] = sum(cpu_) / len(cpu_) if cpu_ else 0.0
-            avg_rss[mode] = sum(rss_) / len(rss_) if rss_ else 0.0
-            avg_read_cnt[mode] = sum(rc) / len(rc) if rc else 0
-            avg_write_cnt[mode] = sum(wc) / len(wc) if wc else 0
-            total_read_bytes[mode] = max(read_)
-            total_write_bytes[mode] = max(write_)
-            avg_threads[mode] = sum(threads_) / len(threads_) if threads_ else 0.0
-
-        if len(cpu) < 2:
-            print(f"[!] Not enough modes for {param_str}. Skipping plot")
-            continue
+    groups = [
+        (p, {mode: [reps[r] for r in sorted(reps)] for mode, reps in modes.items()})
+        for p, modes in sorted(result_groups.items())
+    ]
+    if jobs == 1:
+        sections = [summarize_group(dir, p, files) for p, files in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            sections = pool.map(
+                summarize_group,
+                [dir] * len(groups),
+                [p for p, _ in groups],
+                [files for _, files in groups],
+            )
+            sections = list(sections)
 
-        img_dir = dir / "img" / param_str
-        img_dir.mkdir(parents=True, exist_ok=True)
-
-        plot_dual_axis_metric(
-            time_data=time,
-            left_metric_data=cpu,
-            right_metric_data=rss,
-            left_label="CPU (%)",
-            right_label="RSS (MB)",
-            title=f"CPU & Memory Usage Over Time ({param_str})",
-            save_as=img_dir / "cpu_rss_comparison",
-        )
-        plot_dual_axis_metric(
-            time_data=time,
-            left_metric_data=read_count,
-            right_metric_data=write_count,
-            left_label="Read Count",
-            right_label="Write Count",
-            title="Disk I/O Over Time",
-            save_as=img_dir / "io_comparision.png",
-        )
+    for section in sections:
+        readme_lines.extend(section)
 
-        print(f"[✓] Plots for {param_str} saved to {img_dir}")
+    readme_path = dir / "README.md"
+    readme_path.write_text("\n".join(readme_lines), encoding="utf-8")
+    # make_readme(dir / "README.md", avg_cpu, avg_rss)
+
+
+# functions listed per profile, by own time
+PROFILE_TOP = 15
 
+
+def summarize_profiles(dir: Path):
+    """top functions by own time of every `profiles/*.pstats` of a run"""
+    import pstats
+
+    profiles = sorted((dir / "profiles").glob("*.pstats"))
+    if not profiles:
+        return
+
+    readme_lines = ["# Profiles", ""]
+    for path in profiles:
+        stats = pstats.Stats(str(path))
+        total = stats.total_tt or 1.0
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
         readme_lines.extend(
             [
-                f"### Params: `{param_str}`",
-                "",
-                f"![CPU&RSS](./img/{param_str}/cpu_rss_comparison.png)",
-                f"![READ&WRITE](./img/{param_str}/io_comparision.png)",
+                f"### `{path.stem}`",
                 "",
-                "| Mode | Avg CPU (%) | Avg RSS (MB) | Total Read Bytes | Total Write Bytes | Avg Read Count | Avg Write Count | Avg # of Threads |",
-                "|------|-------------|--------------|------------------|-------------------|----------------|-----------------|------------------|",
+                "| Function | Calls | Own Time (s) | Own (%) | Cumulative (s) |",
+                "|----------|-------|--------------|---------|----------------|",
             ]
         )
-        for mode in sorted(avg_cpu.keys()):
+        for (file, line, func), (_, calls, tottime, cumtime, _) in rows[:PROFILE_TOP]:
+            name = f"{Path(file).name}:{line}({func})"
             readme_lines.append(
-                f"| {mode} | {avg_cpu[mode]:.2f} | {avg_rss[mode]:.2f} | {total_read_bytes[mode]:.1f} | {total_write_bytes[mode]:.1f} | {avg_read_cnt[mode]:.1f} | {avg_write_cnt[mode]:.1f} | {avg_threads[mode]:.1f} |"
+                f"| `{name}` | {calls} | {tottime:.3f} | {tottime / total * 100:.1f} | {cumtime:.3f} |"
             )
         readme_lines.append("")
 
-    readme_path = dir / "README.md"
-    readme_path.write_text("\n".join(readme_lines), encoding="utf-8")
-    # make_readme(dir / "README.md", avg_cpu, avg_rss)
+    (dir / "profiles" / "README.md").write_text("\n".join(readme_lines), encoding="utf-8")
+
+
+# loop lag at which the async engine is at capacity: half its read timeout
+# (`AsyncTFMPSerial.TIME_OUT`), later reads start failing with `ERR_HEADER`
+LAG_BUDGET_MS = 5.0
+
+
+def parse_loop_stats(path: Path) -> tuple[np.ndarray, list[dict]]:
+    """lag samples in ms and the per-interval task counters of a `loop_monitor` file"""
+    lags, reports = [], []
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            lags.extend(row["lag_ms"])
+            reports.append(row)
+    return np.asarray(lags, np.float64), reports
+
+
+def summarize_loop_stats(dir: Path):
+    """loop lag and slow steps per async run, from `loop/*.jsonl`"""
+    files = sorted((dir / "loop").glob("*.jsonl"))
+    if not files:
+        return
+
+    readme_lines = [
+        "# Event Loop",
+        "",
+        f"at capacity once lag p99 reaches {LAG_BUDGET_MS} ms, half the read timeout",
+        "",
+        "| Run | Lag p50 (ms) | Lag p99 (ms) | Lag Max (ms) | Loop Busy (%) | Slow Steps/s | Worst Step (ms) | Busiest Task | At Capacity |",
+        "|-----|--------------|--------------|--------------|---------------|--------------|-----------------|--------------|-------------|",
+    ]
+    for path in files:
+        lags, reports = parse_loop_stats(path)
+        if not len(lags) or len(reports) < 2:
+            continue
+        elapsed = reports[-1]["timestamp"] - reports[0]["timestamp"]
+        # the first report covers startup, counters are per report
+        busy, slow, worst = defaultdict(float), 0, 0.0
+        for report in reports[1:]:
+            for name, task in report["tasks"].items():
+                busy[name] += task["busy_ms"]
+                slow += task["slow"]
+                worst = max(worst, task["max_ms"])
+
+        p50, p99 = np.percentile(lags, [50, 99])
+        busiest = max(busy, key=busy.get) if busy else "-"
+        readme_lines.append(
+            f"| {path.stem} | {p50:.3f} | {p99:.3f} | {lags.max():.3f} | {sum(busy.values()) / elapsed / 10:.1f} | {slow / elapsed:.2f} | {worst:.3f} | {busiest} | {'yes' if p99 >= LAG_BUDGET_MS else 'no'} |"
+        )
+    readme_lines.append("")
+    (dir / "loop" / "README.md").write_text("\n".join(readme_lines), encoding="utf-8")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--id", required=True, type=Path)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for parameter groups (default: cpu count)",
+    )
     args = parser.parse_args()
 
-    summarize_results(args.id)
+    summarize_results(args.id, args.jobs)
+    summarize_profiles(args.id)
+    summarize_loop_stats(args.id)
@@ -0,0 +1,197 @@
+"""
+fuzz `SynchronizationProtocol` and the engines built on it
+
+every seed builds a stream of random data frames, run through a fault
+injector and mixed with runs of header bytes and garbage. the reference is
+the byte-at-a-time header hunt the engines ran before they shared the
+synchronizer. the blocking and async engines read the stream with
+`read_frame`, the protocol gets it in random chunks (1 byte up to
+`--max-chunk`), and the OK / ERR_CHECKSUM frames of all of them must match
+the reference. the same stream with command replies in between must also
+decode the same whether fed at once or in chunks.
+
+`tests/unit/test_protocol.py` runs a few hundred seeds, this runs as many as asked.
+
+usage:
+    python -m tests.helper.fuzz_protocol
+    python -m tests.helper.fuzz_protocol -n 2000 --frames 500 --seed 7
+"""
+
+import random
+import sys
+from typing import Iterator
+
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import ERR_CHECKSUM, ERR_HEADER, OK, TFMPSerial
+from src.sensor.clock import VirtualClock, VirtualEventLoop
+from src.sensor.command import REPLIES, Command
+from src.sensor.faults import PROFILES, FaultInjector, FaultProfile
+from src.sensor.frame import TFMPData, registered_frames
+from src.sensor.protocol import SynchronizationProtocol
+from src.sensor.stream import AsyncStreamSerial, StreamSerial, TimedStream
+
+# aggressive enough that a few hundred frames hit every fault kind
+FUZZ_PROFILE = FaultProfile(
+    bit_flip=5e-3, drop=0.02, garbage=0.02, truncate=0.02, false_header=0.05
+)
+
+
+class BytesStream(TimedStream):
+    """`data` readable at once"""
+
+    def __init__(self, data: bytes, clock: VirtualClock):
+        super().__init__(clock)
+        self.data = data
+
+    def chunks(self) -> Iterator[tuple[float, bytes]]:
+        if self.data:
+            yield self.start, self.data
+
+
+def random_frame(rng: random.Random) -> bytes:
+    body = b"\x59\x59" + rng.randbytes(6)
+    return body + bytes([sum(body) & 0xFF])
+
+
+def random_stream(rng: random.Random, frames: int, replies: bool = False) -> bytes:
+    profile = rng.choice([FUZZ_PROFILE, *PROFILES.values()])
+    injector = FaultInjector(profile, rng.randrange(2**32))
+    parts = []
+    for _ in range(frames):
+        parts.append(injector.apply(random_frame(rng)))
+        roll = rng.random()
+        if roll < 0.02:
+            # header bytes with nothing valid behind them
+            parts.append(bytes(rng.choice(b"\x59\x5a") for _ in range(rng.randint(1, 12))))
+        elif roll < 0.04:
+            parts.append(rng.randbytes(rng.randint(1, 16)))
+        elif replies and roll < 0.10:
+            id = rng.choice(list(REPLIES))
+            parts.append(Command(id, rng.randbytes(REPLIES[id].SIZE - 4)).encode())
+    return b"".join(parts)
+
+
+def random_chunks(rng: random.Random, data: bytes, max_chunk: int) -> Iterator[bytes]:
+    i = 0
+    while i < len(data):
+        n = rng.randint(1, max_chunk)
+        yield data[i : i + n]
+        i += n
+
+
+def reference_frames(data: bytes) -> list[tuple[bytes, int]]:
+    """a `0x59` byte, another one, then the rest of the frame, like the engines read it before"""
+    found = []
+    i = 0
+    while i < len(data):
+        if data[i] != 0x59:
+            i += 1
+            continue
+        if i + 1 >= len(data) or data[i + 1] != 0x59:
+            i += 2
+            continue
+        frame = data[i : i + 9]
+        if len(frame) < 9:
+            break
+        i += 9
+        if sum(frame[:8]) & 0xFF != frame[8]:
+            found.append((bytes(), ERR_CHECKSUM))
+        else:
+            found.append((frame, OK))
+    return found
+
+
+def blocking_frames(data: bytes) -> list[tuple[bytes, int]]:
+    clock = VirtualClock()
+    sensor = TFMPSerial.from_serial(StreamSerial(BytesStream(data, clock)).connect(), clock=clock)
+    found = []
+    while True:
+        frame, status = sensor.read_frame()
+        if status == ERR_HEADER:
+            return found
+        found.append((frame, status))
+
+
+def async_frames(data: bytes) -> list[tuple[bytes, int]]:
+    clock = VirtualClock()
+
+    async def read() -> list[tuple[bytes, int]]:
+        reader = await AsyncStreamSerial(BytesStream(data, clock)).connect()
+        sensor = AsyncTFMPSerial(reader, None, clock=clock)
+        found = []
+        while True:
+            frame, status = await sensor.read_frame()
+            if status == ERR_HEADER:
+                return found
+            found.append((frame, status))
+
+    loop = VirtualEventLoop(clock)
+    try:
+        return loop.run_until_complete(read())
+    finally:
+        loop.close()
+
+
+def protocol_frames(protocol: SynchronizationProtocol, chunks: Iterator[bytes]) -> list:
+    return [event[:2] for chunk in chunks for event in protocol.feed(chunk)]
+
+
+def as_engine(events: list[tuple[bytes, int]]) -> list[tuple[bytes, int]]:
+    """the engines return no bytes with ERR_CHECKSUM, the protocol keeps them"""
+    return [(frame if status == OK else bytes(), status) for frame, status in events]
+
+
+def first_difference(a: list, b: list) -> int | None:
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i
+    return None if len(a) == len(b) else min(len(a), len(b))
+
+
+def fuzz(seed: int, frames: int, max_chunk: int) -> list[str]:
+    """what differed for `seed`, empty if nothing"""
+    rng = random.Random(seed)
+    failures = []
+
+    data = random_stream(rng, frames)
+    expected = reference_frames(data)
+    chunked = as_engine(
+        protocol_frames(SynchronizationProtocol(TFMPData), random_chunks(rng, data, max_chunk))
+    )
+    for name, found in (
+        ("blocking", blocking_frames(data)),
+        ("async", async_frames(data)),
+        ("protocol", chunked),
+    ):
+        if (i := first_difference(expected, found)) is not None:
+            failures.append(f"{name} differs from the reference at frame {i}")
+
+    # several frame types, only the chunking may not change the result
+    data = random_stream(rng, frames, replies=True)
+    types = registered_frames()
+    whole = protocol_frames(SynchronizationProtocol(types), [data])
+    chunked = protocol_frames(SynchronizationProtocol(types), random_chunks(rng, data, max_chunk))
+    if (i := first_difference(whole, chunked)) is not None:
+        failures.append(f"chunked mixed stream differs at frame {i}")
+    return failures
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Synchronizer Equivalence Fuzzer")
+    parser.add_argument("-n", "--runs", type=int, default=200, help="Seeds to try")
+    parser.add_argument("--seed", type=int, default=0, help="First seed")
+    parser.add_argument("--frames", type=int, default=200, help="Frames per stream")
+    parser.add_argument(
+        "--max-chunk", type=int, default=64, help="Largest chunk fed at once"
+    )
+
+    args = parser.parse_args()
+    failed = 0
+    for seed in range(args.seed, args.seed + args.runs):
+        for failure in fuzz(seed, args.frames, args.max_chunk):
+            print(f"seed {seed}: {failure}")
+            failed += 1
+    print(f"{args.runs} seeds, {failed} failures")
+    sys.exit(1 if failed else 0)
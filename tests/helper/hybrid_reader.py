@@ -0,0 +1,116 @@
+"""
+hybrid reader: blocking engines on threads feeding an asyncio consumer
+
+the consumer stands in for an asyncio application, it keeps the latest
+reading of every port. `--linger 0` takes every batch as soon as the loop
+runs, see `src/hybrid_pi/sensor.py`.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+from src.hybrid_pi.sensor import LINGER, HybridTFMPReader, Reading
+from tests.helper.async_reader import LOOPS, run_loop
+from tests.helper.latency_log import LatencyLog
+from tests.helper.loop_monitor import LoopMonitor
+from tests.helper.stack_sampler import SAMPLE_INTERVAL, exit_on_sigterm, start_sampler
+
+# file to write loop lag and consumer step timings into, set by `--loop-stats`
+LOOP_STATS: Path | None = None
+# frame latencies of stamped frames as the consumer sees them, set by `--latency`
+LATENCY: LatencyLog | None = None
+
+
+async def consume(reader: HybridTFMPReader) -> dict[str, Reading]:
+    latest: dict[str, Reading] = {}
+    async for batch in reader.batches():
+        for reading in batch:
+            latest[reading.port] = reading
+            if LATENCY is not None:
+                LATENCY.record(reading[2:])
+    return latest
+
+
+async def main(ports: list[str], baudrate: int, interval: float, linger: float, pacing: str):
+    reader = HybridTFMPReader.open(
+        ports, baudrate, interval, linger=linger, pacing=pacing == "adaptive"
+    )
+    async with reader:
+        tasks = [consume(reader)]
+        if LOOP_STATS is not None:
+            monitor = LoopMonitor(LOOP_STATS)
+            tasks = [monitor.wrap("consumer", tasks[0]), monitor.run()]
+        await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hybrid Thread/Asyncio Serial Reader")
+    parser.add_argument(
+        "port", type=str, nargs="+", help="Serial port (e.g. COM3 or /dev/ttyUSB0)"
+    )
+    parser.add_argument(
+        "-b", "--baudrate", type=int, default=9600, help="Baud rate (default: 9600)"
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.01,
+        help="Interval in seconds (default: 0.01)",
+    )
+    parser.add_argument(
+        "-t", "--type", type=str, default="uvloop", help=f"Event loop, one of {list(LOOPS)}"
+    )
+    parser.add_argument(
+        "--linger",
+        type=float,
+        default=LINGER,
+        help=f"Seconds the loop collects readings per batch (default: {LINGER})",
+    )
+    parser.add_argument(
+        "--pacing",
+        type=str,
+        default="adaptive",
+        choices=["fixed", "adaptive"],
+        help="Sleep of the reader threads (default: adaptive)",
+    )
+    parser.add_argument(
+        "-s", "--sample", type=Path, default=None, help="Write sampled collapsed stacks to file"
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=SAMPLE_INTERVAL,
+        help=f"Cpu seconds between stack samples (default: {SAMPLE_INTERVAL})",
+    )
+    parser.add_argument(
+        "--latency", type=Path, default=None, help="Write the age of stamped frames to file"
+    )
+    parser.add_argument(
+        "-l",
+        "--loop-stats",
+        type=Path,
+        default=None,
+        help="Write loop lag and consumer step timings to file",
+    )
+
+    args = parser.parse_args()
+    LOOP_STATS = args.loop_stats
+    if args.latency is not None:
+        LATENCY = LatencyLog(args.latency)
+
+    if (type_ := args.type) not in LOOPS:
+        sys.exit("no running type is matching! sensor processor is not working")
+    if LOOP_STATS is not None or LATENCY is not None:
+        # the last report is written while the loop shuts down, the
+        # latencies at exit
+        exit_on_sigterm()
+    if args.sample is not None:
+        start_sampler(args.sample, args.sample_interval)
+
+    run_loop(
+        main(args.port, args.baudrate, args.interval, args.linger, args.pacing), type_
+    )
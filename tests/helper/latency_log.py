@@ -0,0 +1,81 @@
+"""
+frame latency of the perf readers
+
+with `multi_writer --stamp` every frame carries its send time. a reader run
+with `--latency <file>` records how old each OK reading is when it is seen
+(`read_stamp`), from the frame leaving the writer to the reading being
+available to the application. the ages are kept in memory and written at
+exit, one json line per reading:
+
+    {"t": wall time, "latency_ms": age}
+
+`t` is `time.time()` like the metric logs, so `results_db.ingest` can drop the
+readings of the warmup before the monitor started.
+"""
+
+import atexit
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.blocking_pi.sensor import OK
+from tests.helper.multi_writer import read_stamp
+
+
+class LatencyLog:
+    def __init__(self, path: Path):
+        self.path = path
+        # appended from reader threads, a list append needs no lock
+        self.samples: list[tuple[float, float]] = []
+        atexit.register(self.write)
+
+    def record(self, reading: tuple[int, int, int, int], now: float | None = None):
+        """the age of `reading` if it is OK, `now` on the `time.monotonic()` clock"""
+        if reading[3] != OK:
+            return
+        _, age = read_stamp(reading, time.monotonic() if now is None else now)
+        self.samples.append((time.time(), age * 1e3))
+
+    def write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            for t, latency in self.samples:
+                f.write(json.dumps({"t": round(t, 6), "latency_ms": round(latency, 4)}) + "\n")
+
+
+class LatencySensor:
+    """records every reading of the wrapped blocking sensor"""
+
+    def __init__(self, sensor, log: LatencyLog):
+        self.sensor = sensor
+        self.log = log
+
+    def __getattr__(self, name):
+        return getattr(self.sensor, name)
+
+    def update(self, wait: bool = True) -> bool:
+        read = self.sensor.update(wait)
+        if read:
+            self.log.record(self.sensor.reading)
+        return read
+
+
+class AsyncLatencySensor(LatencySensor):
+    async def update(self, wait: bool = True) -> bool:
+        read = await self.sensor.update(wait)
+        if read:
+            self.log.record(self.sensor.reading)
+        return read
+
+
+def parse_latency(path: Path, since: float = 0.0) -> np.ndarray:
+    """latencies in ms of a `LatencyLog` file, of the readings at or after `since` (wall time)"""
+    latencies = []
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            if row["t"] >= since:
+                latencies.append(row["latency_ms"])
+    return np.asarray(latencies, np.float64)
@@ -0,0 +1,136 @@
+"""
+event loop lag and per-task callback accounting for the async reader
+
+a heartbeat task sleeps `interval` and records how late it woke up, the lag
+every other callback waited behind whatever held the loop. every sensor task
+runs wrapped in a `TimedCoroutine`, which times each step of the task (resume
+to next suspension) and counts the steps slower than `slow`.
+
+once per `report_interval` a jsonl line goes to the stats file:
+
+    {"timestamp": ..., "lag_ms": [...], "tasks": {name: {"steps", "busy_ms", "max_ms", "slow"}}}
+
+task counters are per line, not cumulative. `summarize_loop_stats` in
+`create_summary.py` turns the files of a run into tables.
+"""
+
+import asyncio
+import json
+import time
+from collections.abc import Coroutine
+from pathlib import Path
+
+LAG_INTERVAL = 0.05
+REPORT_INTERVAL = 1.0
+# a step longer than this delays every other sensor's read noticeably
+SLOW_CALLBACK = 0.005
+
+
+class TaskStats:
+    __slots__ = ("steps", "busy", "max", "slow", "threshold")
+
+    def __init__(self, threshold: float = SLOW_CALLBACK):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.busy = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+    def record(self, duration: float):
+        self.steps += 1
+        self.busy += duration
+        if duration > self.max:
+            self.max = duration
+        if duration >= self.threshold:
+            self.slow += 1
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "steps": self.steps,
+            "busy_ms": self.busy * 1e3,
+            "max_ms": self.max * 1e3,
+            "slow": self.slow,
+        }
+
+
+class TimedCoroutine(Coroutine):
+    """times every step a task drives `coro` through"""
+
+    def __init__(self, coro, stats: TaskStats):
+        self._coro = coro
+        self._stats = stats
+
+    def send(self, value):
+        start = time.perf_counter()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._stats.record(time.perf_counter() - start)
+
+    def throw(self, typ, val=None, tb=None):
+        start = time.perf_counter()
+        try:
+            if val is None and tb is None:
+                return self._coro.throw(typ)
+            return self._coro.throw(typ, val, tb)
+        finally:
+            self._stats.record(time.perf_counter() - start)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self._coro.__await__()
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        path: Path,
+        interval: float = LAG_INTERVAL,
+        report_interval: float = REPORT_INTERVAL,
+        slow: float = SLOW_CALLBACK,
+    ):
+        self.path = path
+        self.interval = interval
+        self.report_interval = report_interval
+        self.slow = slow
+        self.tasks: dict[str, TaskStats] = {}
+        self.lags: list[float] = []
+
+    def wrap(self, name: str, coro) -> TimedCoroutine:
+        """account the steps of `coro` to task `name`"""
+        stats = self.tasks[name] = TaskStats(self.slow)
+        return TimedCoroutine(coro, stats)
+
+    async def run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            # uvloop's `loop.time()` ticks in milliseconds, too coarse for the lag
+            next_report = time.perf_counter() + self.report_interval
+            try:
+                while True:
+                    expected = time.perf_counter() + self.interval
+                    await asyncio.sleep(self.interval)
+                    now = time.perf_counter()
+                    self.lags.append(max(0.0, now - expected))
+                    if now >= next_report:
+                        self.report(f)
+                        next_report += self.report_interval
+            finally:
+                self.report(f)
+
+    def report(self, f):
+        line = {
+            "timestamp": time.time(),
+            "lag_ms": [round(lag * 1e3, 4) for lag in self.lags],
+            "tasks": {name: stats.to_dict() for name, stats in self.tasks.items()},
+        }
+        f.write(json.dumps(line) + "\n")
+        f.flush()
+        self.lags.clear()
+        for stats in self.tasks.values():
+            stats.reset()
@@ -0,0 +1,50 @@
+"""
+binary metric log format
+
+layout:
+    MAGIC (4 bytes) | header length (uint16, little endian) | header (json list of field names)
+    followed by fixed size records, one little endian float64 per field.
+
+fixed size records let the summarizer memory-map a log as numpy columns
+instead of decoding every line, which matters for hours long soak runs.
+"""
+
+import json
+import struct
+from typing import BinaryIO
+
+MAGIC = b"SPML"
+HEADER_LENGTH = struct.Struct("<H")
+
+
+class BinaryLogWriter:
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._fields: list[str] | None = None
+        self._record: struct.Struct | None = None
+
+    def write(self, data: dict[str, float]):
+        if self._fields is None:
+            self._open(list(data))
+        assert self._record is not None and self._fields is not None
+        self._f.write(self._record.pack(*(data[name] for name in self._fields)))
+
+    def _open(self, fields: list[str]):
+        if self._f.tell() == 0:
+            header = json.dumps(fields).encode()
+            self._f.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        else:
+            # appending to an existing log keeps its field order
+            fields = read_header(self._f.name)[0]
+        self._fields = fields
+        self._record = struct.Struct("<" + "d" * len(fields))
+
+
+def read_header(path) -> tuple[list[str], int]:
+    """return field names and the offset of the first record"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a binary metric log")
+        (length,) = HEADER_LENGTH.unpack(f.read(HEADER_LENGTH.size))
+        fields = json.loads(f.read(length))
+    return fields, len(MAGIC) + HEADER_LENGTH.size + length
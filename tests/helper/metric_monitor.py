@@ -2,13 +2,93 @@ import argparse
 import psutil
 import time
 import json
+from pathlib import Path
+
+from tests.helper.metric_log import BinaryLogWriter
+
+
+THREAD_COUNTERS = (
+    "voluntary_ctx_switches",
+    "involuntary_ctx_switches",
+    "run_time_ns",
+    "run_delay_ns",
+    "run_timeslices",
+)
+
+
+def read_thread_counters(task: Path) -> tuple[int, ...] | None:
+    """`THREAD_COUNTERS` of one `/proc/<pid>/task/<tid>`, `None` if it exited"""
+    try:
+        status = (task / "status").read_text()
+        run_time, run_delay, timeslices = (task / "schedstat").read_text().split()
+    except (OSError, ValueError):
+        return None
+
+    voluntary = involuntary = 0
+    for line in status.splitlines():
+        if line.startswith("voluntary_ctxt_switches:"):
+            voluntary = int(line.split()[1])
+        elif line.startswith("nonvoluntary_ctxt_switches:"):
+            involuntary = int(line.split()[1])
+    return voluntary, involuntary, int(run_time), int(run_delay), int(timeslices)
+
+
+class SchedCounters:
+    """
+    cumulative scheduler counters of every thread of `pid` from procfs.
+
+    `/proc/<pid>/status` and `/proc/<pid>/schedstat` only describe the main
+    thread, so both are summed over `/proc/<pid>/task/*`. a thread that exits
+    takes its counts out of `task/`, its last seen values are kept so the sums
+    never go backwards (a thread living only between two reads is missed).
+    page faults in `/proc/<pid>/stat` are already accumulated over threads.
+    """
+
+    def __init__(self, pid: int):
+        self.proc = Path("/proc") / str(pid)
+        self._last: dict[str, tuple[int, ...]] = {}
+        self._exited = [0] * len(THREAD_COUNTERS)
+
+    def _retire(self, counts: tuple[int, ...]):
+        self._exited = [a + b for a, b in zip(self._exited, counts)]
+
+    def read(self) -> dict[str, int]:
+        live: dict[str, tuple[int, ...]] = {}
+        for task in self.proc.glob("task/*"):
+            counts = read_thread_counters(task)
+            if counts is None:
+                continue
+            last = self._last.get(task.name)
+            if last is not None and any(new < old for new, old in zip(counts, last)):
+                # the tid was reused by a new thread
+                self._retire(last)
+                del self._last[task.name]
+            live[task.name] = counts
+        for tid, counts in self._last.items():
+            if tid not in live:
+                self._retire(counts)
+        self._last = live
+
+        totals = list(self._exited)
+        for counts in live.values():
+            totals = [a + b for a, b in zip(totals, counts)]
+        counters = dict(zip(THREAD_COUNTERS, totals))
+
+        # `comm` may contain spaces, so split after its closing parenthesis
+        stat = (self.proc / "stat").read_text()
+        stat_fields = stat[stat.rindex(")") + 2 :].split()
+        counters["minor_faults"] = int(stat_fields[7])
+        counters["major_faults"] = int(stat_fields[9])
+
+        return counters
 
 
 def monitor_pid(
     pid: int,
     interval: float = 1.0,
     duration: float = -1.0,
-    output_file: str = "default.log",
+    output_file: str = "default.bin",
+    log_format: str = "bin",
 ):
     try:
         p = psutil.Process(pid)
@@ -16,15 +96,19 @@ def monitor_pid(
         print(f"Process {pid} does not exist.")
         return
 
+    sched_counters = SchedCounters(pid)
     start = time.time()
-    metrics = []
-    with open(output_file, "a", encoding="utf-8") as f:
+    binary = log_format == "bin"
+    with open(output_file, "ab" if binary else "a") as f:
+        writer = BinaryLogWriter(f) if binary else None
         while duration < 0 or time.time() - start < duration:
             with p.oneshot():
                 cpu = p.cpu_percent(interval=None)
                 mem = p.memory_info().rss
+                # on linux, `read_count`/`write_count` are `syscr`/`syscw` of /proc/<pid>/io
                 io = p.io_counters()
                 threads = p.num_threads()
+            sched = sched_counters.read()
 
             data = {
                 "timestamp": time.time(),
@@ -35,16 +119,17 @@ def monitor_pid(
                 "read_bytes": io.read_bytes,
                 "write_bytes": io.write_bytes,
                 "num_threads": threads,
+                **sched,
             }
-            metrics.append(data)
-            f.write(json.dumps(data) + "\n")
+            if writer:
+                writer.write(data)
+            else:
+                f.write(json.dumps(data) + "\n")
             f.flush()
             time.sleep(interval)
 
 
 if __name__ == "__main__":
-    from pathlib import Path
-
     parser = argparse.ArgumentParser()
     parser.add_argument("-p", "--pid", type=int, required=True, help="PID to monitor")
     parser.add_argument("--id", type=str, required=True, help="Output file name")
@@ -57,10 +142,17 @@ if __name__ == "__main__":
     parser.add_argument(
         "-d", "--duration", type=float, default=-1.0, help="Monitoring duration"
     )
+    parser.add_argument(
+        "-F",
+        "--format",
+        choices=["jsonl", "bin"],
+        default="bin",
+        help="Log format, see `metric_log.py` (default: bin)",
+    )
     args = parser.parse_args()
 
     result_path = Path(__file__).parent.parent / "perf" / "results" / args.id
     result_path.mkdir(parents=True, exist_ok=True)
     file_name = result_path / args.file
 
-    monitor_pid(args.pid, args.interval, args.duration, file_name)
+    monitor_pid(args.pid, args.interval, args.duration, file_name, args.format)
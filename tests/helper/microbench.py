@@ -0,0 +1,280 @@
+"""
+microbenchmarks of the decoder and synchronizer primitives
+
+every case warms up, calibrates a loop count that runs at least `min_time`
+seconds, then times `repeat` rounds with `perf_counter_ns`. results are saved
+as json and can be compared against an earlier file, a parser change is
+measured in seconds instead of a pty matrix run.
+
+usage:
+    python -m tests.helper.microbench
+    python -m tests.helper.microbench -k scan -o after.json --compare before.json
+"""
+
+import gc
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from src._sensor.protocol import InvalidDataException, LidarData
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import TFMPSerial
+from src.sensor.dispatch import OK, FrameDispatcher
+from src.sensor.faults import PROFILES, FaultInjector
+from src.sensor.frame import Frame, TFMPData
+from src.sensor.mock import DEFAULT_FRAME, MockSerial
+from src.sensor.protocol import SynchronizationProtocol
+from tests.helper.results_db import current_commit
+
+DEFAULT_OUTPUT_DIR = Path(__file__).parent.parent / "perf" / "results" / "micro"
+
+WARMUP = 0.1
+MIN_TIME = 0.2
+REPEAT = 7
+# frames in the byte streams the scanning cases run over
+STREAM_FRAMES = 8192
+
+
+def noisy_stream(frames: int = STREAM_FRAMES, profile: str = "vibration") -> bytes:
+    injector = FaultInjector(PROFILES[profile], seed=0)
+    return b"".join(injector.apply(DEFAULT_FRAME) for _ in range(frames))
+
+
+def scan_frames(data: bytes, header: bytes = b"\x59\x59", size: int = 9) -> int:
+    """count checksum-valid frames the way the readers hunt for headers"""
+    found = 0
+    end = len(data) - size
+    i = data.find(header)
+    while 0 <= i <= end:
+        if sum(data[i : i + size - 1]) & 0xFF == data[i + size - 1]:
+            found += 1
+            i = data.find(header, i + size)
+        else:
+            i = data.find(header, i + 1)
+    return found
+
+
+@dataclass
+class RateReply(Frame["RateReply"], register=False):
+    """a second frame type for the mixed streams, like a frame rate command reply"""
+
+    rate: int
+
+    HEADER = b"\x5a\x06\x03"
+    SIZE = 6
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "RateReply":
+        return cls(rate=data[3] | (data[4] << 8))
+
+
+RATE_REPLY = b"\x5a\x06\x03\x64\x00\xc7"
+
+
+def mixed_stream(frames: int = STREAM_FRAMES, every: int = 16) -> bytes:
+    """data frames with a reply after every `every`th"""
+    return b"".join(
+        DEFAULT_FRAME + (RATE_REPLY if i % every == 0 else b"") for i in range(frames)
+    )
+
+
+def dispatch_frames(dispatcher: FrameDispatcher, data: bytes) -> int:
+    """count valid frames of any type in one pass"""
+    return sum(match.status == OK for match in dispatcher.frames(data))
+
+
+def feed_chunks(protocol: SynchronizationProtocol, chunks: list[bytes]) -> int:
+    """frames completed by feeding `chunks` in turn, as a port would deliver them"""
+    return sum(len(protocol.feed(chunk)) for chunk in chunks)
+
+
+def checksum_all(data: bytes, size: int = 9) -> int:
+    """checksum every aligned frame, the cost without any header search"""
+    ok = 0
+    for i in range(0, len(data) - size + 1, size):
+        if sum(data[i : i + 8]) & 0xFF == data[i + 8]:
+            ok += 1
+    return ok
+
+
+def lidar_data(frame: bytes):
+    try:
+        return LidarData(frame)
+    except InvalidDataException:
+        return None
+
+
+def engine_read_frame(profile: str) -> Callable[[], tuple[bytes, int]]:
+    """`TFMPSerial.read_frame` over an unpaced, endless mock port"""
+    serial = MockSerial(rate=None, count=None, seed=0, faults=PROFILES[profile])
+    sensor = TFMPSerial.from_serial(serial.connect())
+    return sensor.read_frame
+
+
+# name -> (factory of the timed callable, bytes processed per call)
+def build_cases() -> dict[str, tuple[Callable[[], Callable[[], object]], int]]:
+    frame = DEFAULT_FRAME
+    clean = DEFAULT_FRAME * STREAM_FRAMES
+    noisy = noisy_stream()
+    mixed = mixed_stream()
+    tfmp = FrameDispatcher([TFMPData])
+    both = FrameDispatcher([TFMPData, RateReply])
+    # about what one read returns from a busy port
+    chunked = [noisy[i : i + 64] for i in range(0, len(noisy), 64)]
+    return {
+        "tfmp_data_parse": (lambda: lambda: TFMPData.parse(frame), len(frame)),
+        "frame_validate": (lambda: lambda: TFMPData.validate(frame), len(frame)),
+        "blocking_parse_frame": (lambda: lambda: TFMPSerial.parse_frame(frame), len(frame)),
+        "async_parse_frame": (
+            lambda: lambda: AsyncTFMPSerial.parse_frame(frame),
+            len(frame),
+        ),
+        "lidar_data": (lambda: lambda: lidar_data(frame), len(frame)),
+        "checksum_frame": (lambda: lambda: sum(frame[:8]) & 0xFF == frame[8], len(frame)),
+        "checksum_clean_stream": (lambda: lambda: checksum_all(clean), len(clean)),
+        "header_scan_clean": (lambda: lambda: scan_frames(clean), len(clean)),
+        "header_scan_noisy": (lambda: lambda: scan_frames(noisy), len(noisy)),
+        "dispatch_clean": (lambda: lambda: dispatch_frames(tfmp, clean), len(clean)),
+        "dispatch_noisy": (lambda: lambda: dispatch_frames(tfmp, noisy), len(noisy)),
+        "dispatch_mixed": (lambda: lambda: dispatch_frames(both, mixed), len(mixed)),
+        "header_scan_mixed_per_type": (
+            lambda: lambda: scan_frames(mixed) + scan_frames(mixed, RateReply.HEADER, 6),
+            len(mixed),
+        ),
+        "protocol_feed_clean": (
+            lambda: lambda: feed_chunks(SynchronizationProtocol(TFMPData), [clean]),
+            len(clean),
+        ),
+        "protocol_feed_noisy": (
+            lambda: lambda: feed_chunks(SynchronizationProtocol(TFMPData), [noisy]),
+            len(noisy),
+        ),
+        "protocol_feed_chunked": (
+            lambda: lambda: feed_chunks(SynchronizationProtocol(TFMPData), chunked),
+            len(noisy),
+        ),
+        "protocol_feed_mixed": (
+            lambda: lambda: feed_chunks(SynchronizationProtocol([TFMPData, RateReply]), [mixed]),
+            len(mixed),
+        ),
+        "read_frame_clean": (lambda: engine_read_frame("clean"), len(frame)),
+        "read_frame_noisy": (lambda: engine_read_frame("vibration"), len(frame)),
+    }
+
+
+def calibrate(func: Callable[[], object], min_time: float) -> int:
+    """smallest power-of-ten-ish loop count running at least `min_time` seconds"""
+    number = 1
+    while True:
+        for n in (number, number * 2, number * 5):
+            if time_loop(func, n) >= min_time * 1e9:
+                return n
+        number *= 10
+
+
+def time_loop(func: Callable[[], object], number: int) -> int:
+    """nanoseconds of `number` calls, gc paused like `timeit` does"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        return time.perf_counter_ns() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def run_case(
+    factory: Callable[[], Callable[[], object]],
+    nbytes: int,
+    warmup: float = WARMUP,
+    min_time: float = MIN_TIME,
+    repeat: int = REPEAT,
+) -> dict[str, float]:
+    func = factory()
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        func()
+
+    number = calibrate(func, min_time)
+    per_call = [time_loop(func, number) / number for _ in range(repeat)]
+    best = min(per_call)
+    return {
+        "ns_per_call": statistics.median(per_call),
+        "min_ns": best,
+        "stdev_ns": statistics.stdev(per_call) if repeat > 1 else 0.0,
+        "mb_per_sec": nbytes / best * 1e3,
+        "bytes_per_call": nbytes,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_suite(
+    pattern: str | None = None,
+    warmup: float = WARMUP,
+    min_time: float = MIN_TIME,
+    repeat: int = REPEAT,
+) -> dict:
+    results = {}
+    for name, (factory, nbytes) in build_cases().items():
+        if pattern and pattern not in name:
+            continue
+        results[name] = run_case(factory, nbytes, warmup, min_time, repeat)
+        r = results[name]
+        print(
+            f"{name:<24} {r['ns_per_call']:>12.1f} ns  ±{r['stdev_ns']:>9.1f}  {r['mb_per_sec']:>9.2f} MB/s"
+        )
+    return {
+        "meta": {
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\n{'case':<24} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["ns_per_call"]
+        after = result["ns_per_call"]
+        print(f"{name:<24} {before:>10.1f}ns {after:>10.1f}ns {after / before:>6.2f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decoder Microbenchmarks")
+    parser.add_argument("-k", "--filter", type=str, default=None, help="Run matching cases")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="Json result file")
+    parser.add_argument("-c", "--compare", type=Path, default=None, help="Baseline json")
+    parser.add_argument("-r", "--repeat", type=int, default=REPEAT)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--warmup", type=float, default=WARMUP)
+
+    args = parser.parse_args()
+    report = run_suite(args.filter, args.warmup, args.min_time, args.repeat)
+
+    output = args.output
+    if output is None:
+        DEFAULT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        output = DEFAULT_OUTPUT_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"saved to {output}")
+
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text(encoding="utf-8")))
@@ -0,0 +1,383 @@
+"""
+one writer process for many ports
+
+every port gets a frame at absolute deadlines `start + phase + k * interval`,
+so pacing never drifts. a single scheduler sleeps until the earliest deadline
+and writes every port that is due in one pass, the cost stays at one wakeup
+per tick however many ports there are.
+
+ptys deliver a frame at once whatever the baud rate. with `wire_chunk` set,
+bytes leave at the pace of an 8N1 line instead, `wire_chunk` bytes per write,
+so readers wake up to partial frames like they do on a real link.
+
+a port is a device path, or `fd:<n>` for the master side of a pty inherited
+from the parent, see `run_pty_pairs`.
+
+with `respond` every port also answers tfmini plus commands its reader writes
+(see `src/sensor/command.py`): `frame_rate` changes that port's interval, 0
+stops the frames until a `trigger` asks for one, `output_enable` mutes it and
+the other commands get their reply.
+
+with `stamp` every frame carries its scheduled send time and a sequence
+number instead of a fixed reading, readers in other processes get latency and
+drops from `read_stamp`. `time.monotonic()` is one clock for all processes.
+
+usage:
+    python -m tests.helper.multi_writer /dev/pts/3 /dev/pts/5 -i 0.01 -c vibration
+    python -m tests.helper.multi_writer /dev/pts/3 -b 115200 --wire-chunk 1
+"""
+
+import heapq
+import os
+import selectors
+import time
+
+from serial import Serial
+
+from src.sensor.command import (
+    COMMAND_HEADER,
+    FRAME_RATE,
+    GET_VERSION,
+    MAX_REPLY_SIZE,
+    OUTPUT_ENABLE,
+    REPLIES,
+    RESTORE_FACTORY,
+    SAVE_SETTINGS,
+    SYSTEM_RESET,
+    TRIGGER,
+    Command,
+    checksum,
+)
+from src.sensor.faults import FaultInjector, FaultProfile, PROFILES, get_profile
+
+# missed ticks written at once when the writer falls behind, older ones are dropped
+MAX_CATCH_UP = 10
+# start, data and stop bit of an 8N1 line
+BITS_PER_BYTE = 10
+# bytes a paced line queues before frames are dropped, when frames outrun the baud rate
+MAX_WIRE_BACKLOG = 4096
+# send time in microseconds wraps after ~71 minutes, the sequence after 8192 frames
+STAMP_MASK = 0xFFFFFFFF
+SEQUENCE_MASK = 0x1FFF
+# what `GET_VERSION` answers
+VERSION = b"\x00\x00\x02"
+
+
+def stamp_frame(sequence: int, sent: float) -> bytes:
+    """
+    a frame with the send time (`time.monotonic()`) in distance and flux, and
+    the sequence number in the temperature bits `parse_frame` keeps
+    """
+    sent_us = int(sent * 1e6) & STAMP_MASK
+    temp_raw = (sequence & SEQUENCE_MASK) << 3
+    body = b"\x59\x59" + sent_us.to_bytes(4, "little") + temp_raw.to_bytes(2, "little")
+    return body + bytes([sum(body) & 0xFF])
+
+
+def read_stamp(reading: tuple[int, int, int, int], now: float) -> tuple[int, float]:
+    """(sequence, seconds since sent) of a stamped frame, from `parse_frame` output"""
+    distance, flux, temperature = reading[:3]
+    sent_us = distance | (flux << 16)
+    age_us = (int(now * 1e6) - sent_us) & STAMP_MASK
+    return (temperature + 256) & SEQUENCE_MASK, age_us / 1e6
+
+
+class PortWriter:
+    """frames for one port, faulted with its own seeded injector"""
+
+    def __init__(
+        self,
+        port: str,
+        baudrate: int,
+        frame: bytes,
+        faults: FaultProfile | None = None,
+        seed: int | None = None,
+        wire_chunk: int = 0,
+        stamp: bool = False,
+    ):
+        if port.startswith("fd:"):
+            self.serial = None
+            self.fd = int(port[3:])
+        else:
+            self.serial = Serial(port, baudrate, timeout=1)
+            self.fd = self.serial.fileno()
+        self.frame = frame
+        self.injector = (
+            FaultInjector(faults, seed) if faults is not None and not faults.clean else None
+        )
+        self.frames = 0
+        self.stamp = stamp
+
+        # frames go out every `interval` from `anchor`, none while `interval` is None.
+        # a rate change bumps `generation`, the scheduler drops older deadlines.
+        self.interval: float | None = None
+        self.anchor = 0.0
+        self.generation = 0
+        self.enabled = True
+        self.inbox = bytearray()
+
+        # wire pacing, `pending` bytes go out one `byte_time` after another from `wire_at`
+        self.wire_chunk = wire_chunk
+        self.byte_time = BITS_PER_BYTE / baudrate if wire_chunk else 0.0
+        self.pending = bytearray()
+        self.wire_at = 0.0
+
+    def next_frames(self, count: int, at: float = 0.0, interval: float = 0.0) -> bytes:
+        """`count` frames, the last one due at `at` and the others `interval` apart"""
+        if self.stamp:
+            first = self.frames
+            frames = [
+                stamp_frame(first + k, at - (count - 1 - k) * interval) for k in range(count)
+            ]
+        else:
+            frames = [self.frame] * count
+        self.frames += count
+        if self.injector is None:
+            return b"".join(frames)
+        return b"".join(self.injector.apply(frame) for frame in frames)
+
+    def set_rate(self, interval: float | None, at: float):
+        self.interval = interval
+        self.anchor = at
+        self.generation += 1
+
+    def receive(self, now: float) -> bytes:
+        """read the commands the reader wrote, returns the answers"""
+        try:
+            self.inbox += os.read(self.fd, 256)
+        except (BlockingIOError, OSError):
+            return b""
+        answers = []
+        while (start := self.inbox.find(COMMAND_HEADER)) >= 0:
+            del self.inbox[:start]
+            if len(self.inbox) < 2:
+                break
+            length = self.inbox[1]
+            if not 4 <= length <= MAX_REPLY_SIZE:
+                del self.inbox[:1]
+                continue
+            if len(self.inbox) < length:
+                break
+            command = bytes(self.inbox[:length])
+            del self.inbox[:length]
+            if checksum(command[:-1]) == command[-1]:
+                answers.append(self.execute(command[2], command[3:-1], now))
+        return b"".join(answers)
+
+    def execute(self, id: int, payload: bytes, now: float) -> bytes:
+        if id == TRIGGER:
+            return self.next_frames(1, now)
+        if id == FRAME_RATE:
+            hz = int.from_bytes(payload, "little")
+            self.set_rate(1 / hz if hz else None, now)
+        elif id == OUTPUT_ENABLE:
+            self.enabled = payload[:1] != b"\x00"
+        elif id == GET_VERSION:
+            payload = VERSION
+        elif id in (SYSTEM_RESET, RESTORE_FACTORY, SAVE_SETTINGS):
+            payload = b"\x00"  # success
+        elif id not in REPLIES:
+            return b""
+        # a reply echoes the layout of its command
+        return Command(id, payload).encode()
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self.fd, view) :]
+            except BlockingIOError:
+                # the reader fell behind and the pty buffer is full, like a real
+                # sensor the writer doesn't wait for it
+                return
+
+    def send(self, data: bytes, at: float):
+        """put `data` on the line at `at`, right away unless the wire is paced"""
+        if not self.byte_time:
+            self.write(data)
+            return
+        if not self.pending:
+            self.wire_at = at
+        elif len(self.pending) >= MAX_WIRE_BACKLOG:
+            return
+        self.pending += data
+
+    def drain(self, now: float) -> float | None:
+        """write the bytes the line carried by `now`, returns when the next chunk is due"""
+        arrived = min(len(self.pending), int((now - self.wire_at) / self.byte_time))
+        if arrived < len(self.pending):
+            arrived -= arrived % self.wire_chunk
+        if arrived:
+            self.write(bytes(self.pending[:arrived]))
+            del self.pending[:arrived]
+            self.wire_at += arrived * self.byte_time
+        if not self.pending:
+            return None
+        return self.wire_at + min(self.wire_chunk, len(self.pending)) * self.byte_time
+
+    def close(self):
+        if self.serial is not None:
+            self.serial.close()
+        else:
+            os.close(self.fd)
+
+
+def multi_write(
+    ports: list[str],
+    baudrate: int = 9600,
+    frame: bytes = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7",
+    interval: float = 0.01,
+    faults: FaultProfile | None = None,
+    stagger: bool = True,
+    seed: int = 0,
+    wire_chunk: int = 0,
+    stamp: bool = False,
+    respond: bool = False,
+):
+    writers = [
+        PortWriter(port, baudrate, frame, faults, seed + i, wire_chunk, stamp)
+        for i, port in enumerate(ports)
+    ]
+    for writer in writers:
+        os.set_blocking(writer.fd, False)
+    if wire_chunk and len(frame) * BITS_PER_BYTE / baudrate > interval:
+        print(f"a frame takes longer than {interval}s at {baudrate} baud, frames will drop")
+
+    # spread the ports over the interval, real sensors don't tick together
+    start = time.monotonic()
+    for i, writer in enumerate(writers):
+        phase = interval * i / len(writers) if stagger else 0.0
+        writer.set_rate(interval, start + phase)
+    heap = [(writer.anchor, 0, i, writer.generation) for i, writer in enumerate(writers)]
+    heapq.heapify(heap)
+    # (deadline, port) of paced lines with bytes in flight
+    wire: list[tuple[float, int]] = []
+    draining: set[int] = set()
+
+    def send(i: int, data: bytes, at: float):
+        writers[i].send(data, at)
+        if writers[i].pending and i not in draining:
+            draining.add(i)
+            heapq.heappush(wire, (at, i))
+
+    # the readers' commands wake the writer up, it sleeps in the selector
+    selector = selectors.DefaultSelector() if respond else None
+    if selector is not None:
+        for i, writer in enumerate(writers):
+            selector.register(writer.fd, selectors.EVENT_READ, i)
+
+    try:
+        while True:
+            deadlines = [queue[0][0] for queue in (heap, wire) if queue]
+            delay = min(deadlines) - time.monotonic() if deadlines else None
+            if selector is not None:
+                ready = selector.select(None if delay is None else max(delay, 0.0))
+                now = time.monotonic()
+                for key, _ in ready:
+                    writer = writers[key.data]
+                    generation = writer.generation
+                    send(key.data, writer.receive(now), now)
+                    if writer.generation != generation and writer.interval is not None:
+                        heapq.heappush(
+                            heap, (writer.anchor + writer.interval, 1, key.data, writer.generation)
+                        )
+            elif delay > 0:
+                time.sleep(delay)
+
+            now = time.monotonic()
+            while heap and heap[0][0] <= now:
+                at, tick, i, generation = heap[0]
+                writer = writers[i]
+                if generation != writer.generation:
+                    # the rate changed since this deadline was set
+                    heapq.heappop(heap)
+                    continue
+                due = int((now - writer.anchor) / writer.interval) + 1 - tick
+                if due > MAX_CATCH_UP:
+                    tick += due - MAX_CATCH_UP
+                    due = MAX_CATCH_UP
+                tick += due
+                if writer.enabled:
+                    last = writer.anchor + (tick - 1) * writer.interval
+                    send(i, writer.next_frames(due, last, writer.interval), at)
+                heapq.heapreplace(
+                    heap, (writer.anchor + tick * writer.interval, tick, i, generation)
+                )
+
+            while wire and wire[0][0] <= now:
+                _, i = heapq.heappop(wire)
+                next_chunk = writers[i].drain(now)
+                if next_chunk is None:
+                    draining.discard(i)
+                else:
+                    heapq.heappush(wire, (next_chunk, i))
+    finally:
+        if selector is not None:
+            selector.close()
+        for writer in writers:
+            writer.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Multi-Port Serial Write Tool")
+    parser.add_argument("port", type=str, nargs="+", help="Serial ports to write")
+    parser.add_argument(
+        "-b", "--baudrate", type=int, default=9600, help="Baud rate (default: 9600)"
+    )
+    parser.add_argument(
+        "-f",
+        "--frame",
+        type=lambda x: bytes.fromhex(x),
+        default=b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7",
+        help="Frame to send in hex format (e.g. '59' for 0x59)",
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.01,
+        help="Interval per port in seconds (default: 0.01)",
+    )
+    parser.add_argument(
+        "-c",
+        "--corruption",
+        type=str,
+        default="clean",
+        choices=list(PROFILES),
+        help="Line fault profile (default: clean)",
+    )
+    parser.add_argument(
+        "--no-stagger", action="store_true", help="Write all ports at the same instant"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Fault injection seed")
+    parser.add_argument(
+        "-w",
+        "--wire-chunk",
+        type=int,
+        default=0,
+        help="Pace bytes at the baud rate, this many per write (default: 0, no pacing)",
+    )
+
+    parser.add_argument(
+        "--stamp", action="store_true", help="Send time and sequence number in every frame"
+    )
+
+    parser.add_argument(
+        "--respond", action="store_true", help="Answer commands written to the ports"
+    )
+
+    args = parser.parse_args()
+    multi_write(
+        args.port,
+        args.baudrate,
+        args.frame,
+        args.interval,
+        get_profile(args.corruption),
+        not args.no_stagger,
+        args.seed,
+        args.wire_chunk,
+        args.stamp,
+        args.respond,
+    )
@@ -0,0 +1,110 @@
+"""
+run the reader engines against in-memory sources, a capture replay or a mock port
+
+usage:
+    python -m tests.helper.replay_reader -e async capture captures/ttyUSB0 -s 0
+    python -m tests.helper.replay_reader mock -n 100000 --error-rate 0.01
+"""
+
+import sys
+import time
+import asyncio
+from collections import Counter
+from pathlib import Path
+
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import TFMPSerial
+from src.sensor.mock import AsyncMockSerial, MockSerial
+from src.sensor.replay import AsyncReplaySerial, ReplaySerial
+from src.sensor.stream import AsyncStreamSerial, StreamSerial
+
+
+def run_blocking(serial: StreamSerial) -> Counter:
+    serial.connect()
+    sensor = TFMPSerial.from_serial(serial)
+    statuses = Counter()
+    try:
+        while not serial.exhausted:
+            sensor.update()
+            statuses[sensor.status] += 1
+    finally:
+        serial.close()
+    return statuses
+
+
+async def run_async(reader: AsyncStreamSerial) -> Counter:
+    await reader.connect()
+    sensor = AsyncTFMPSerial(reader, None)
+    statuses = Counter()
+    try:
+        while not reader.exhausted:
+            await sensor.update()
+            statuses[sensor.status] += 1
+    finally:
+        await reader.close()
+    return statuses
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run Reader Engines on In-Memory Sources")
+    parser.add_argument(
+        "-e", "--engine", type=str, default="blocking", help="blocking or async"
+    )
+    sources = parser.add_subparsers(dest="source", required=True)
+
+    capture_parser = sources.add_parser("capture", help="Replay a capture")
+    capture_parser.add_argument("path", type=Path, help="Capture file or recorder prefix")
+    capture_parser.add_argument(
+        "-s",
+        "--speed",
+        type=float,
+        default=0,
+        help="Replay speed factor, 0 replays as fast as possible (default: 0)",
+    )
+
+    mock_parser = sources.add_parser("mock", help="Generate frames")
+    mock_parser.add_argument(
+        "-n", "--count", type=int, default=100000, help="Frames to generate"
+    )
+    mock_parser.add_argument(
+        "-r", "--rate", type=float, default=0, help="Frames per second, 0 is unpaced"
+    )
+    mock_parser.add_argument("--latency", type=float, default=0.0)
+    mock_parser.add_argument("--jitter", type=float, default=0.0)
+    mock_parser.add_argument("--error-rate", type=float, default=0.0)
+    mock_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    is_async = args.engine == "async"
+    if args.engine not in ("blocking", "async"):
+        sys.exit("no engine is matching!")
+
+    if args.source == "capture":
+        cls = AsyncReplaySerial if is_async else ReplaySerial
+        serial = cls(args.path, args.speed or None)
+        size = sum(f.stat().st_size for f in serial.stream.files)
+    else:
+        cls = AsyncMockSerial if is_async else MockSerial
+        serial = cls(
+            rate=args.rate or None,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            count=args.count,
+            seed=args.seed,
+        )
+        size = args.count * len(serial.stream.frame)
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    statuses = asyncio.run(run_async(serial)) if is_async else run_blocking(serial)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+    updates = sum(statuses.values())
+    print(f"engine={args.engine} source={args.source}")
+    print(f"updates={updates} statuses={dict(statuses)}")
+    print(f"elapsed={elapsed:.3f}s cpu={cpu:.3f}s")
+    print(f"{updates / elapsed:.0f} updates/s, {size / elapsed / 1e6:.2f} MB/s")
+    if updates:
+        print(f"{cpu / updates * 1e6:.2f} us cpu/update")
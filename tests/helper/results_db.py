@@ -0,0 +1,367 @@
+"""
+perf results database
+
+every perf run is ingested into a sqlite store keyed by git commit, engine
+and the `Parameter` fields, so runs of different commits can be compared.
+
+usage:
+    python -m tests.helper.results_db ingest -i tests/perf/results/<test_id>
+    python -m tests.helper.results_db compare --baseline <commit> [--current <commit>]
+
+`compare` exits with 1 when any metric regressed, so it can gate a deployment.
+commits are matched by full sha, runs of a dirty tree are left out unless
+`--dirty` or a `<sha>-dirty` commit asks for them.
+samples within a run are autocorrelated (a slow second is followed by
+another), so every run is reduced to one value per metric first and the
+test compares the repetitions: run each combination at least 5 times per
+commit (`PERF_REPETITIONS=5`, see `tests/perf/conftest.py`), with fewer no
+difference reaches the default significance level.
+"""
+
+import argparse
+import itertools
+import math
+import re
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from tests.helper.create_summary import parse_filename, parse_log, parse_loop_stats
+from tests.helper.latency_log import parse_latency
+
+DEFAULT_DB = Path(__file__).parent.parent / "perf" / "results" / "results.sqlite"
+# suffix of the commit of runs with uncommitted changes, like `git describe --dirty`
+DIRTY = "-dirty"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    test_id TEXT NOT NULL,
+    git_commit TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    sensors INTEGER,
+    interval REAL,
+    runtime INTEGER,
+    params TEXT NOT NULL,
+    repetition INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    UNIQUE (test_id, engine, params, repetition)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_run_metric ON samples (run_id, metric);
+"""
+
+# metric -> (samples, statistic of one run, label); larger is worse for all of them.
+# latency is the age of the writers' stamped frames, see `latency_log.py`.
+COMPARED_METRICS = {
+    "cpu_per_frame_us": ("cpu_per_frame_us", "median", "CPU per frame (us)"),
+    "cpu_percent_p95": ("cpu_percent", "p95", "CPU p95 (%)"),
+    "memory_rss_mb": ("memory_rss_mb", "median", "RSS (MB)"),
+    "wakeups_per_sec": ("wakeups_per_sec", "median", "Wakeups/s"),
+    "latency_ms_p50": ("latency_ms", "median", "Latency p50 (ms)"),
+    "latency_ms_p99": ("latency_ms", "p99", "Latency p99 (ms)"),
+    "loop_lag_ms_p99": ("loop_lag_ms", "p99", "Loop Lag p99 (ms)"),
+}
+# runs per side up to which `mann_whitney_u` is exact
+EXACT_MAX_RUNS = 8
+
+
+def connect(db_path: Path = DEFAULT_DB) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def git(*args: str) -> str | None:
+    try:
+        out = subprocess.run(["git", *args], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def current_commit() -> str:
+    """full sha of HEAD, `-dirty` when tracked files changed"""
+    sha = git("rev-parse", "HEAD")
+    if sha is None:
+        return "unknown"
+    # like `git describe --dirty`, untracked files don't count
+    dirty = git("diff", "--quiet", "HEAD") is None
+    return sha + DIRTY if dirty else sha
+
+
+def resolve_commit(ref: str) -> str:
+    """
+    full sha of a git ref (short sha, branch, tag), keeping a `-dirty`
+    suffix. a ref git doesn't know is taken as stored, e.g. `ingest --commit`.
+    """
+    base = ref.removesuffix(DIRTY)
+    sha = git("rev-parse", "--verify", "--quiet", f"{base}^{{commit}}")
+    if sha is None:
+        return ref
+    return sha + ref[len(base):]
+
+
+def parse_params(param_str: str) -> dict[str, str]:
+    """inverse of `Parameter.__repr__`, e.g. `sensors-1_interval-0.01_runtime-5`"""
+    return dict(re.findall(r"([a-z]+)-([^_]+)", param_str))
+
+
+def log_samples(log: dict[str, np.ndarray], frames_per_sec: float) -> dict[str, np.ndarray]:
+    ts = log["timestamp"]
+    dt = np.diff(ts)
+    valid = dt > 0
+
+    cpu = log["cpu_percent"]
+    samples = {
+        "cpu_percent": cpu,
+        "memory_rss_mb": log["memory_rss"],
+        "wakeups_per_sec": np.diff(log["voluntary_ctx_switches"])[valid] / dt[valid],
+        "syscalls_per_sec": (
+            np.diff(log["read_counts"] + log["write_counts"])[valid] / dt[valid]
+        ),
+    }
+    if frames_per_sec > 0:
+        # cpu time spent per frame the writers emitted, in microseconds
+        samples["cpu_per_frame_us"] = cpu / 100 / frames_per_sec * 1e6
+    return samples
+
+
+def ingest(result_dir: Path, conn: sqlite3.Connection, commit: str | None = None) -> int:
+    commit = commit or current_commit()
+    test_id = result_dir.name
+    count = 0
+
+    for f in sorted(result_dir.glob("*.log")) + sorted(result_dir.glob("*.bin")):
+        engine, param_str, repetition = parse_filename(f.name)
+        if not param_str:
+            continue
+
+        params = parse_params(param_str)
+        sensors = int(params.get("sensors", 0))
+        interval = float(params.get("interval", 0))
+        frames_per_sec = sensors / interval if interval else 0.0
+
+        with conn:
+            conn.execute(
+                "DELETE FROM runs WHERE test_id = ? AND engine = ? AND params = ? AND repetition = ?",
+                (test_id, engine, param_str, repetition),
+            )
+            run_id = conn.execute(
+                "INSERT INTO runs (test_id, git_commit, engine, sensors, interval, runtime, params, repetition, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    test_id,
+                    commit,
+                    engine,
+                    sensors,
+                    interval,
+                    int(params.get("runtime", 0)),
+                    param_str,
+                    repetition,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            ).lastrowid
+            log = parse_log(f)
+            samples = log_samples(log, frames_per_sec)
+            loop_file = result_dir / "loop" / f"{f.stem}.jsonl"
+            if loop_file.exists():
+                samples["loop_lag_ms"] = parse_loop_stats(loop_file)[0]
+            latency_file = result_dir / "latency" / f"{f.stem}.jsonl"
+            if latency_file.exists() and len(log["timestamp"]):
+                # the reader records from its start, the warmup is not part of the run
+                samples["latency_ms"] = parse_latency(latency_file, since=log["timestamp"][0])
+            for metric, values in samples.items():
+                conn.executemany(
+                    "INSERT INTO samples (run_id, metric, value) VALUES (?, ?, ?)",
+                    ((run_id, metric, float(v)) for v in values),
+                )
+        count += 1
+
+    return count
+
+
+def load_runs(
+    conn: sqlite3.Connection, commit: str, dirty: bool = False
+) -> dict[tuple[str, str], dict[str, np.ndarray]]:
+    """
+    every compared metric of every run of exactly `commit`, one value per
+    run, grouped by (engine, params). `dirty` adds the runs of uncommitted
+    changes on top of it.
+    """
+    commits = (commit, commit + DIRTY) if dirty and not commit.endswith(DIRTY) else (commit,)
+    rows = conn.execute(
+        "SELECT r.engine, r.params, r.id, s.metric, s.value FROM samples s "
+        f"JOIN runs r ON r.id = s.run_id WHERE r.git_commit IN ({', '.join('?' * len(commits))}) "
+        "ORDER BY r.id",
+        commits,
+    )
+    runs: dict[tuple[str, str], dict[int, dict[str, list[float]]]] = {}
+    for engine, params, run_id, metric, value in rows:
+        runs.setdefault((engine, params), {}).setdefault(run_id, {}).setdefault(metric, []).append(value)
+
+    result = {}
+    for key, by_run in runs.items():
+        values: dict[str, list[float]] = {}
+        for samples in by_run.values():
+            for metric, (source, statistic, _) in COMPARED_METRICS.items():
+                if samples.get(source):
+                    values.setdefault(metric, []).append(
+                        summary_statistic(np.asarray(samples[source]), statistic)
+                    )
+        result[key] = {metric: np.asarray(v) for metric, v in values.items()}
+    return result
+
+
+def mann_whitney_u(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    two-sided p-value of the mann-whitney u test. exact over every split of
+    the ranks for up to `EXACT_MAX_RUNS` values per side, a handful of
+    repetitions is what a perf session has. normal approximation with tie
+    correction beyond.
+    """
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+
+    values = np.concatenate([a, b])
+    order = values.argsort(kind="mergesort")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(1, len(values) + 1)
+
+    # average ranks of ties
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    rank_sums = np.bincount(inverse, weights=ranks)
+    ranks = (rank_sums / counts)[inverse]
+
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    if max(n1, n2) <= EXACT_MAX_RUNS:
+        # share of rank splits at least as far from the middle as the observed one
+        observed = abs(u - n1 * n2 / 2)
+        extreme = total = 0
+        for chosen in itertools.combinations(ranks, n1):
+            total += 1
+            extreme += abs(sum(chosen) - n1 * (n1 + 1) / 2 - n1 * n2 / 2) >= observed - 1e-9
+        return extreme / total
+
+    tie_term = ((counts**3 - counts).sum()) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+
+    z = (u - n1 * n2 / 2) / sigma
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def summary_statistic(values: np.ndarray, statistic: str) -> float:
+    if statistic == "median":
+        return float(np.median(values))
+    return float(np.percentile(values, int(statistic[1:])))
+
+
+def compare(
+    conn: sqlite3.Connection,
+    baseline: str,
+    current: str,
+    alpha: float = 0.01,
+    threshold: float = 0.05,
+    dirty: bool = False,
+) -> list[str]:
+    """
+    compare every (engine, params) combination of `current` against
+    `baseline`. each run counts once, with its statistic of the metric (e.g.
+    its p99 latency): a metric regresses when the median over the runs got
+    worse by more than `threshold` and the runs differ significantly at `alpha`.
+    commits are matched exactly, see `resolve_commit` and `load_runs`.
+    """
+    base_runs = load_runs(conn, baseline, dirty)
+    curr_runs = load_runs(conn, current, dirty)
+    regressions = []
+
+    print("| Engine | Params | Metric | Baseline | Current | Change | Runs | p-value | |")
+    print("|--------|--------|--------|----------|---------|--------|------|---------|-|")
+    for key in sorted(base_runs.keys() & curr_runs.keys()):
+        engine, params = key
+        for metric, (_, _, label) in COMPARED_METRICS.items():
+            a = base_runs[key].get(metric)
+            b = curr_runs[key].get(metric)
+            if a is None or b is None or len(a) == 0 or len(b) == 0:
+                continue
+
+            base_value = float(np.median(a))
+            curr_value = float(np.median(b))
+            change = (curr_value - base_value) / base_value if base_value else 0.0
+            p_value = mann_whitney_u(a, b)
+
+            regressed = change > threshold and p_value < alpha
+            if regressed:
+                regressions.append(f"{engine} {params} {label}: {change:+.1%}")
+            print(
+                f"| {engine} | {params} | {label} | {base_value:.3f} | {curr_value:.3f} "
+                f"| {change:+.1%} | {len(a)}/{len(b)} | {p_value:.4f} "
+                f"| {'REGRESSION' if regressed else ''} |"
+            )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perf Results Database")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="SQLite file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = sub.add_parser("ingest", help="Store a results directory")
+    ingest_parser.add_argument("-i", "--id", required=True, type=Path)
+    ingest_parser.add_argument("-c", "--commit", type=str, default=None)
+
+    compare_parser = sub.add_parser("compare", help="Compare two commits")
+    compare_parser.add_argument("-b", "--baseline", required=True, type=str)
+    compare_parser.add_argument("-c", "--current", type=str, default=None)
+    compare_parser.add_argument(
+        "-a", "--alpha", type=float, default=0.01, help="Significance level"
+    )
+    compare_parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="Relative change tolerated before flagging (default: 0.05)",
+    )
+    compare_parser.add_argument(
+        "--dirty",
+        action="store_true",
+        help="Also compare runs of uncommitted changes on top of the commits",
+    )
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+
+    if args.command == "ingest":
+        count = ingest(args.id, conn, args.commit)
+        print(f"[✓] {count} runs of {args.id.name} stored in {args.db}")
+    else:
+        regressions = compare(
+            conn,
+            resolve_commit(args.baseline),
+            resolve_commit(args.current) if args.current else current_commit(),
+            args.alpha,
+            args.threshold,
+            args.dirty,
+        )
+        if regressions:
+            print("\n[!] regressions detected:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\n[✓] no regressions")
@@ -0,0 +1,143 @@
+"""
+resynchronization cost of the reader engines under line faults
+
+feeds every engine a mock port corrupted by each fault profile, in simulated
+time so the result doesn't depend on the machine's timer resolution. reports
+per profile and engine:
+
+    resync latency  simulated time from a corrupted frame to the next OK update
+    checksum        ERR_CHECKSUM updates, corrupted frames the engine caught
+    resync          ERR_HEADER updates while a fault is not yet behind the reader
+    timeouts        ERR_HEADER updates with no fault pending, the wait for a
+                    frame simply ran out (depends on the engine's polling,
+                    not on the faults)
+    cpu/frame       real cpu time spent per generated frame
+
+usage:
+    python -m tests.helper.resync_bench -n 20000 -r 100
+    python -m tests.helper.resync_bench -p clean vibration -e async
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+import numpy as np
+
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import ERR_CHECKSUM, ERR_HEADER, OK, TFMPSerial
+from src.sensor.clock import VirtualClock, run_virtual
+from src.sensor.faults import PROFILES
+from src.sensor.mock import AsyncMockSerial, FrameStream, MockSerial
+
+
+class ResyncTracker:
+    """turns the fault times of a `FrameStream` into resync latencies"""
+
+    def __init__(self, stream: FrameStream):
+        self.stream = stream
+        self.statuses = Counter()
+        self.latencies: list[float] = []
+        self.resync_errors = 0
+        self.timeouts = 0
+
+    def record(self, status: int):
+        self.statuses[status] += 1
+        fault_times, now = self.stream.fault_times, self.stream.clock.monotonic()
+        pending = bool(fault_times) and fault_times[0] <= now
+        if status == ERR_HEADER:
+            if pending:
+                self.resync_errors += 1
+            else:
+                self.timeouts += 1
+        if status != OK:
+            return
+        # every fault released so far is behind this frame, the reader keeps up
+        if pending:
+            self.latencies.append(now - fault_times[0])
+            while fault_times and fault_times[0] <= now:
+                fault_times.popleft()
+
+
+def bench_blocking(profile: str, count: int, rate: float, seed: int) -> ResyncTracker:
+    clock = VirtualClock()
+    serial = MockSerial(
+        rate=rate, count=count, seed=seed, clock=clock, faults=PROFILES[profile]
+    ).connect()
+    sensor = TFMPSerial.from_serial(serial, clock=clock)
+    tracker = ResyncTracker(serial.stream)
+    try:
+        while not serial.exhausted:
+            sensor.update()
+            tracker.record(sensor.status)
+    finally:
+        serial.close()
+    return tracker
+
+
+def bench_async(profile: str, count: int, rate: float, seed: int) -> ResyncTracker:
+    clock = VirtualClock()
+
+    async def run() -> ResyncTracker:
+        reader = await AsyncMockSerial(
+            rate=rate, count=count, seed=seed, clock=clock, faults=PROFILES[profile]
+        ).connect()
+        sensor = AsyncTFMPSerial(reader, None, clock=clock)
+        tracker = ResyncTracker(reader.stream)
+        try:
+            while not reader.exhausted:
+                await sensor.update()
+                tracker.record(sensor.status)
+        finally:
+            await reader.close()
+        return tracker
+
+    return run_virtual(run(), clock)
+
+
+ENGINES = {"blocking": bench_blocking, "async": bench_async}
+
+
+def report(engine: str, profile: str, tracker: ResyncTracker, count: int, cpu: float):
+    injector = tracker.stream.injector
+    faults = injector.faults if injector else 0
+    latencies = np.asarray(tracker.latencies) * 1e3
+    if len(latencies):
+        p50, p99, worst = np.percentile(latencies, [50, 99, 100])
+        latency = f"{p50:7.2f} {p99:7.2f} {worst:7.2f}"
+    else:
+        latency = f"{'-':>7} {'-':>7} {'-':>7}"
+    print(
+        f"{engine:<8} {profile:<10} {faults:>7} {tracker.statuses[OK]:>7} "
+        f"{tracker.statuses[ERR_CHECKSUM]:>8} {tracker.resync_errors:>7} {tracker.timeouts:>8} "
+        f"{latency} {cpu / count * 1e6:9.2f}"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resynchronization Cost Benchmark")
+    parser.add_argument(
+        "-e", "--engine", nargs="+", default=list(ENGINES), choices=list(ENGINES)
+    )
+    parser.add_argument(
+        "-p", "--profile", nargs="+", default=list(PROFILES), choices=list(PROFILES)
+    )
+    parser.add_argument(
+        "-n", "--count", type=int, default=20000, help="Frames per run"
+    )
+    parser.add_argument("-r", "--rate", type=float, default=100.0, help="Frames per second")
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    print(
+        f"{'engine':<8} {'profile':<10} {'faults':>7} {'ok':>7} "
+        f"{'checksum':>8} {'resync':>7} {'timeouts':>8} "
+        f"{'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'cpu us/f':>9}"
+    )
+    for profile in args.profile:
+        for engine in args.engine:
+            cpu_start = time.process_time()
+            tracker = ENGINES[engine](profile, args.count, args.rate, args.seed)
+            report(engine, profile, tracker, args.count, time.process_time() - cpu_start)
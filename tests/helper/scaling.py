@@ -0,0 +1,232 @@
+"""
+per-sensor cost curves of the scaling suite
+
+fits `metric = fixed + per_sensor * sensors` per engine over the runs of
+`tests/perf/test_scaling.py`, and finds the sensor count where an engine stops
+scaling: the cpu spent per frame climbs `KNEE_FACTOR` above the cheapest smaller
+count, or the process saturates a core.
+
+the suite keeps its runs in `<test_id>/scaling`, apart from the other perf
+runs whose engines share names with these but read other streams. latency is
+the age of the writer's stamped frames when a reader has them (`latency/`,
+see `latency_log.py`).
+
+usage:
+    python -m tests.helper.scaling -i tests/perf/results/<test_id>/scaling
+"""
+
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from tests.helper.create_summary import (
+    aggregate,
+    get_color_for_mode,
+    parse_filename,
+    parse_log,
+)
+from tests.helper.latency_log import parse_latency
+from tests.helper.results_db import parse_params
+
+# the runs of the scaling suite, under a test id's results
+SCALING_DIR = "scaling"
+
+# key of `aggregate` -> (label, file name)
+SCALING_METRICS = {
+    "cpu": ("CPU (%)", "cpu"),
+    "rss": ("RSS (MB)", "rss"),
+    "wakeups": ("Wakeups/s", "wakeups"),
+    "latency_p50": ("Frame Latency p50 (ms)", "latency_p50"),
+    "latency_p99": ("Frame Latency p99 (ms)", "latency_p99"),
+    "delay_per_slice": ("Run-queue Delay per Slice (us)", "delay"),
+}
+
+KNEE_FACTOR = 1.5
+# cpu percent of a process that can't go faster, one core for a GIL-bound reader
+SATURATED_CPU = 95.0
+
+
+def collect(dir: Path) -> dict[str, dict[int, list[dict[str, float]]]]:
+    """aggregates of every run in `dir` (a scaling directory), by engine and sensor count"""
+    runs = defaultdict(lambda: defaultdict(list))
+    for f in sorted(dir.glob("*.log")) + sorted(dir.glob("*.bin")):
+        mode, param_str, _ = parse_filename(f.name)
+        if not param_str:
+            continue
+        params = parse_params(param_str)
+        log = parse_log(f)
+        if len(log["timestamp"]) == 0:
+            continue
+
+        stats = aggregate(log)
+        interval = float(params.get("interval", 0))
+        sensors = int(params["sensors"])
+        # cpu seconds per frame read, in microseconds
+        frames_per_sec = sensors / interval if interval else 0.0
+        stats["cpu_per_frame"] = (
+            stats["cpu"] / 100 / frames_per_sec * 1e6 if frames_per_sec else 0.0
+        )
+        stats["latency_p50"] = stats["latency_p99"] = float("nan")
+        latency_file = dir / "latency" / f"{f.stem}.jsonl"
+        if latency_file.exists():
+            # from the monitor's first sample, the warmup excluded
+            latencies = parse_latency(latency_file, since=log["timestamp"][0])
+            if len(latencies):
+                stats["latency_p50"], stats["latency_p99"] = (
+                    float(v) for v in np.percentile(latencies, [50, 99])
+                )
+        runs[mode][sensors].append(stats)
+    return runs
+
+
+def fit_linear(sensors: np.ndarray, values: np.ndarray) -> tuple[float, float, float]:
+    """
+    least squares `fixed + per_sensor * sensors`, returns fixed, per_sensor and
+    r². runs without a value (nan, e.g. no latency recorded) are left out.
+    """
+    known = np.isfinite(values)
+    sensors, values = sensors[known], values[known]
+    if len(values) == 0:
+        return float("nan"), float("nan"), float("nan")
+    if len(np.unique(sensors)) < 2:
+        return float(values.mean()), 0.0, 0.0
+    per_sensor, fixed = np.polyfit(sensors, values, 1)
+    residual = values - (fixed + per_sensor * sensors)
+    total = ((values - values.mean()) ** 2).sum()
+    r2 = 1 - (residual**2).sum() / total if total else 1.0
+    return float(fixed), float(per_sensor), float(r2)
+
+
+def find_knee(counts: list[int], cpu: list[float], cpu_per_frame: list[float]) -> int | None:
+    """first sensor count where the engine stopped scaling, `None` if it never did"""
+    best = float("inf")
+    for n, c, per_frame in zip(counts, cpu, cpu_per_frame):
+        if c >= SATURATED_CPU or per_frame > KNEE_FACTOR * best:
+            return n
+        best = min(best, per_frame)
+    return None
+
+
+def mean_of(trials: list[dict[str, float]], key: str) -> float:
+    """mean over the trials that have `key`, nan if none has"""
+    values = [t[key] for t in trials if np.isfinite(t[key])]
+    return float(np.mean(values)) if values else float("nan")
+
+
+def plot_scaling(runs, key: str, label: str, fits: dict, save_as: Path):
+    plt.figure(figsize=(10, 4))
+    for mode in sorted(runs):
+        counts = [n for n in sorted(runs[mode]) if np.isfinite(mean_of(runs[mode][n], key))]
+        if not counts:
+            continue
+        color = get_color_for_mode(mode)
+        xs = [n for n in counts for _ in runs[mode][n]]
+        ys = [t[key] for n in counts for t in runs[mode][n]]
+        plt.scatter(xs, ys, color=color, alpha=0.5, s=12)
+        means = [mean_of(runs[mode][n], key) for n in counts]
+        plt.plot(counts, means, color=color, label=mode.capitalize())
+        fixed, per_sensor, _ = fits[mode][key]
+        grid = np.linspace(min(counts), max(counts), 100)
+        plt.plot(grid, fixed + per_sensor * grid, color=color, linestyle="--", alpha=0.6)
+    plt.xscale("log", base=2)
+    plt.title(f"{label} by Sensor Count")
+    plt.xlabel("Sensors")
+    plt.ylabel(label)
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(save_as, dpi=200, bbox_inches="tight")
+    plt.close()
+
+
+def summarize_scaling(dir: Path):
+    runs = collect(dir)
+    if not runs:
+        print(f"[!] No scaling runs in {dir}")
+        return
+
+    fits = {}
+    for mode, by_count in runs.items():
+        sensors = np.array([n for n in by_count for _ in by_count[n]], dtype=float)
+        fits[mode] = {
+            key: fit_linear(
+                sensors, np.array([t[key] for n in by_count for t in by_count[n]])
+            )
+            for key in SCALING_METRICS
+        }
+
+    img_dir = dir / "img" / "scaling"
+    img_dir.mkdir(parents=True, exist_ok=True)
+    readme_lines = ["# Scaling", ""]
+    for key, (label, name) in SCALING_METRICS.items():
+        plot_scaling(runs, key, label, fits, img_dir / f"{name}.png")
+        readme_lines.append(f"![{name}](./img/scaling/{name}.png)")
+
+    readme_lines.extend(
+        [
+            "",
+            "## Cost Model (`fixed + per_sensor * sensors`)",
+            "",
+            "| Mode | Metric | Fixed | Per Sensor | R² |",
+            "|------|--------|-------|------------|----|",
+        ]
+    )
+    for mode in sorted(fits):
+        for key, (label, _) in SCALING_METRICS.items():
+            fixed, per_sensor, r2 = fits[mode][key]
+            readme_lines.append(
+                f"| {mode} | {label} | {fixed:.3f} | {per_sensor:.4f} | {r2:.3f} |"
+            )
+
+    readme_lines.extend(
+        [
+            "",
+            "## Per Sensor Count",
+            "",
+            "| Mode | Sensors | CPU (%) | CPU per Frame (us) | RSS (MB) | Threads | Wakeups/s | Latency p50 (ms) | Latency p99 (ms) | Delay per Slice (us) | Trials |",
+            "|------|---------|---------|--------------------|----------|---------|-----------|------------------|------------------|----------------------|--------|",
+        ]
+    )
+    knees = {}
+    for mode in sorted(runs):
+        counts = sorted(runs[mode])
+        means = {n: {k: mean_of(runs[mode][n], k) for k in runs[mode][n][0]} for n in counts}
+        for n in counts:
+            m = means[n]
+            readme_lines.append(
+                f"| {mode} | {n} | {m['cpu']:.2f} | {m['cpu_per_frame']:.2f} | {m['rss']:.2f} | {m['threads']:.1f} | {m['wakeups']:.1f} | {m['latency_p50']:.2f} | {m['latency_p99']:.2f} | {m['delay_per_slice']:.1f} | {len(runs[mode][n])} |"
+            )
+        knees[mode] = find_knee(
+            counts,
+            [means[n]["cpu"] for n in counts],
+            [means[n]["cpu_per_frame"] for n in counts],
+        )
+
+    readme_lines.extend(
+        [
+            "",
+            "## Scaling Limit",
+            "",
+            f"first sensor count where cpu per frame exceeds {KNEE_FACTOR}x the cheapest smaller count, or cpu reaches {SATURATED_CPU:.0f}%",
+            "",
+            "| Mode | Stops Scaling At |",
+            "|------|------------------|",
+        ]
+    )
+    for mode in sorted(knees):
+        knee = knees[mode]
+        readme_lines.append(f"| {mode} | {knee if knee is not None else '-'} |")
+    readme_lines.append("")
+
+    (dir / "SCALING.md").write_text("\n".join(readme_lines), encoding="utf-8")
+    print(f"[✓] Scaling summary saved to {dir / 'SCALING.md'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--id", required=True, type=Path)
+    args = parser.parse_args()
+
+    summarize_scaling(args.id)
@@ -1,6 +1,8 @@
 import time
 from serial import Serial, SerialTimeoutException
 
+from src.sensor.faults import FaultInjector, FaultProfile, PROFILES, get_profile
+
 
 def serial_write(
     port: str,
@@ -8,13 +10,21 @@ def serial_write(
     frame: bytes = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7",
     interval: float = 0.01,
     use_monotonic: bool = False,
+    faults: FaultProfile | None = None,
+    seed: int | None = None,
 ):
+    if faults is not None and not faults.clean:
+        injector = FaultInjector(faults, seed)
+        frames = iter(lambda: injector.apply(frame), None)
+    else:
+        frames = iter(lambda: frame, None)
+
     with Serial(port, baudrate, timeout=1) as serial:
         try:
             if use_monotonic:
                 next_time = time.monotonic()
                 while True:
-                    serial.write(frame)
+                    serial.write(next(frames))
                     serial.flush()
 
                     next_time += interval
@@ -25,7 +35,7 @@ def serial_write(
                         next_time = time.monotonic()
             else:
                 while True:
-                    serial.write(frame)
+                    serial.write(next(frames))
                     serial.flush()
                     time.sleep(interval)
         except SerialTimeoutException as e:
@@ -67,5 +77,38 @@ if __name__ == "__main__":
         help="Use time.monotonic() loop for precise timing",
     )
 
+    parser.add_argument(
+        "-c",
+        "--corruption",
+        type=str,
+        default="clean",
+        choices=list(PROFILES),
+        help="Line fault profile (default: clean)",
+    )
+    parser.add_argument("--bit-flip", type=float, help="Per byte bit flip rate")
+    parser.add_argument("--drop", type=float, help="Per frame dropped byte rate")
+    parser.add_argument("--garbage", type=float, help="Per frame inserted garbage rate")
+    parser.add_argument("--truncate", type=float, help="Per frame truncation rate")
+    parser.add_argument(
+        "--false-header", type=float, help="Per frame rate of 0x59 0x59 in the payload"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Fault injection seed")
+
     args = parser.parse_args()
-    serial_write(args.port, args.baudrate, args.frame, args.interval, args.monotonic)
+    faults = get_profile(
+        args.corruption,
+        bit_flip=args.bit_flip,
+        drop=args.drop,
+        garbage=args.garbage,
+        truncate=args.truncate,
+        false_header=args.false_header,
+    )
+    serial_write(
+        args.port,
+        args.baudrate,
+        args.frame,
+        args.interval,
+        args.monotonic,
+        faults,
+        args.seed,
+    )
@@ -0,0 +1,211 @@
+"""
+run the reader loops in simulated time
+
+every sensor reads a mock port on a `VirtualClock`, sleeps and timeouts only
+move the clock forward, so hours of traffic take as long as parsing them does.
+the blocking engine gives every sensor its own clock and runs them one after
+another (they share nothing), the async engine runs all of them on one
+`VirtualEventLoop`. with `-s wheel` both poll all sensors from one timer wheel.
+
+usage:
+    python -m tests.helper.simulate -e async -n 4 -d 3600 -r 100 --error-rate 0.01
+"""
+
+import sys
+import time
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import TFMPSerial
+from src.sensor.clock import VirtualClock, run_virtual
+from src.sensor.mock import AsyncMockSerial, MockSerial
+from src.sensor.pacing import FramePacer
+from tests.helper import async_reader, blocking_reader
+
+
+class StatusCounter:
+    """counts the status of every update of the wrapped sensor, and the time spent in them"""
+
+    def __init__(self, sensor):
+        self.sensor = sensor
+        self.statuses = Counter()
+        self.blocked = 0.0
+
+    def __getattr__(self, name):
+        # `status`, the port and the frame size, for the pacer
+        return getattr(self.sensor, name)
+
+
+class BlockingStatusCounter(StatusCounter):
+    def update(self, wait: bool = True):
+        start = self.sensor.clock.monotonic()
+        read = self.sensor.update(wait)
+        self.blocked += self.sensor.clock.monotonic() - start
+        if wait or read:
+            self.statuses[self.sensor.status] += 1
+        return read
+
+
+class AsyncStatusCounter(StatusCounter):
+    async def update(self, wait: bool = True):
+        start = self.sensor.clock.monotonic()
+        read = await self.sensor.update(wait)
+        self.blocked += self.sensor.clock.monotonic() - start
+        if wait or read:
+            self.statuses[self.sensor.status] += 1
+        return read
+
+
+@dataclass
+class Simulation:
+    statuses: Counter = field(default_factory=Counter)
+    blocked: float = 0.0  # seconds spent inside updates
+    wakeups: int = 0  # sleeps and timer waits of the readers
+
+    def add(self, sensor: StatusCounter):
+        self.statuses += sensor.statuses
+        self.blocked += sensor.blocked
+
+
+def simulate_blocking(
+    sensors: int,
+    duration: float,
+    interval: float,
+    pacing: str = "fixed",
+    scheduler: str = "tasks",
+    **mock,
+) -> Simulation:
+    result = Simulation()
+    if scheduler == "wheel":
+        # one thread polls every port, they share its clock
+        clock = VirtualClock()
+        serials = [MockSerial(clock=clock, seed=i, **mock).connect() for i in range(sensors)]
+        counters = [
+            BlockingStatusCounter(TFMPSerial.from_serial(serial, clock=clock))
+            for serial in serials
+        ]
+        blocking_reader.poll_sensors(counters, interval, clock, until=duration)
+        for serial, sensor in zip(serials, counters):
+            serial.close()
+            result.add(sensor)
+        result.wakeups = clock.wakeups
+        return result
+
+    for i in range(sensors):
+        clock = VirtualClock()
+        serial = MockSerial(clock=clock, seed=i, **mock).connect()
+        sensor = BlockingStatusCounter(TFMPSerial.from_serial(serial, clock=clock))
+        pacer = FramePacer(interval, clock) if pacing == "adaptive" else None
+        blocking_reader.poll_sensor(sensor, interval, clock, until=duration, pacer=pacer)
+        serial.close()
+        result.add(sensor)
+        result.wakeups += clock.wakeups
+    return result
+
+
+def simulate_async(
+    sensors: int,
+    duration: float,
+    interval: float,
+    pacing: str = "fixed",
+    scheduler: str = "tasks",
+    **mock,
+) -> Simulation:
+    clock = VirtualClock()
+
+    async def open_one(i: int) -> AsyncStatusCounter:
+        reader = await AsyncMockSerial(clock=clock, seed=i, **mock).connect()
+        return AsyncStatusCounter(AsyncTFMPSerial(reader, None, clock=clock))
+
+    async def run_one(sensor: AsyncStatusCounter):
+        pacer = FramePacer(interval, clock) if pacing == "adaptive" else None
+        await async_reader.poll_sensor(sensor, interval, clock, until=duration, pacer=pacer)
+
+    async def run_all() -> Simulation:
+        counters = [await open_one(i) for i in range(sensors)]
+        if scheduler == "wheel":
+            await async_reader.poll_sensors(counters, interval, clock, until=duration)
+        else:
+            await asyncio.gather(*(run_one(sensor) for sensor in counters))
+        result = Simulation()
+        for sensor in counters:
+            await sensor._reader.close()
+            result.add(sensor)
+        return result
+
+    result = run_virtual(run_all(), clock)
+    result.wakeups = clock.wakeups
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run Reader Loops in Simulated Time")
+    parser.add_argument(
+        "-e", "--engine", type=str, default="blocking", help="blocking or async"
+    )
+    parser.add_argument("-n", "--sensors", type=int, default=1, help="Sensors to run")
+    parser.add_argument(
+        "-d", "--duration", type=float, default=60.0, help="Simulated seconds"
+    )
+    parser.add_argument(
+        "-i", "--interval", type=float, default=0.0, help="Sleep between updates"
+    )
+    parser.add_argument(
+        "-p", "--pacing", type=str, default="fixed", help="fixed or adaptive"
+    )
+    parser.add_argument(
+        "-s", "--scheduler", type=str, default="tasks", help="tasks or wheel"
+    )
+    parser.add_argument("-r", "--rate", type=float, default=100.0, help="Frames per second")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "-b", "--baudrate", type=int, default=None, help="Pace bytes like an 8N1 line"
+    )
+    parser.add_argument(
+        "-w", "--wire-chunk", type=int, default=1, help="Bytes per paced chunk"
+    )
+
+    args = parser.parse_args()
+    if args.engine == "blocking":
+        simulate = simulate_blocking
+    elif args.engine == "async":
+        simulate = simulate_async
+    else:
+        sys.exit("no engine is matching!")
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    result = simulate(
+        args.sensors,
+        args.duration,
+        args.interval,
+        pacing=args.pacing,
+        scheduler=args.scheduler,
+        rate=args.rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        baudrate=args.baudrate,
+        wire_chunk=args.wire_chunk,
+    )
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+    simulated = args.duration * args.sensors
+    print(
+        f"engine={args.engine} pacing={args.pacing} scheduler={args.scheduler}"
+        f" sensors={args.sensors} duration={args.duration}s"
+    )
+    updates = sum(result.statuses.values())
+    print(f"updates={updates} statuses={dict(result.statuses)}")
+    print(
+        f"blocked in update: {result.blocked / simulated:.1%}"
+        f" ({result.blocked / max(updates, 1) * 1e3:.3f} ms/update)"
+    )
+    print(f"wakeups={result.wakeups} ({result.wakeups / args.duration:.0f}/s)")
+    print(f"elapsed={elapsed:.3f}s cpu={cpu:.3f}s")
+    print(f"{simulated / elapsed:.0f}x realtime (sensor-seconds per second)")
@@ -0,0 +1,116 @@
+"""
+sampling profiler for the reader processes
+
+`SIGPROF` fires every `interval` seconds of cpu time the process burns (all
+threads together). the kernel hands a process-wide signal to any thread that
+doesn't block it, and cpython only runs python handlers on the main thread:
+ticks landing on a worker while the main thread sleeps would wait for it and
+collapse into one. so `start` blocks `SIGPROF` before the reader starts its
+threads, every thread inherits the mask, and a dedicated sampler thread takes
+the ticks with `sigwait`. ticks merged by the kernel are made up for with the
+process cpu time passed since the last sample.
+
+an idle reader is not sampled at all, a busy one costs one stack walk per
+thread and sample. every thread is recorded on every sample: a thread that
+hasn't moved may be waiting in select or sleep, or burning cpu in one long c
+call, and only the second is worth a profile. waiting stacks end in the
+blocking call and are easy to fold away.
+
+stacks are written at exit in collapsed format, one `frame;frame;... count`
+line per stack, rooted at the thread name. flamegraph.pl, speedscope and
+inferno read it as is.
+"""
+
+import atexit
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import CodeType
+
+# seconds of cpu time between samples
+SAMPLE_INTERVAL = 0.005
+
+
+class StackSampler:
+    def __init__(self, path: Path, interval: float = SAMPLE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "StackSampler":
+        """call before starting other threads, they inherit the blocked `SIGPROF`"""
+        self._running = True
+        # a thread started earlier may still take a tick, don't let it kill the process
+        signal.signal(signal.SIGPROF, lambda *_: None)
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGPROF})
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.pthread_kill(self._thread.ident, signal.SIGPROF)
+        self._thread.join()
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGPROF})
+        self.write()
+
+    def _run(self):
+        last = time.process_time()
+        while True:
+            signal.sigwait({signal.SIGPROF})
+            if not self._running:
+                return
+            now = time.process_time()
+            ticks = max(1, int((now - last) / self.interval))
+            last += ticks * self.interval
+            self._sample(ticks)
+
+    def write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+            # `;` separates frames
+            label = self._labels[code] = label.replace(";", ":")
+        return label
+
+    def _sample(self, ticks: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, top in sys._current_frames().items():
+            if ident == self._thread.ident:
+                continue
+
+            labels = []
+            f = top
+            while f is not None:
+                labels.append(self._label(f.f_code))
+                f = f.f_back
+            labels.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(labels))] += ticks
+
+
+def exit_on_sigterm():
+    """turn the harness' SIGTERM into a normal exit, so atexit hooks run"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+
+def start_sampler(path: Path, interval: float = SAMPLE_INTERVAL) -> StackSampler:
+    exit_on_sigterm()
+    return StackSampler(path, interval).start()
@@ -1,11 +1,38 @@
 import os
+import pty
+import resource
+import shutil
 import subprocess
+import tty
 from subprocess import Popen, PIPE, STDOUT
 import time
 import re
 from contextlib import ExitStack, contextmanager
 from typing import Iterator, Generator
 from datetime import datetime
+from pathlib import Path
+
+
+# interpreters tried for free-threaded runs, newest first
+FREE_THREADED_PYTHONS = ("python3.14t", "python3.13t")
+
+
+def find_free_threaded_python() -> str | None:
+    """
+    a free-threaded interpreter that runs the readers without the GIL,
+    `PERF_FREE_THREADED_PYTHON` overrides the lookup on `PATH`
+    """
+    candidates = [os.environ.get("PERF_FREE_THREADED_PYTHON")]
+    candidates += [shutil.which(name) for name in FREE_THREADED_PYTHONS]
+    for python in filter(None, candidates):
+        # pyserial must be installed, and nothing may turn the GIL back on
+        check = "import sys, serial; sys.exit(sys._is_gil_enabled())"
+        try:
+            if subprocess.run([python, "-c", check], capture_output=True).returncode == 0:
+                return python
+        except OSError:
+            continue
+    return None
 
 
 def wait_for_writer_ready(port: str, timeout: float = 3.0):
@@ -23,13 +50,15 @@ def wait_for_writer_ready(port: str, timeout: float = 3.0):
 
 @contextmanager
 def run_serial_writers(
-    writer_ports: list[str], interval: float = 0.01
+    writer_ports: list[str], interval: float = 0.01, corruption: str = "clean"
 ) -> Generator[list[Popen], None, None]:
     writers = []
 
     with ExitStack() as stack:
-        for _, port in enumerate(writer_ports):
-            writer = stack.enter_context(run_serial_writer(port, interval=interval))
+        for i, port in enumerate(writer_ports):
+            writer = stack.enter_context(
+                run_serial_writer(port, interval=interval, corruption=corruption, seed=i)
+            )
             writers.append(writer)
         yield writers
 
@@ -41,12 +70,15 @@ def run_serial_writer(
     frame: bytes = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7",
     interval: float = 0.01,
     monotonic: bool = False,
+    corruption: str = "clean",
+    seed: int | None = None,
 ):
     print("start serial writer")
 
     args = [
         "python3",
-        "tests/helper/serial_writer.py",
+        "-m",
+        "tests.helper.serial_writer",
         writer_port,
         "-b",
         str(baudrate),
@@ -54,10 +86,14 @@ def run_serial_writer(
         frame.hex(),
         "-i",
         str(interval),
+        "-c",
+        corruption,
     ]
 
     if monotonic:
         args.append("-m")
+    if seed is not None:
+        args += ["--seed", str(seed)]
 
     proc = subprocess.Popen(
         args,
@@ -76,18 +112,89 @@ def run_serial_writer(
 
 
 @contextmanager
-def run_async_reader(*reader_ports, interval: float = 0.01):
+def run_multi_serial_writer(
+    writer_ports: list[str],
+    baudrate: int = 9600,
+    frame: bytes = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7",
+    interval: float = 0.01,
+    corruption: str = "clean",
+    wire_chunk: int = 0,
+    pass_fds: tuple[int, ...] = (),
+    stamp: bool = False,
+    respond: bool = False,
+) -> Generator[Popen, None, None]:
+    """one writer process for all ports, see `multi_writer.py`"""
+    print("start multi serial writer")
+    args = [
+        "python3",
+        "-m",
+        "tests.helper.multi_writer",
+        *writer_ports,
+        "-b",
+        str(baudrate),
+        "-f",
+        frame.hex(),
+        "-i",
+        str(interval),
+        "-c",
+        corruption,
+        "-w",
+        str(wire_chunk),
+    ]
+    if stamp:
+        args.append("--stamp")
+    if respond:
+        args.append("--respond")
+    proc = subprocess.Popen(args, pass_fds=pass_fds)
+    try:
+        for writer_port in writer_ports:
+            if not writer_port.startswith("fd:"):
+                wait_for_writer_ready(writer_port, timeout=2.0)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@contextmanager
+def run_async_reader(
+    *reader_ports,
+    interval: float = 0.01,
+    type: str = "uvloop",
+    profile: Path | None = None,
+    sample: Path | None = None,
+    loop_stats: Path | None = None,
+    pacing: str = "adaptive",
+    scheduler: str = "tasks",
+    latency: Path | None = None,
+):
     print("start async reader process")
-    proc = subprocess.Popen(
-        [
-            "python3",
-            "-m",
-            "tests.helper.async_reader",
-            *reader_ports,
-            "-i",
-            str(interval),
-        ]
-    )
+    args = [
+        "python3",
+        "-m",
+        "tests.helper.async_reader",
+        *reader_ports,
+        "-i",
+        str(interval),
+        "-t",
+        type,
+        "--pacing",
+        pacing,
+        "--scheduler",
+        scheduler,
+    ]
+    if profile is not None:
+        args += ["-p", str(profile)]
+    if sample is not None:
+        args += ["-s", str(sample)]
+    if loop_stats is not None:
+        args += ["-l", str(loop_stats)]
+    if latency is not None:
+        args += ["--latency", str(latency)]
+    proc = subprocess.Popen(args)
     try:
         for reader_port in reader_ports:
             wait_for_writer_ready(reader_port, timeout=2.0)
@@ -101,18 +208,78 @@ def run_async_reader(*reader_ports, interval: float = 0.01):
 
 
 @contextmanager
-def run_blocking_reader(*reader_ports, interval: float = 0.01):
+def run_hybrid_reader(
+    *reader_ports,
+    interval: float = 0.01,
+    type: str = "uvloop",
+    linger: float | None = None,
+    sample: Path | None = None,
+    loop_stats: Path | None = None,
+    pacing: str = "adaptive",
+    latency: Path | None = None,
+):
+    print("start hybrid reader process")
+    args = [
+        "python3",
+        "-m",
+        "tests.helper.hybrid_reader",
+        *reader_ports,
+        "-i",
+        str(interval),
+        "-t",
+        type,
+        "--pacing",
+        pacing,
+    ]
+    if linger is not None:
+        args += ["--linger", str(linger)]
+    if sample is not None:
+        args += ["-s", str(sample)]
+    if loop_stats is not None:
+        args += ["-l", str(loop_stats)]
+    if latency is not None:
+        args += ["--latency", str(latency)]
+    proc = subprocess.Popen(args)
+    try:
+        for reader_port in reader_ports:
+            wait_for_writer_ready(reader_port, timeout=2.0)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@contextmanager
+def run_blocking_reader(
+    *reader_ports,
+    interval: float = 0.01,
+    type: str = "naive",
+    sample: Path | None = None,
+    pacing: str = "adaptive",
+    python: str = "python3",
+    latency: Path | None = None,
+):
     print("start blocking reader process")
-    proc = subprocess.Popen(
-        [
-            "python3",
-            "-m",
-            "tests.helper.blocking_reader",
-            *reader_ports,
-            "-i",
-            str(interval),
-        ]
-    )
+    args = [
+        python,
+        "-m",
+        "tests.helper.blocking_reader",
+        *reader_ports,
+        "-i",
+        str(interval),
+        "-t",
+        type,
+        "--pacing",
+        pacing,
+    ]
+    if sample is not None:
+        args += ["-s", str(sample)]
+    if latency is not None:
+        args += ["--latency", str(latency)]
+    proc = subprocess.Popen(args)
     try:
         for reader_port in reader_ports:
             wait_for_writer_ready(reader_port, timeout=2.0)
@@ -126,22 +293,30 @@ def run_blocking_reader(*reader_ports, interval: float = 0.01):
 
 
 @contextmanager
-def run_metric_monitor(target_pid, test_id: str | None = None, type: str = "blocking"):
+def run_metric_monitor(
+    target_pid,
+    test_id: str | None = None,
+    type: str = "blocking",
+    log_format: str = "bin",
+):
     if test_id is None:
         test_id = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    file_name = type + ".log"
+    file_name = type + (".bin" if log_format == "bin" else ".log")
     print("start monitor process")
     proc = subprocess.Popen(
         [
             "python3",
-            "tests/helper/metric_monitor.py",
+            "-m",
+            "tests.helper.metric_monitor",
             "-p",
             str(target_pid),
             "--id",
             test_id,
             "-f",
             file_name,
+            "-F",
+            log_format,
         ]
     )
     time.sleep(0.1)
@@ -206,3 +381,41 @@ def run_virtual_serial_pair() -> Iterator[tuple[Popen, str, str]]:
             proc.wait(timeout=2)
         except Exception:
             proc.kill()
+
+
+def raise_fd_limit(needed: int):
+    """raise the soft open file limit to `needed`, fails if the hard limit is lower"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        if hard != resource.RLIM_INFINITY and hard < needed:
+            raise RuntimeError(f"{needed} file descriptors needed, hard limit is {hard}")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+
+@contextmanager
+def run_pty_pairs(count: int) -> Generator[list[tuple[int, str]], None, None]:
+    """
+    `count` pty pairs without socat, as (master fd, slave path).
+    the writer writes the inherited master (`fd:<n>`), the reader opens the slave.
+    two descriptors per pair stay open here (master and slave), a socat pair
+    costs a process. the third descriptor of a pair is the reader's own open of
+    the slave, in the reader process.
+    """
+    # the master and slave of every pair, plus headroom for the rest of pytest.
+    # writer and reader inherit the limit and hold one descriptor per pair each
+    raise_fd_limit(2 * count + 64)
+    pairs = []
+    try:
+        for _ in range(count):
+            master, slave = pty.openpty()
+            tty.setraw(master)
+            # keep the slave open, so the line stays up between reader reconnects
+            pairs.append((master, slave))
+        yield [(master, os.ttyname(slave)) for master, slave in pairs]
+    finally:
+        for master, slave in pairs:
+            for fd in (master, slave):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
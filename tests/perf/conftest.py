@@ -1,12 +1,21 @@
 from dataclasses import dataclass, field, fields
+import os
+import random
 import pytest
 from typing import Generator
 from datetime import datetime
 from pathlib import Path
 
-from tests.helper.create_summary import summarize_results
+from tests.helper.create_summary import (
+    summarize_loop_stats,
+    summarize_profiles,
+    summarize_results,
+)
+from tests.helper.results_db import connect, ingest
 from tests.helper.subprocess_managers import (
+    find_free_threaded_python,
     run_metric_monitor,
+    run_multi_serial_writer,
     run_serial_writer,
     run_serial_writers,
     run_virtual_serial_pair,
@@ -14,11 +23,71 @@ from tests.helper.subprocess_managers import (
 )
 
 
-# test inputs
+def env_list(name: str, default: list[str]) -> list[str]:
+    """comma separated values of the env var `name`, `default` when it is unset"""
+    value = os.environ.get(name)
+    return value.split(",") if value else default
+
+
+# test inputs. the default matrix is one run per combination of the baseline
+# dimensions, the others are opt-in through `PERF_*` env vars like `PERF_SEED`
 num_sensors = [1, 2, 4]
 intervals: list[float] = [0.1, 0.01, 0.005]
 runtimes: list[int] = [5]
-loop: list = ["default", "uvloop"]
+# event loop backends of the async reader, see `LOOPS` in `async_reader.py`,
+# e.g. `PERF_LOOPS=default,uvloop`
+loop: list[str] = env_list("PERF_LOOPS", ["default"])
+# write a cProfile of every async run next to its metric log
+profile_async: bool = False
+# record event loop lag and per-sensor step timings of async runs into `loop/<run>.jsonl`
+loop_stats: bool = True
+# sample the stacks of every reader into `stacks/<run>.folded`, see `stack_sampler.py`
+sample_stacks: bool = False
+# drive all ports from one writer process instead of one process per port
+single_writer: bool = True
+# line speeds, the single writer paces bytes at this rate, `wire_chunk` per write
+# (`wire_chunk = 0` writes whole frames at once like a bare pty)
+baudrates: list[int] = [115200]
+wire_chunk: int = 1
+# line fault profiles of the writers, see `src/sensor/faults.py`,
+# e.g. `PERF_CORRUPTIONS=clean,vibration`
+corruptions: list[str] = env_list("PERF_CORRUPTIONS", ["clean"])
+# sleep of the reader loops, `fixed` interval or `adaptive` to the frame arrivals,
+# e.g. `PERF_PACINGS=fixed,adaptive`
+pacings: list[str] = env_list("PERF_PACINGS", ["fixed"])
+# with `PERF_FREE_THREADED=1`, also run the blocking reader on a free-threaded
+# interpreter (3.13t/3.14t) if one is found, as mode `block-ft`
+free_threaded: bool = os.environ.get("PERF_FREE_THREADED") == "1"
+# every combination runs `PERF_REPETITIONS` times in a shuffled, interleaved order.
+# `results_db compare` tests the runs, 5 a side is the least that can reach p < 0.01
+repetitions: int = int(os.environ.get("PERF_REPETITIONS", 1))
+# seconds a reader runs before its metrics are recorded
+warmup: float = 1.0
+
+
+FREE_THREADED_PYTHON: str | None = find_free_threaded_python() if free_threaded else None
+# mode suffix -> interpreter of the blocking reader
+blocking_pythons: dict[str, str] = {"": "python3"}
+if FREE_THREADED_PYTHON is not None:
+    blocking_pythons["ft"] = FREE_THREADED_PYTHON
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    shuffle perf tests so repetitions of one combination are spread over the session
+    and slow drifts (thermal throttling, background load) don't favor one engine.
+    set `PERF_SEED` to reproduce an order. modules get mixed too, which is why
+    `test_id` and the summaries hanging off it are session-scoped.
+    """
+    seed = int(os.environ.get("PERF_SEED", random.randrange(2**32)))
+    print(f"perf test order seed: PERF_SEED={seed}")
+
+    here = Path(__file__).parent
+    indices = [i for i, item in enumerate(items) if item.path.is_relative_to(here)]
+    shuffled = [items[i] for i in indices]
+    random.Random(seed).shuffle(shuffled)
+    for i, item in zip(indices, shuffled):
+        items[i] = item
 
 
 @pytest.fixture(params=num_sensors)
@@ -36,14 +105,49 @@ def runtime(request) -> int:
     return request.param
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(params=loop)
+def loop_type(request) -> str:
+    return request.param
+
+
+@pytest.fixture(params=baudrates)
+def baudrate(request) -> int:
+    return request.param
+
+
+@pytest.fixture(params=corruptions)
+def corruption(request) -> str:
+    return request.param
+
+
+@pytest.fixture(params=pacings)
+def pacing(request) -> str:
+    return request.param
+
+
+@pytest.fixture(params=list(blocking_pythons))
+def blocking_python(request) -> str:
+    return request.param
+
+
+@pytest.fixture(params=range(repetitions))
+def repetition(request) -> int:
+    return request.param
+
+
+@pytest.fixture(scope="session")
 def test_id() -> Generator[str, None, None]:
     tid = datetime.now().strftime("%Y%m%d_%H%M%S")
     yield tid
     print("=" * 100)
     print("SUMMARIZE RESULTS")
     print("=" * 100)
-    summarize_results(Path(__file__).parent / "results" / tid)
+    result_dir = Path(__file__).parent / "results" / tid
+    summarize_results(result_dir)
+    summarize_profiles(result_dir)
+    summarize_loop_stats(result_dir)
+    with connect() as conn:
+        ingest(result_dir, conn)
 
 
 @dataclass
@@ -51,6 +155,11 @@ class Parameter:
     sensors: int = field(metadata={"tagged": True})
     interval: float = field(metadata={"tagged": True})
     runtime: int = field(metadata={"tagged": True})
+    baudrate: int = field(default=9600, metadata={"tagged": True})
+    corruption: str = field(default="clean", metadata={"tagged": True})
+    pacing: str = field(default="fixed", metadata={"tagged": True})
+    repetition: int = field(default=0, metadata={"tagged": False})
+    warmup: float = field(default=0.0, metadata={"tagged": False})
 
     def __repr__(self) -> str:
         return "_".join(
@@ -59,10 +168,24 @@ class Parameter:
             if f.metadata.get("tagged")
         )
 
+    def log_name(self, mode: str) -> str:
+        return f"{mode}_{self}__rep-{self.repetition}"
+
 
 @pytest.fixture
-def test_params(sensors, interval, runtime) -> Parameter:
-    return Parameter(sensors=sensors, interval=interval, runtime=runtime)
+def test_params(
+    sensors, interval, runtime, baudrate, corruption, pacing, repetition
+) -> Parameter:
+    return Parameter(
+        sensors=sensors,
+        interval=interval,
+        runtime=runtime,
+        baudrate=baudrate,
+        corruption=corruption,
+        pacing=pacing,
+        repetition=repetition,
+        warmup=warmup,
+    )
 
 
 @pytest.fixture
@@ -82,16 +205,37 @@ def serial_writer(
     virtual_serial_port, test_params
 ) -> Generator[tuple[str, int], None, None]:
     writer, reader = virtual_serial_port
-    with run_serial_writer(writer, interval=test_params.interval) as proc:
+    with run_serial_writer(
+        writer,
+        baudrate=test_params.baudrate,
+        interval=test_params.interval,
+        corruption=test_params.corruption,
+    ) as proc:
         yield reader, proc.pid
 
 
 @pytest.fixture
 def serial_writers(
-    virtual_serial_ports: list[tuple[str, str]], interval: int
+    virtual_serial_ports: list[tuple[str, str]],
+    interval: int,
+    baudrate: int,
+    corruption: str,
 ) -> Generator[list[tuple[str, int]], None, None]:
+    if single_writer:
+        with run_multi_serial_writer(
+            [w for w, _ in virtual_serial_ports],
+            baudrate=baudrate,
+            interval=interval,
+            corruption=corruption,
+            wire_chunk=wire_chunk,
+            # frame latency is read from the stamps, see `latency_log.py`
+            stamp=True,
+        ) as writer:
+            yield [(r, writer.pid) for _, r in virtual_serial_ports]
+        return
+
     with run_serial_writers(
-        [w for w, _ in virtual_serial_ports], interval=interval
+        [w for w, _ in virtual_serial_ports], interval=interval, corruption=corruption
     ) as writers:
         yield [(r, w.pid) for (_, r), w in zip(virtual_serial_ports, writers)]
 
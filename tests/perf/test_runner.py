@@ -13,31 +13,85 @@ variables:
 
 import pytest
 import time
+from pathlib import Path
 
-from .conftest import Parameter
+from .conftest import Parameter, blocking_pythons, loop_stats, profile_async, sample_stacks
 from tests.helper.subprocess_managers import (
     run_async_reader,
     run_blocking_reader,
+    run_hybrid_reader,
     run_metric_monitor,
 )
 
 
-def test_async(reader_ports: list[str], test_id: str, test_params: Parameter):
+def latency_file(test_id: str, log_name: str) -> Path:
+    """frame ages of the run, the writers stamp their frames (see `serial_writers`)"""
+    return Path(__file__).parent / "results" / test_id / "latency" / f"{log_name}.jsonl"
+
+
+def stack_file(test_id: str, log_name: str) -> Path | None:
+    if not sample_stacks:
+        return None
+    return Path(__file__).parent / "results" / test_id / "stacks" / f"{log_name}.folded"
+
+
+def test_async(
+    reader_ports: list[str], test_id: str, test_params: Parameter, loop_type: str
+):
     print(f"{reader_ports=} in test")
-    with run_async_reader(*reader_ports, interval=test_params.interval) as reader_proc:
-        with run_metric_monitor(
-            reader_proc.pid,
-            test_id,
-            type=f"async_{test_params}",
-        ):
+    log_name = test_params.log_name(f"async-{loop_type}")
+    result_dir = Path(__file__).parent / "results" / test_id
+    profile = result_dir / "profiles" / f"{log_name}.pstats" if profile_async else None
+    loop_file = result_dir / "loop" / f"{log_name}.jsonl" if loop_stats else None
+    with run_async_reader(
+        *reader_ports,
+        interval=test_params.interval,
+        type=loop_type,
+        profile=profile,
+        sample=stack_file(test_id, log_name),
+        loop_stats=loop_file,
+        pacing=test_params.pacing,
+        latency=latency_file(test_id, log_name),
+    ) as reader_proc:
+        time.sleep(test_params.warmup)
+        with run_metric_monitor(reader_proc.pid, test_id, type=log_name):
+            time.sleep(test_params.runtime)
+
+
+def test_blocking(
+    reader_ports: list[str], test_id: str, test_params: Parameter, blocking_python: str
+):
+    mode = f"block-{blocking_python}" if blocking_python else "block"
+    log_name = test_params.log_name(mode)
+    with run_blocking_reader(
+        *reader_ports,
+        interval=test_params.interval,
+        sample=stack_file(test_id, log_name),
+        pacing=test_params.pacing,
+        python=blocking_pythons[blocking_python],
+        latency=latency_file(test_id, log_name),
+    ) as reader_proc:
+        time.sleep(test_params.warmup)
+        with run_metric_monitor(reader_proc.pid, test_id, type=log_name):
             time.sleep(test_params.runtime)
 
 
-def test_blocking(reader_ports: list[str], test_id: str, test_params: Parameter):
-    with run_blocking_reader(*reader_ports, interval=test_params.interval) as reader_proc:
-        with run_metric_monitor(
-            reader_proc.pid,
-            test_id,
-            type=f"block_{test_params}",
-        ):
+def test_hybrid(
+    reader_ports: list[str], test_id: str, test_params: Parameter, loop_type: str
+):
+    """blocking reader threads, readings consumed in batches on the event loop"""
+    log_name = test_params.log_name(f"hybrid-{loop_type}")
+    result_dir = Path(__file__).parent / "results" / test_id
+    loop_file = result_dir / "loop" / f"{log_name}.jsonl" if loop_stats else None
+    with run_hybrid_reader(
+        *reader_ports,
+        interval=test_params.interval,
+        type=loop_type,
+        sample=stack_file(test_id, log_name),
+        loop_stats=loop_file,
+        pacing=test_params.pacing,
+        latency=latency_file(test_id, log_name),
+    ) as reader_proc:
+        time.sleep(test_params.warmup)
+        with run_metric_monitor(reader_proc.pid, test_id, type=log_name):
             time.sleep(test_params.runtime)
@@ -0,0 +1,115 @@
+"""
+scaling suite: 1 to 128 sensors per reader process
+
+ports are bare pty pairs driven by one writer process, socat and a writer per
+port don't scale that far. every engine reads all ports of a run, the fitted
+per-sensor costs and scaling limits land in `scaling/SCALING.md` of the results.
+the runs are kept in `scaling/`, the engine names here also name modes of
+`test_runner.py` that read other streams.
+"""
+
+import time
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from .conftest import FREE_THREADED_PYTHON, Parameter, baudrates, warmup, wire_chunk
+from tests.helper.scaling import SCALING_DIR, summarize_scaling
+from tests.helper.subprocess_managers import (
+    run_async_reader,
+    run_blocking_reader,
+    run_hybrid_reader,
+    run_metric_monitor,
+    run_multi_serial_writer,
+    run_pty_pairs,
+)
+
+scaling_sensors: list[int] = [1, 2, 4, 8, 16, 32, 64, 128]
+scaling_interval: float = 0.01
+scaling_runtime: int = 5
+scaling_pacing: str = "adaptive"
+
+# engine -> reader process of all ports, recording frame ages into `latency`
+ENGINES = {
+    "async": lambda ports, interval, latency: run_async_reader(
+        *ports, interval=interval, pacing=scaling_pacing, latency=latency
+    ),
+    "block": lambda ports, interval, latency: run_blocking_reader(
+        *ports, interval=interval, pacing=scaling_pacing, latency=latency
+    ),
+    # every port polled from one timer wheel, see `src/sensor/scheduler.py`
+    "async-wheel": lambda ports, interval, latency: run_async_reader(
+        *ports, interval=interval, scheduler="wheel", latency=latency
+    ),
+    "block-wheel": lambda ports, interval, latency: run_blocking_reader(
+        *ports, interval=interval, type="wheel", latency=latency
+    ),
+    # sensors in on-demand mode, all triggered together once per interval
+    "async-trigger": lambda ports, interval, latency: run_async_reader(
+        *ports, interval=interval, scheduler="trigger", latency=latency
+    ),
+    "block-trigger": lambda ports, interval, latency: run_blocking_reader(
+        *ports, interval=interval, type="trigger", latency=latency
+    ),
+    # reader threads feeding the event loop in batches, see `src/hybrid_pi`
+    "hybrid": lambda ports, interval, latency: run_hybrid_reader(
+        *ports, interval=interval, pacing=scaling_pacing, latency=latency
+    ),
+}
+if FREE_THREADED_PYTHON is not None:
+    # thread per sensor without the GIL, cpu should grow linearly up to the core count
+    ENGINES["block-ft"] = lambda ports, interval, latency: run_blocking_reader(
+        *ports,
+        interval=interval,
+        pacing=scaling_pacing,
+        python=FREE_THREADED_PYTHON,
+        latency=latency,
+    )
+
+
+# once per session, a module scope would summarize every time the shuffle switches modules
+@pytest.fixture(scope="session", autouse=True)
+def scaling_summary(test_id: str) -> Generator[None, None, None]:
+    yield
+    summarize_scaling(Path(__file__).parent / "results" / test_id / SCALING_DIR)
+
+
+@pytest.fixture
+def scaling_ports(sensors: int) -> Generator[list[str], None, None]:
+    with run_pty_pairs(sensors) as pairs:
+        with run_multi_serial_writer(
+            [f"fd:{master}" for master, _ in pairs],
+            baudrate=baudrates[0],
+            interval=scaling_interval,
+            wire_chunk=wire_chunk,
+            pass_fds=tuple(master for master, _ in pairs),
+            # the trigger engines switch their ports to on-demand frames
+            respond=True,
+            # frame latency is read from the stamps, see `latency_log.py`
+            stamp=True,
+        ):
+            yield [slave for _, slave in pairs]
+
+
+@pytest.mark.parametrize("sensors", scaling_sensors)
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_scaling(
+    engine: str, sensors: int, scaling_ports: list[str], test_id: str, repetition: int
+):
+    params = Parameter(
+        sensors=sensors,
+        interval=scaling_interval,
+        runtime=scaling_runtime,
+        baudrate=baudrates[0],
+        pacing=scaling_pacing,
+        repetition=repetition,
+        warmup=warmup,
+    )
+    log_name = params.log_name(engine)
+    result_id = f"{test_id}/{SCALING_DIR}"
+    latency = Path(__file__).parent / "results" / result_id / "latency" / f"{log_name}.jsonl"
+    with ENGINES[engine](scaling_ports, scaling_interval, latency) as reader_proc:
+        time.sleep(params.warmup)
+        with run_metric_monitor(reader_proc.pid, result_id, type=log_name):
+            time.sleep(params.runtime)
@@ -0,0 +1,108 @@
+"""recording what a port received, and reading the capture back"""
+
+from typing import Iterator
+
+import pytest
+
+from src.blocking_pi.sensor import OK, TFMPSerial
+from src.sensor.capture import (
+    MAGIC,
+    CaptureFile,
+    CaptureRecorder,
+    RecordingSerial,
+    capture_files,
+)
+from src.sensor.clock import VirtualClock
+from src.sensor.frame import TFMPData
+from src.sensor.replay import ReplaySerial
+from src.sensor.stream import StreamSerial, TimedStream
+from tests.helper.bulk_decode import decode_capture
+
+DATA = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7"
+
+
+class Chunks(TimedStream):
+    def __init__(self, chunks: list[tuple[float, bytes]], clock: VirtualClock):
+        super().__init__(clock)
+        self._timeline = chunks
+
+    def chunks(self) -> Iterator[tuple[float, bytes]]:
+        for offset, data in self._timeline:
+            yield self.start + offset, data
+
+
+class ClockRecorder:
+    """records on the virtual clock instead of `time.monotonic_ns`"""
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self.records: list[tuple[float, bytes]] = []
+
+    def record(self, data: bytes):
+        if data:
+            self.records.append((self.clock.monotonic(), data))
+
+
+def test_records_chunks_when_first_seen():
+    clock = VirtualClock()
+    stream = Chunks([(0.0, DATA[:5]), (0.001, DATA[5:] + DATA)], clock)
+    recorder = ClockRecorder(clock)
+    serial = RecordingSerial(StreamSerial(stream).connect(), recorder)
+
+    clock.advance(0.002)
+    assert serial.in_waiting == 2 * len(DATA)
+    clock.advance(0.5)
+    # byte at a time, long after the bytes came in
+    assert b"".join(serial.read() for _ in range(2 * len(DATA))) == DATA * 2
+    assert recorder.records == [(0.002, DATA * 2)]
+
+
+def test_read_waits_for_the_rest():
+    clock = VirtualClock()
+    stream = Chunks([(0.0, DATA[:4]), (0.01, DATA[4:])], clock)
+    recorder = ClockRecorder(clock)
+    serial = RecordingSerial(StreamSerial(stream).connect(), recorder)
+
+    assert serial.read(len(DATA)) == DATA
+    assert recorder.records == [(0.0, DATA[:4]), (0.01, DATA[4:])]
+
+
+def test_engine_through_the_recorder_writes_a_readable_capture(tmp_path):
+    clock = VirtualClock()
+    stream = Chunks([(i * 0.005, DATA) for i in range(20)], clock)
+    with CaptureRecorder(tmp_path / "port", port="port") as recorder:
+        serial = RecordingSerial(StreamSerial(stream).connect(), recorder)
+        sensor = TFMPSerial.from_serial(serial, clock=clock)
+        for _ in range(20):
+            assert sensor.update() and sensor.status == OK
+
+    [path] = capture_files(tmp_path / "port")
+    with CaptureFile(path) as capture:
+        assert capture.port == "port"
+        assert b"".join(bytes(chunk) for _, chunk in capture.chunks()) == DATA * 20
+
+
+@pytest.mark.parametrize("content", [b"", MAGIC[:2], MAGIC + b"\x01\x00"])
+def test_capture_killed_before_its_first_flush_is_empty(tmp_path, content: bytes):
+    clock = VirtualClock()
+    stream = Chunks([(i * 0.005, DATA) for i in range(5)], clock)
+    with CaptureRecorder(tmp_path / "port", port="port") as recorder:
+        serial = RecordingSerial(StreamSerial(stream).connect(), recorder)
+        for _ in range(5):
+            serial.read(len(DATA))
+    (tmp_path / "port-0001.cap").write_bytes(content)
+
+    with CaptureFile(tmp_path / "port-0001.cap") as capture:
+        assert capture.start_time is None
+        assert list(capture.chunks()) == []
+
+    serial = ReplaySerial(tmp_path / "port", speed=None).connect()
+    assert serial.read(5 * len(DATA)) == DATA * 5
+    result = decode_capture(tmp_path / "port", TFMPData, tmp_path / "decoded", fmt="npz")
+    assert result["frames"] == 5
+
+
+def test_not_a_capture(tmp_path):
+    (tmp_path / "other.cap").write_bytes(b"XY")
+    with pytest.raises(ValueError, match="not a capture"):
+        CaptureFile(tmp_path / "other.cap")
@@ -0,0 +1,55 @@
+"""virtual time: sleeping and asyncio timers only move the clock"""
+
+import asyncio
+
+import pytest
+
+from src.sensor.clock import VirtualClock, run_virtual
+
+
+def test_sleep_advances_and_counts_wakeups():
+    clock = VirtualClock(start=5.0)
+    clock.sleep(0.25)
+    clock.advance(0.0)  # nothing to wait for
+    clock.advance(-1.0)
+    assert clock.monotonic() == 5.25
+    assert clock.time() == clock.epoch + 5.25
+    assert clock.wakeups == 1
+
+
+def test_asyncio_sleep_jumps_to_the_timer():
+    clock = VirtualClock()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(3600)
+        return loop.time()
+
+    assert run_virtual(main(), clock) == 3600
+    assert clock.monotonic() == 3600
+
+
+def test_concurrent_timers_fire_in_order():
+    clock = VirtualClock()
+    fired = []
+
+    async def after(delay: float):
+        await asyncio.sleep(delay)
+        fired.append((delay, clock.monotonic()))
+
+    async def main():
+        await asyncio.gather(after(0.03), after(0.01), after(0.02))
+
+    run_virtual(main(), clock)
+    assert fired == [(0.01, 0.01), (0.02, 0.02), (0.03, 0.03)]
+
+
+def test_wait_for_times_out_on_virtual_time():
+    clock = VirtualClock()
+
+    async def main():
+        await asyncio.wait_for(asyncio.sleep(10), timeout=0.5)
+
+    with pytest.raises(asyncio.TimeoutError):
+        run_virtual(main(), clock)
+    assert clock.monotonic() == pytest.approx(0.5)
@@ -0,0 +1,134 @@
+"""command encoding and the replies of pipelined commands"""
+
+from concurrent.futures import Future
+
+import pytest
+
+from src.sensor.command import (
+    CommandTracker,
+    FrameRateReply,
+    VersionReply,
+    checksum,
+    frame_rate,
+    get_version,
+    trigger,
+)
+
+
+def reply(header: bytes, payload: bytes) -> bytes:
+    body = header + payload
+    return body + bytes([checksum(body)])
+
+
+VERSION = reply(VersionReply.HEADER, b"\x03\x02\x01")
+
+
+def rate(hz: int) -> bytes:
+    return reply(FrameRateReply.HEADER, hz.to_bytes(2, "little"))
+
+
+def test_encode():
+    assert get_version().encode() == b"\x5a\x04\x01\x5f"
+    assert frame_rate(100).encode() == b"\x5a\x06\x03\x64\x00\xc7"
+    assert get_version().reply is VersionReply
+    assert trigger().reply is None
+
+
+def test_replies_resolve_oldest_first():
+    tracker = CommandTracker()
+    first, second, version = Future(), Future(), Future()
+    tracker.sent(frame_rate(100), first)
+    tracker.sent(get_version(), version)
+    tracker.sent(frame_rate(0), second)
+    assert len(tracker) == 3
+
+    assert tracker.resolve(rate(100))
+    assert tracker.resolve(VERSION)
+    assert tracker.resolve(rate(0))
+    assert first.result() == FrameRateReply(rate=100)
+    assert second.result() == FrameRateReply(rate=0)
+    assert version.result() == VersionReply(major=1, minor=2, revision=3)
+    assert len(tracker) == 0
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        rate(100)[:-1] + b"\x00",  # checksum
+        reply(b"\x5a\x05\x7f", b"\x00"),  # unknown id
+        reply(b"\x5a\x07\x03", b"\x64\x00\x00"),  # wrong size for the id
+        b"\x5a\x04",
+    ],
+)
+def test_broken_replies_resolve_nothing(data: bytes):
+    tracker = CommandTracker()
+    future = Future()
+    tracker.sent(frame_rate(100), future)
+    assert not tracker.resolve(data)
+    assert not future.done() and len(tracker) == 1
+
+
+def test_reply_nobody_asked_for():
+    tracker = CommandTracker()
+    assert not tracker.resolve(rate(100))
+
+
+def test_cancelled_and_discarded_commands_are_skipped():
+    tracker = CommandTracker()
+    cancelled, discarded, waiting = Future(), Future(), Future()
+    for future in (cancelled, discarded, waiting):
+        tracker.sent(frame_rate(100), future)
+    cancelled.cancel()
+    tracker.discard(discarded)
+    tracker.discard(Future())  # not tracked
+    assert len(tracker) == 2
+
+    assert tracker.resolve(rate(100))
+    assert waiting.result() == FrameRateReply(rate=100)
+    assert not discarded.done()
+    assert len(tracker) == 0
+
+
+def test_fail_fails_everything_pending():
+    tracker = CommandTracker()
+    futures = [Future(), Future()]
+    tracker.sent(frame_rate(100), futures[0])
+    tracker.sent(get_version(), futures[1])
+    tracker.fail(ConnectionError("closed"))
+    assert len(tracker) == 0
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result()
+    assert not tracker.resolve(VERSION)
+
+
+class CancelledWhileResolving(Future):
+    """a timeout cancelling the command just as its reply is read"""
+
+    def set_running_or_notify_cancel(self) -> bool:
+        self.cancel()
+        return super().set_running_or_notify_cancel()
+
+
+def test_timeout_racing_the_reply_does_not_break_the_reader():
+    tracker = CommandTracker()
+    cancelled, waiting = CancelledWhileResolving(), Future()
+    tracker.sent(frame_rate(100), cancelled)
+    tracker.sent(frame_rate(100), waiting)
+
+    assert tracker.resolve(rate(100))
+    assert cancelled.cancelled()
+    assert waiting.result() == FrameRateReply(rate=100)
+    # once resolving, a late timeout can't cancel it any more
+    assert not waiting.cancel()
+
+
+def test_done_callback_can_send_the_next_command():
+    tracker = CommandTracker()
+    first, second = Future(), Future()
+    first.add_done_callback(lambda _: tracker.sent(get_version(), second))
+    tracker.sent(frame_rate(100), first)
+
+    assert tracker.resolve(rate(100))
+    assert tracker.resolve(VERSION)
+    assert second.result() == VersionReply(major=1, minor=2, revision=3)
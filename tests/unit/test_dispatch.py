@@ -0,0 +1,155 @@
+"""header trie dispatch, including streams split at every possible boundary"""
+
+import random
+from dataclasses import dataclass
+
+import pytest
+
+from src.sensor.command import FrameRateReply, VersionReply
+from src.sensor.dispatch import ERR_CHECKSUM, ERR_HEADER, OK, FrameDispatcher, HeaderTrie
+from src.sensor.frame import Frame, TFMPData
+from src.sensor.protocol import SynchronizationProtocol
+
+
+@dataclass
+class Short(Frame["Short"], register=False):
+    """header `aa`, a prefix of `Long`'s"""
+
+    value: int
+
+    HEADER = b"\xaa"
+    SIZE = 3
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "Short":
+        return cls(value=data[1])
+
+
+@dataclass
+class Long(Frame["Long"], register=False):
+    value: int
+
+    HEADER = b"\xaa\x01"
+    SIZE = 6
+    DATA = int
+
+    @classmethod
+    def parse(cls, data: bytes) -> "Long":
+        return cls(value=data[2])
+
+
+def frame(header: bytes, payload: bytes) -> bytes:
+    body = header + payload
+    return body + bytes([sum(body) & 0xFF])
+
+
+# a valid `Long` whose first three bytes are also a valid `Short`
+OVERLAPPING = frame(b"\xaa\x01", b"\xab\x10\x20")
+DATA = frame(b"\x59\x59", bytes(6))
+
+
+def decode(frame_types, chunks) -> list:
+    protocol = SynchronizationProtocol(frame_types)
+    return [event for chunk in chunks for event in protocol.feed(chunk)]
+
+
+def test_trie_rejects_no_types():
+    with pytest.raises(ValueError):
+        HeaderTrie([])
+
+
+def test_trie_candidates_longest_header_first():
+    trie = HeaderTrie([Short, Long, TFMPData])
+    assert trie.max_header == 2
+    pattern, table = trie.compile()
+    # `aa 01` may still be a `Short`, a lone `aa` only a `Short`
+    assert set(table[1:]) == {((TFMPData, 9),), ((Short, 3),), ((Long, 6), (Short, 3))}
+    match = pattern.search(b"\x00" + OVERLAPPING)
+    assert match.start() == 1 and table[match.lastindex] == ((Long, 6), (Short, 3))
+
+
+def test_earliest_frame_of_any_type_wins():
+    dispatcher = FrameDispatcher([TFMPData, FrameRateReply])
+    reply = frame(b"\x5a\x06\x03", b"\x64\x00")
+    matches = list(dispatcher.frames(b"\x00" + reply + DATA))
+    assert matches[:2] == [(1, FrameRateReply, OK), (1 + len(reply), TFMPData, OK)]
+    assert matches[-1].status == ERR_HEADER
+
+
+def test_broken_frame_consumes_its_size():
+    broken = DATA[:-1] + bytes([DATA[-1] ^ 0xFF])
+    matches = list(FrameDispatcher([TFMPData]).frames(broken + DATA))
+    assert matches[:2] == [(0, TFMPData, ERR_CHECKSUM), (9, TFMPData, OK)]
+
+
+def test_skip_invalid_moves_on():
+    broken = DATA[:-1] + bytes([DATA[-1] ^ 0xFF])
+    matches = list(FrameDispatcher([TFMPData], skip_invalid=True).frames(broken + DATA))
+    assert matches[0] == (9, TFMPData, OK)
+
+
+def test_skip_invalid_per_type():
+    # a broken reply header right before a data frame, only the reply is skipped
+    stray = b"\x5a\x06\x03\x64"
+    broken = DATA[:-1] + bytes([DATA[-1] ^ 0xFF])
+    dispatcher = FrameDispatcher([TFMPData, FrameRateReply], skip_invalid=[FrameRateReply])
+    matches = list(dispatcher.frames(stray + DATA + broken))
+    assert matches[:2] == [(4, TFMPData, OK), (13, TFMPData, ERR_CHECKSUM)]
+
+
+def test_longer_header_wins():
+    matches = list(FrameDispatcher([Short, Long]).frames(OVERLAPPING))
+    assert matches[0] == (0, Long, OK)
+
+
+@pytest.mark.parametrize("split", range(1, len(OVERLAPPING)))
+def test_waits_for_a_longer_frame_cut_off(split: int):
+    chunks = [OVERLAPPING[:split], OVERLAPPING[split:]]
+    assert decode([Short, Long], chunks) == decode([Short, Long], [OVERLAPPING])
+
+
+def test_waits_for_a_longer_header_cut_off():
+    dispatcher = FrameDispatcher([Short, Long])
+    # `aa` alone could still become `aa 01`
+    assert dispatcher.scan(b"\x00\xaa") == (1, None, ERR_HEADER)
+
+
+def test_partial_frame_is_kept():
+    protocol = SynchronizationProtocol(TFMPData)
+    assert protocol.feed(DATA[:5]) == []
+    assert protocol.pending == 5
+    assert [event.frame for event in protocol.feed(DATA[5:])] == [DATA]
+    assert protocol.pending == 0
+
+
+def random_stream(rng: random.Random, count: int) -> bytes:
+    parts = []
+    for _ in range(count):
+        kind = rng.randrange(5)
+        if kind == 0:
+            parts.append(OVERLAPPING)
+        elif kind == 1:
+            parts.append(frame(b"\xaa", rng.randbytes(1)))
+        elif kind == 2:
+            parts.append(frame(b"\xaa\x01", rng.randbytes(3)))
+        elif kind == 3:
+            parts.append(frame(b"\x59\x59", rng.randbytes(6)))
+        else:
+            parts.append(bytes(rng.choice(b"\xaa\x01\x59\x00") for _ in range(rng.randint(1, 6))))
+    return b"".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunking_does_not_change_the_result(seed: int):
+    rng = random.Random(seed)
+    data = random_stream(rng, 200)
+    types = [Short, Long, TFMPData, VersionReply]
+    whole = decode(types, [data])
+    for max_chunk in (1, 2, 7, 64):
+        chunks, i = [], 0
+        while i < len(data):
+            n = rng.randint(1, max_chunk)
+            chunks.append(data[i : i + n])
+            i += n
+        assert decode(types, chunks) == whole
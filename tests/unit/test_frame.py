@@ -0,0 +1,79 @@
+"""frame type declaration and the registry synchronizers dispatch on"""
+
+import types
+
+import pytest
+
+from src.sensor import frame as frame_module
+from src.sensor.frame import Frame, TFMPData, register_frame, registered_frames
+
+DATA = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7"
+
+
+@pytest.fixture
+def registry(monkeypatch) -> dict:
+    """a copy of the registry, so the frames declared here don't leak"""
+    registry = dict(frame_module.REGISTRY)
+    monkeypatch.setattr(frame_module, "REGISTRY", registry)
+    return registry
+
+
+def declare(header: bytes = b"\xbb", register: bool = True, **attrs) -> type[Frame]:
+    namespace = {"HEADER": header, "SIZE": 4, "DATA": int, **attrs}
+    namespace["parse"] = classmethod(lambda cls, data: data[1])
+    return types.new_class(
+        "Probe", (Frame["Probe"],), {"register": register}, lambda ns: ns.update(namespace)
+    )
+
+
+def test_builtin_frames_are_registered():
+    assert TFMPData in registered_frames()
+    assert TFMPData.HEADER_LENGTH == 2
+    assert TFMPData.parse(DATA) == TFMPData(distance=786, intensity=0, temperature=-256)
+
+
+def test_subclasses_register_unless_asked_not_to(registry):
+    unregistered = declare(b"\xbb", register=False)
+    assert unregistered not in registered_frames()
+
+    registered = declare(b"\xbc")
+    assert registered in registered_frames()
+    # the same class again (a module reload) replaces itself
+    register_frame(registered)
+    assert registered_frames().count(registered) == 1
+
+
+def test_header_clash_is_refused(registry):
+    before = dict(registry)
+    with pytest.raises(ValueError, match="taken by"):
+        declare(TFMPData.HEADER)
+    assert registry == before
+
+
+@pytest.mark.parametrize(
+    "attrs, error",
+    [
+        ({"HEADER": None}, NotImplementedError),
+        ({"SIZE": None}, NotImplementedError),
+        ({"DATA": None}, NotImplementedError),
+        ({"HEADER": "\xbb"}, TypeError),
+        ({"SIZE": 4.0}, TypeError),
+    ],
+)
+def test_declaration_is_checked(registry, attrs: dict, error: type[Exception]):
+    with pytest.raises(error):
+        declare(register=False, **attrs)
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (DATA[:-1], "length"),
+        (b"\x59\x58" + DATA[2:], "header"),
+        (DATA[:-1] + b"\x00", "checksum"),
+    ],
+)
+def test_validate(data: bytes, message: str):
+    TFMPData.validate(DATA)
+    with pytest.raises(ValueError, match=message):
+        TFMPData.validate(data)
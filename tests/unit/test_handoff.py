@@ -0,0 +1,86 @@
+"""readings handed from reader threads to the event loop, on virtual time"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.hybrid_pi.sensor import BatchHandoff
+from src.sensor.clock import VirtualClock, run_virtual
+
+
+def test_one_wakeup_per_batch():
+    clock = VirtualClock()
+
+    async def main():
+        handoff = BatchHandoff(asyncio.get_running_loop(), linger=0.005)
+        for i in range(100):
+            handoff.put(i)
+        batch = await handoff.get()
+        return handoff, batch
+
+    handoff, batch = run_virtual(main(), clock)
+    assert batch == list(range(100))
+    assert (handoff.wakeups, handoff.batches) == (1, 1)
+    # held for the linger, not longer
+    assert clock.monotonic() == pytest.approx(0.005)
+
+
+def test_puts_during_the_linger_join_the_batch():
+    clock = VirtualClock()
+
+    async def main():
+        handoff = BatchHandoff(asyncio.get_running_loop(), linger=0.005)
+        handoff.put("first")
+        await asyncio.sleep(0.002)
+        handoff.put("second")
+        first = await handoff.get()
+        handoff.put("third")
+        return handoff, first, await handoff.get()
+
+    handoff, first, second = run_virtual(main(), clock)
+    assert first == ["first", "second"]
+    assert second == ["third"]
+    assert handoff.wakeups == 2
+    assert clock.monotonic() == pytest.approx(0.010)
+
+
+def test_without_linger_each_wakeup_flushes():
+    clock = VirtualClock()
+
+    async def main():
+        handoff = BatchHandoff(asyncio.get_running_loop(), linger=0.0)
+        handoff.put(1)
+        handoff.put(2)
+        return await handoff.get()
+
+    assert run_virtual(main(), clock) == [1, 2]
+    assert clock.monotonic() == 0.0
+
+
+def test_puts_from_threads_all_arrive():
+    clock = VirtualClock()
+
+    async def main():
+        handoff = BatchHandoff(asyncio.get_running_loop(), linger=0.005)
+
+        def reader(n: int):
+            for i in range(50):
+                handoff.put((n, i))
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        received = []
+        while len(received) < 200:
+            received += await handoff.get()
+        for thread in threads:
+            thread.join()
+        return handoff, received
+
+    handoff, received = run_virtual(main(), clock)
+    assert sorted(received) == [(n, i) for n in range(4) for i in range(50)]
+    # per reader thread in order
+    for n in range(4):
+        assert [i for m, i in received if m == n] == list(range(50))
+    assert handoff.wakeups == handoff.batches <= 200
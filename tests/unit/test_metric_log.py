@@ -0,0 +1,59 @@
+"""binary metric logs read back as the summaries see them"""
+
+import json
+import os
+
+import numpy as np
+
+from tests.helper.create_summary import LOG_FIELDS, parse_log
+from tests.helper.metric_log import BinaryLogWriter
+from tests.helper.metric_monitor import monitor_pid
+
+
+def rows(n: int) -> list[dict[str, float]]:
+    return [
+        {"timestamp": 100.0 + i, "cpu_percent": 2.5 * i, "memory_rss": 1024 * 1024 * (i + 1)}
+        for i in range(n)
+    ]
+
+
+def test_round_trip_matches_jsonl(tmp_path):
+    with open(tmp_path / "run.bin", "wb") as f:
+        writer = BinaryLogWriter(f)
+        for row in rows(3):
+            writer.write(row)
+    with open(tmp_path / "run.log", "w") as f:
+        for row in rows(3):
+            f.write(json.dumps(row) + "\n")
+
+    binary, jsonl = parse_log(tmp_path / "run.bin"), parse_log(tmp_path / "run.log")
+    assert binary["memory_rss"].tolist() == [1.0, 2.0, 3.0]  # MB
+    for name in LOG_FIELDS:
+        # fields the log doesn't have read as zero in both
+        assert np.array_equal(binary[name], jsonl[name]), name
+
+
+def test_append_keeps_the_field_order_and_drops_a_partial_record(tmp_path):
+    path = tmp_path / "run.bin"
+    first, second = rows(2)
+    with open(path, "ab") as f:
+        BinaryLogWriter(f).write(first)
+    with open(path, "ab") as f:
+        BinaryLogWriter(f).write(dict(reversed(second.items())))
+        # a monitor killed mid-write
+        f.write(b"\x00" * 5)
+
+    log = parse_log(path)
+    assert log["timestamp"].tolist() == [100.0, 101.0]
+    assert log["cpu_percent"].tolist() == [0.0, 2.5]
+
+
+def test_monitor_writes_binary_by_default(tmp_path):
+    path = tmp_path / "monitor.bin"
+    monitor_pid(os.getpid(), interval=0.05, duration=0.2, output_file=path)
+
+    log = parse_log(path)
+    assert len(log["timestamp"]) >= 2
+    assert np.all(np.diff(log["timestamp"]) > 0)
+    assert np.all(log["memory_rss"] > 0)
+    assert np.all(log["num_threads"] >= 1)
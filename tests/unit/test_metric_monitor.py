@@ -0,0 +1,33 @@
+"""scheduler counters of a process whose threads come and go"""
+
+import os
+import threading
+import time
+
+from tests.helper.metric_monitor import THREAD_COUNTERS, SchedCounters
+
+
+def switch(stop: threading.Event):
+    # every wait is a voluntary context switch
+    while not stop.wait(0.001):
+        pass
+
+
+def test_counters_keep_what_exited_threads_counted():
+    counters = SchedCounters(os.getpid())
+    stop = threading.Event()
+    threads = [threading.Thread(target=switch, args=(stop,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    before = counters.read()
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    after = counters.read()
+
+    for name in THREAD_COUNTERS:
+        assert after[name] >= before[name], name
+    # the threads' switches are still counted once they are gone
+    assert after["voluntary_ctx_switches"] >= before["voluntary_ctx_switches"] > 100
@@ -0,0 +1,89 @@
+"""adaptive pacing against a simulated sensor on the virtual clock"""
+
+import numpy as np
+import pytest
+
+from src.sensor.clock import VirtualClock
+from src.sensor.pacing import PACING_MARGIN, FramePacer
+
+FRAME_SIZE = 9
+
+
+class Sensor:
+    """frames every `period` from `offset`, read the way `update` reads them"""
+
+    def __init__(self, clock: VirtualClock, period: float, offset: float = 0.0037):
+        self.clock = clock
+        self.period = period
+        self.offset = offset
+        self.read = 0  # frames consumed
+
+    def due(self) -> float:
+        return self.offset + self.read * self.period
+
+    def backlog(self) -> int:
+        sent = int((self.clock.monotonic() - self.offset) // self.period) + 1
+        return max(0, sent - self.read) * FRAME_SIZE
+
+    def update(self, timeout: float) -> float | None:
+        """age of the frame read when it was read, `None` on a timeout"""
+        wait = self.due() - self.clock.monotonic()
+        if wait > timeout:
+            self.clock.advance(timeout)
+            return None
+        self.clock.advance(wait)
+        age = self.clock.monotonic() - self.due()
+        self.read += 1
+        return age
+
+
+def run(pacer: FramePacer, sensor: Sensor, updates: int, timeout: float = 0.01) -> list:
+    clock = sensor.clock
+    ages = []
+    for _ in range(updates):
+        started = clock.monotonic()
+        age = sensor.update(timeout)
+        if age is not None:
+            ages.append(age)
+        delay = pacer.next_delay(started, clock.monotonic(), age is not None, sensor.backlog)
+        clock.advance(delay)
+    return ages
+
+
+@pytest.mark.parametrize("period", [0.01, 0.012])
+def test_locks_on_to_the_frame_period(period: float):
+    clock = VirtualClock()
+    pacer = FramePacer(0.01, clock)
+    sensor = Sensor(clock, period)
+
+    ages = run(pacer, sensor, 400)
+    assert len(ages) == 400
+    assert pacer.period == pytest.approx(period, rel=1e-3)
+    # woken just after each frame, never a period late
+    assert max(ages[-100:]) <= PACING_MARGIN + 1e-9
+
+
+def test_backs_off_while_frames_miss():
+    clock = VirtualClock()
+    pacer = FramePacer(0.01, clock, max_backoff=4)
+
+    delays = []
+    for _ in range(5):
+        started = clock.monotonic()
+        clock.advance(0.01)
+        delays.append(pacer.next_delay(started, clock.monotonic(), False))
+    assert np.allclose(delays, [0.01, 0.02, 0.04, 0.04, 0.04])
+
+    # a frame resets the backoff
+    started = clock.monotonic()
+    clock.advance(0.002)
+    assert pacer.next_delay(started, clock.monotonic(), True) <= 0.01 + PACING_MARGIN
+    assert pacer.misses == 0
+
+
+def test_backlog_is_read_right_away():
+    clock = VirtualClock()
+    pacer = FramePacer(0.01, clock)
+    # frames found buffered, no wait
+    assert pacer.next_delay(0.0, 0.0, True, lambda: 2 * FRAME_SIZE) == 0
+    assert pacer.next_delay(0.0, 0.0, True, lambda: FRAME_SIZE - 1) > 0
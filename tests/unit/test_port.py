@@ -0,0 +1,60 @@
+"""the async engine's ports over a pseudo terminal"""
+
+import asyncio
+import os
+import tty
+
+import pytest
+
+from src.async_pi.port import PolledSerial, SerialPort
+from src.async_pi.sensor import OK, AsyncTFMPSerial
+
+DATA = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7"
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pty")
+
+
+@pytest.fixture
+def pty():
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+@pytest.mark.parametrize("polled", [False, True])
+def test_reads_frames_and_counts_what_waits(pty, polled: bool):
+    master, name = pty
+
+    async def run():
+        sensor = await AsyncTFMPSerial.create(name, 115200, polled=polled)
+        try:
+            os.write(master, DATA * 3)
+            assert await sensor.update() and sensor.status == OK
+            # the rest came in with the first read or is still in the port
+            await asyncio.sleep(0.01)
+            assert sensor.in_waiting == 2 * len(DATA)
+            assert await sensor.update(wait=False)
+            assert await sensor.update(wait=False)
+            assert not await sensor.update(wait=False)
+        finally:
+            await sensor._reader.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("opener", [SerialPort.open, PolledSerial.open])
+def test_write_reaches_the_line(pty, opener):
+    master, name = pty
+
+    async def run():
+        port = await opener(name, 115200)
+        try:
+            await port.write(b"\x5a\x04\x04\x62")
+            await asyncio.sleep(0.01)
+        finally:
+            await port.close()
+
+    asyncio.run(run())
+    assert os.read(master, 16) == b"\x5a\x04\x04\x62"
@@ -0,0 +1,92 @@
+"""the shared synchronizer, and the engines built on it against the header hunt they replaced"""
+
+from concurrent.futures import Future
+
+import pytest
+
+from src.async_pi.sensor import AsyncTFMPSerial
+from src.blocking_pi.sensor import TFMPSerial
+from src.sensor.clock import VirtualClock, run_virtual
+from src.sensor.command import FrameRateReply, frame_rate, get_version
+from src.sensor.dispatch import ERR_CHECKSUM, OK
+from src.sensor.frame import TFMPData
+from src.sensor.protocol import BaseProtocol, SynchronizationProtocol
+from src.sensor.stream import AsyncStreamSerial, StreamSerial
+from tests.helper.fuzz_protocol import BytesStream, fuzz
+
+DATA = b"\x59\x59\x12\x03\x00\x00\x00\x00\xc7"
+BROKEN = DATA[:-1] + b"\x00"
+
+
+@pytest.mark.parametrize("seed", range(0, 300, 10))
+def test_fuzz_matches_reference(seed: int):
+    assert fuzz(seed, frames=200, max_chunk=64) == []
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_fuzz_byte_by_byte(seed: int):
+    assert fuzz(seed, frames=100, max_chunk=1) == []
+
+
+def test_counters():
+    protocol = SynchronizationProtocol(TFMPData)
+    events = protocol.feed(b"\x00\x01" + DATA + BROKEN + DATA[:4])
+    assert [event.status for event in events] == [OK, ERR_CHECKSUM]
+    assert (protocol.frames, protocol.checksum_errors, protocol.skipped_bytes) == (1, 1, 2)
+    assert protocol.pending == 4
+    protocol.reset()
+    assert protocol.pending == 0
+
+
+def test_base_protocol_queues_data_frames():
+    protocol = BaseProtocol()
+    protocol.feed(DATA + BROKEN + DATA[:3])
+    assert protocol.buffered == 2 * 9 + 3
+    assert protocol.next_frame() == (DATA, OK)
+    # like `read_frame`, a broken frame comes without its bytes
+    assert protocol.next_frame() == (bytes(), ERR_CHECKSUM)
+    assert protocol.next_frame() is None
+
+
+def test_base_protocol_resolves_replies_between_frames():
+    protocol = BaseProtocol()
+    future = Future()
+    protocol.commands.sent(frame_rate(100), future)
+    reply = b"\x5a\x06\x03\x64\x00\xc7"
+    protocol.feed(DATA + reply[:2])
+    assert not future.done()
+    protocol.feed(reply[2:] + DATA)
+    assert future.result() == FrameRateReply(rate=100)
+    assert [protocol.next_frame(), protocol.next_frame()] == [(DATA, OK), (DATA, OK)]
+
+
+@pytest.mark.parametrize("stray", [b"\x5a", b"\x5a\x06\x03", b"\x5a\x06\x03\x64"])
+def test_stray_reply_header_keeps_the_data_frame(stray: bytes):
+    protocol = BaseProtocol()
+    future = Future()
+    protocol.commands.sent(frame_rate(100), future)
+    protocol.feed(stray + DATA + DATA)
+    assert [protocol.next_frame(), protocol.next_frame()] == [(DATA, OK), (DATA, OK)]
+    assert not future.done()
+
+
+def test_blocking_request_timeout_forgets_the_command():
+    clock = VirtualClock()
+    serial = StreamSerial(BytesStream(DATA * 3, clock)).connect()
+    sensor = TFMPSerial.from_serial(serial, clock=clock)
+    with pytest.raises(TimeoutError):
+        sensor.request(get_version(), timeout=0.05)
+    assert len(sensor._protocol.commands) == 0
+
+
+def test_async_request_timeout_forgets_the_command():
+    clock = VirtualClock()
+
+    async def run() -> int:
+        reader = await AsyncStreamSerial(BytesStream(DATA * 3, clock)).connect()
+        sensor = AsyncTFMPSerial(reader, None, clock=clock)
+        with pytest.raises(TimeoutError):
+            await sensor.request(get_version(), timeout=0.05)
+        return len(sensor._protocol.commands)
+
+    assert run_virtual(run(), clock) == 0
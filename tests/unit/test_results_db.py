@@ -0,0 +1,82 @@
+"""regression gate of the perf results database"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from tests.helper.results_db import (
+    DIRTY,
+    compare,
+    connect,
+    ingest,
+    load_runs,
+    mann_whitney_u,
+    resolve_commit,
+)
+
+RUN = "block_sensors-1_interval-0.01_runtime-5__rep-{}"
+
+
+def test_exact_p_values_of_few_runs():
+    low, high = np.arange(5.0), np.arange(5.0) + 10
+    # one of the 252 splits a side, the other way round
+    assert mann_whitney_u(low, high) == 2 / 252
+    assert mann_whitney_u(low[:3], high[:3]) == 0.1
+    assert mann_whitney_u(low, low) == 1.0
+
+
+def write_run(result_dir: Path, repetition: int, latencies: list[float]):
+    name = RUN.format(repetition)
+    with open(result_dir / f"{name}.log", "w") as f:
+        for i in range(3):
+            row = {"timestamp": 100.0 + i, "cpu_percent": 5.0, "memory_rss": 1e6}
+            f.write(json.dumps(row) + "\n")
+    (result_dir / "latency").mkdir(exist_ok=True)
+    with open(result_dir / "latency" / f"{name}.jsonl", "w") as f:
+        # read during the warmup, before the monitor's first sample
+        f.write(json.dumps({"t": 99.0, "latency_ms": 1000.0}) + "\n")
+        for i, latency in enumerate(latencies):
+            f.write(json.dumps({"t": 100.0 + i * 0.01, "latency_ms": latency}) + "\n")
+
+
+def test_latency_gate_compares_runs(tmp_path):
+    conn = connect(tmp_path / "results.sqlite")
+    for commit, latency in (("base", 2.0), ("slow", 3.0)):
+        result_dir = tmp_path / commit
+        result_dir.mkdir()
+        for repetition in range(5):
+            write_run(result_dir, repetition, [latency + repetition * 0.01] * 100)
+        assert ingest(result_dir, conn, commit) == 5
+
+    regressions = compare(conn, "base", "slow")
+    assert len(regressions) == 2
+    assert all("Latency" in regression for regression in regressions)
+    assert compare(conn, "slow", "base") == []
+
+
+def test_commits_match_exactly(tmp_path):
+    conn = connect(tmp_path / "results.sqlite")
+    sha = "abc123" + "0" * 34
+    for commit, latency in ((sha, 2.0), (sha + DIRTY, 9.0), ("abc123" + "f" * 34, 9.0)):
+        result_dir = tmp_path / commit
+        result_dir.mkdir()
+        for repetition in range(2):
+            write_run(result_dir, repetition, [latency] * 10)
+        ingest(result_dir, conn, commit)
+
+    [runs] = load_runs(conn, sha).values()
+    assert runs["latency_ms_p50"].tolist() == [2.0, 2.0]
+    assert load_runs(conn, "abc123") == {}
+    [runs] = load_runs(conn, sha, dirty=True).values()
+    assert sorted(runs["latency_ms_p50"]) == [2.0, 2.0, 9.0, 9.0]
+    [runs] = load_runs(conn, sha + DIRTY).values()
+    assert runs["latency_ms_p50"].tolist() == [9.0, 9.0]
+
+
+def test_resolve_commit_to_a_full_sha():
+    head = resolve_commit("HEAD")
+    assert len(head) == 40
+    assert resolve_commit(head[:7] + DIRTY) == head + DIRTY
+    # not a git ref, e.g. a name given to `ingest --commit`
+    assert resolve_commit("baseline-run") == "baseline-run"
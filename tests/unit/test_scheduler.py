@@ -0,0 +1,92 @@
+"""timer wheel and the shared poll schedule, on the virtual clock"""
+
+import pytest
+
+from src.sensor.clock import VirtualClock
+from src.sensor.scheduler import PollScheduler, TimerWheel
+
+
+def test_deadlines_round_up_to_their_tick():
+    wheel = TimerWheel(tick=0.001, slots=8)
+    wheel.schedule(0.0012, "a")
+    wheel.schedule(0.002, "b")
+    wheel.schedule(0.0035, "c")
+    assert len(wheel) == 3
+    assert wheel.next_deadline() == pytest.approx(0.002)
+
+    assert wheel.expire(0.0019) == []
+    assert sorted(wheel.expire(0.002)) == ["a", "b"]
+    assert wheel.next_deadline() == pytest.approx(0.004)
+    assert wheel.expire(0.01) == ["c"]
+    assert len(wheel) == 0 and wheel.next_deadline() is None
+
+
+def test_later_rounds_wait_in_their_slot():
+    wheel = TimerWheel(tick=0.001, slots=8)
+    wheel.schedule(0.003, "next round")  # 3 + 8 ticks share slot 3
+    wheel.schedule(0.011, "later round")
+    wheel.schedule(0.020, "beyond")
+
+    assert wheel.expire(0.005) == ["next round"]
+    assert wheel.next_deadline() == pytest.approx(0.011)
+    assert wheel.expire(0.010) == []
+    assert wheel.expire(0.011) == ["later round"]
+    # more than a revolution in one turn
+    assert wheel.expire(0.1) == ["beyond"]
+
+
+def test_past_deadlines_expire_on_the_next_turn():
+    wheel = TimerWheel(tick=0.001, slots=8, start=0.005)
+    wheel.schedule(0.001, "late")
+    assert wheel.next_deadline() == pytest.approx(0.005)
+    assert wheel.expire(0.005) == ["late"]
+
+
+def test_due_sensors_share_one_wakeup():
+    clock = VirtualClock()
+    scheduler = PollScheduler(0.01, clock)
+    sensors = range(32)
+    for sensor in sensors:
+        # phases spread within one tick
+        scheduler.add(sensor, at=0.0005 + 0.00001 * sensor)
+
+    for _ in range(10):
+        clock.advance(scheduler.wait())
+        due = scheduler.due()
+        assert sorted(due) == list(sensors)
+        for sensor in due:
+            scheduler.done(sensor, ready=True)
+
+    assert scheduler.wakeups == 10
+    assert scheduler.polls == 320
+    assert clock.monotonic() == pytest.approx(0.091)
+
+
+def test_silent_sensor_backs_off_then_takes_the_new_phase():
+    clock = VirtualClock()
+    scheduler = PollScheduler(0.01, clock)
+    scheduler.add("sensor")
+
+    polled = []
+    for ready in (False, False, False, False, False, True, True):
+        clock.advance(scheduler.wait())
+        [sensor] = scheduler.due()
+        polled.append(round(clock.monotonic(), 6))
+        scheduler.done(sensor, ready)
+
+    # retries 1, 2, 4, 8 ticks apart, capped at the interval
+    assert polled == [0.0, 0.001, 0.003, 0.007, 0.015, 0.025, 0.035]
+    clock.advance(scheduler.wait())
+    assert scheduler.due() == ["sensor"]
+    assert clock.monotonic() == pytest.approx(0.045)
+
+
+def test_late_sensor_is_polled_again_right_away():
+    clock = VirtualClock()
+    scheduler = PollScheduler(0.01, clock)
+    scheduler.add("sensor")
+    clock.advance(scheduler.wait())
+    [sensor] = scheduler.due()
+    clock.advance(0.025)  # the poll ran past two intervals
+    scheduler.done(sensor, ready=True)
+    assert scheduler.wait() == 0.0
@@ -0,0 +1,35 @@
+"""the sampler sees cpu burnt in a worker while the main thread sleeps"""
+
+import threading
+import time
+
+import pytest
+
+from tests.helper.stack_sampler import StackSampler
+
+INTERVAL = 0.005
+
+
+def burn(seconds: float):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_samples_a_busy_worker_next_to_a_sleeping_main_thread(tmp_path):
+    sampler = StackSampler(tmp_path / "stacks.folded", INTERVAL)
+    start = time.process_time()
+    sampler.start()
+    try:
+        worker = threading.Thread(target=burn, args=(0.5,), name="worker")
+        worker.start()
+        while worker.is_alive():
+            time.sleep(1)
+    finally:
+        sampler.stop()
+    cpu = time.process_time() - start
+
+    samples = sum(n for stack, n in sampler.stacks.items() if stack.startswith("worker;"))
+    assert samples == pytest.approx(cpu / INTERVAL, rel=0.2)
+    assert any("burn" in stack for stack in sampler.stacks)
+    assert (tmp_path / "stacks.folded").read_text().count(" ") >= len(sampler.stacks)